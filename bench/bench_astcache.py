@@ -0,0 +1,49 @@
+'''
+parse_fileset without an AST cache, with an empty one (every file
+parsed and stored) and with a full one (every file loaded).
+
+    PYTHONPATH=. python bench/bench_astcache.py [files]
+'''
+import os.path as osp
+import sys
+import tempfile
+import time
+
+import cool
+from synthetic import make_fileset
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def main(count):
+    with tempfile.TemporaryDirectory() as directory:
+        fileset = make_fileset(directory, count)
+        for i, filename in enumerate(fileset):
+            # copies of the same example would share one entry
+            with open(filename, 'a') as f:
+                f.write('\n-- copy {0}\n'.format(i))
+        size = sum(osp.getsize(f) for f in fileset) / 1e6
+        print('{0} files, {1:.2f} MB'.format(count, size))
+
+        compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+        best = min(timed(lambda: compiler.parse_fileset(fileset))
+                   for _ in range(3))
+        print('no cache   {0:8.1f} ms'.format(best * 1e3))
+
+        cold = warm = None
+        for run in range(3):
+            cache = cool.ASTCache(osp.join(directory, 'cache' + str(run)))
+            compiler = cool.Compiler(optimize=True, lexer_engine='scanner',
+                                     ast_cache=cache)
+            elapsed = timed(lambda: compiler.parse_fileset(fileset))
+            cold = elapsed if cold is None else min(cold, elapsed)
+            elapsed = timed(lambda: compiler.parse_fileset(fileset))
+            warm = elapsed if warm is None else min(warm, elapsed)
+        print('cold cache {0:8.1f} ms'.format(cold * 1e3))
+        print('warm cache {0:8.1f} ms  ({1} hits, {2} misses)'.format(
+            warm * 1e3, cache.hits, cache.misses))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
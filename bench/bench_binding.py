@@ -0,0 +1,70 @@
+'''
+Type checking programs nesting many lets: lam.cl, and a generated
+method nesting lets depth deep, its body using every variable, with
+the identifiers resolved by the Binder against looking them up through
+the scope stack.
+
+    PYTHONPATH=. python bench/bench_binding.py [depth]
+'''
+import contextlib
+import io
+import os.path as osp
+import sys
+import time
+
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+from synthetic import EXAMPLES
+
+def best_of(func, runs=5):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def nested_lets(depth):
+    lets = ' '.join('let x{0} : Int <- {1} in'.format(
+        i, 'x{0} + 1'.format(i - 1) if i else '0') for i in range(depth))
+    uses = ' + '.join('x{0}'.format(i) for i in range(depth))
+    return ('class Main {{ main() : Int {{ {0} {{ {1}; {1}; {1}; }} }}; }};'
+            .format(lets, uses))
+
+class ScopeWalks(symantic_analyzer.TypeChecker):
+    '''the lookups the bindings replace'''
+
+    def _bind(self, classes):
+        pass
+
+    def typeof_ObjectIdExpression(self, arg):
+        return self._get_type(arg.name)
+
+    def typeof_Assignment(self, arg):
+        type_lhs = self._get_type(arg.lhs)
+        type_expr = yield arg.expr
+        if type_lhs == type_expr or self.is_parent(type_lhs, type_expr):
+            return type_expr
+        raise symantic_analyzer.TypeCheckingException(arg)
+
+def main(depth):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner',
+                             engine='rd')
+    basic = compiler.parse_fileset([])
+    programs = [
+        ('lam.cl', compiler.parse_fileset([osp.join(EXAMPLES, 'lam.cl')])),
+        ('{0} nested lets'.format(depth),
+         basic + compiler.parse_str(nested_lets(depth))),
+    ]
+    for name, ast in programs:
+        for checker_class in (ScopeWalks, symantic_analyzer.TypeChecker):
+            with contextlib.redirect_stdout(io.StringIO()):
+                setup, checker = best_of(lambda: checker_class(ast))
+                elapsed, _ = best_of(checker.type_check)
+            print('{0:18} {1:12} {2:8.2f} ms checking {3:8.2f} ms setup'
+                  .format(name, 'scope walks' if checker_class is ScopeWalks
+                          else 'bindings', elapsed * 1e3, setup * 1e3))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
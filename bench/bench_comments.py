@@ -0,0 +1,53 @@
+'''
+Stress test for (* comment *) scanning: megabyte sized comment blocks
+and deeply nested comments, for both lexer engines. The regex the
+PLY lexer used before nested comments were supported is timed on the
+flat block for reference.
+
+    PYTHONPATH=. python bench/bench_comments.py [megabytes] [depth]
+'''
+import re
+import sys
+import time
+
+import cool
+
+OLD_COMMENT = re.compile(r'\(\*(.|\n)*?\*\)')
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def inputs(megabytes, depth):
+    line = ' * Licensed under the terms in LICENSE; see (the docs) *\n'
+    block = line * int(megabytes * 1e6 / len(line))
+    nested = '(* ' * depth + 'x\n' + ' *)' * depth
+    return [
+        ('flat {0} MB'.format(megabytes), '(*' + block + '*)\nclass A {};\n'),
+        ('nested depth {0}'.format(depth), nested + '\nclass A {};\n'),
+        ('many small', '(* doc *) a\n' * int(megabytes * 1e5)),
+    ]
+
+def main(megabytes, depth):
+    for name, text in inputs(megabytes, depth):
+        for engine in ('ply', 'scanner'):
+            compiler = cool.Compiler(optimize=True, lexer_engine=engine)
+            elapsed = best_of(lambda: compiler.tokenize_str(text))
+            print('{0:20} {1:8} {2:9.2f} ms {3:8.2f} MB/s'.format(
+                name, engine, elapsed * 1e3, len(text) / elapsed / 1e6))
+
+    name, text = inputs(megabytes, depth)[0]
+    try:
+        elapsed = best_of(lambda: OLD_COMMENT.match(text), runs=1)
+        print('{0:20} {1:8} {2:9.2f} ms'.format(name, 'old re', elapsed * 1e3))
+    except RecursionError:
+        print('{0:20} {1:8} RecursionError'.format(name, 'old re'))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(float(args[0]) if args else 1, int(args[1]) if len(args) > 1 else 10000)
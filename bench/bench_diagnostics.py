@@ -0,0 +1,73 @@
+'''
+Finding every type error of a generated program of many classes, some
+of which are broken: compiling again after fixing the error each
+compile reports, against one compile collecting all the diagnostics.
+Also the cost of collecting on the program without errors.
+
+    PYTHONPATH=. python bench/bench_diagnostics.py [classes] [errors]
+'''
+import sys
+import time
+
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+from synthetic import tree_class
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def program(count, broken):
+    return [tree_class(i).replace('a - 1', 'a - true') if i in broken
+            else tree_class(i) for i in range(count)]
+
+def compile_checker(compiler, classes):
+    ast = compiler.parse_fileset([]) + compiler.parse_str(''.join(classes))
+    return symantic_analyzer.TypeChecker(ast)
+
+def fix_one_by_one(compiler, count, broken):
+    classes = program(count, broken)
+    compiles = 0
+    while True:
+        compiles += 1
+        checker = compile_checker(compiler, classes)
+        try:
+            checker.type_check()
+        except symantic_analyzer.TypeCheckingException:
+            i = int(checker._curr_class[1:])
+            classes[i] = tree_class(i)
+        else:
+            return compiles
+
+def collect_all(compiler, count, broken):
+    checker = compile_checker(compiler, program(count, broken))
+    return len(checker.type_check(collect=True))
+
+def main(count, errors):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner',
+                             engine='rd')
+    broken = set(range(1, count, max(1, count // errors)))
+    print('{0} classes, {1} broken'.format(count, len(broken)))
+
+    elapsed, compiles = best_of(
+        lambda: fix_one_by_one(compiler, count, broken), runs=1)
+    print('one error per compile {0:9.1f} ms  {1} compiles'.format(
+        elapsed * 1e3, compiles))
+    elapsed, found = best_of(lambda: collect_all(compiler, count, broken))
+    print('collect all           {0:9.1f} ms  {1} diagnostics'.format(
+        elapsed * 1e3, found))
+
+    checker = compile_checker(compiler, program(count, ()))
+    raising, _ = best_of(checker.type_check)
+    collecting, _ = best_of(lambda: checker.type_check(collect=True))
+    print('no errors: raising {0:.1f} ms, collecting {1:.1f} ms'.format(
+        raising * 1e3, collecting * 1e3))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
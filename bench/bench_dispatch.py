@@ -0,0 +1,117 @@
+'''
+Per node cost of a traversal through accept() and type_check() with a
+visitor doing nothing, the handlers being looked up in the dispatch
+table of cool.model, against building their names and looking them up
+with getattr on every node as before.
+
+    PYTHONPATH=. python bench/bench_dispatch.py [megabytes]
+'''
+import sys
+import time
+
+import cool
+from cool.model import SourceElement
+from cool.serialization import CLASSES
+from synthetic import examples_corpus
+
+def best_of(func, runs=5):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def _visit(self, node):
+    return True
+
+def _leave(self, node):
+    pass
+
+def _typeof(self, node):
+    for f in node._fields:
+        field = getattr(node, f)
+        if isinstance(field, list):
+            for elem in field:
+                elem.type_check(self)
+        elif field is not None:
+            field.type_check(self)
+    return 'Object'
+
+namespace = {}
+for cls in CLASSES:
+    namespace['visit_' + cls.__name__] = _visit
+    namespace['typeof_' + cls.__name__] = _typeof
+    namespace['leave_' + cls.__name__] = _leave
+Visitor = type('Visitor', (object,), namespace)
+
+def getattr_accept(node, visitor):
+    class_name = node.__class__.__name__
+    visit = getattr(visitor, 'visit_' + class_name)
+    if visit(node):
+        for f in node._fields:
+            field = getattr(node, f)
+            if field:
+                if isinstance(field, list):
+                    for elem in field:
+                        if isinstance(elem, SourceElement):
+                            getattr_accept(elem, visitor)
+                elif isinstance(field, SourceElement):
+                    getattr_accept(field, visitor)
+    getattr(visitor, 'leave_' + class_name)(node)
+
+def getattr_type_check(node, visitor):
+    class_name = node.__class__.__name__
+    visit = getattr(visitor, 'visit_' + class_name)
+    typeid = None
+    if visit(node):
+        typeid = getattr(visitor, 'typeof_' + class_name)(node)
+    getattr(visitor, 'leave_' + class_name)(node)
+    return typeid
+
+def count_nodes(nodes):
+    count = 0
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        count += 1
+        for f in node._fields:
+            field = getattr(node, f)
+            if isinstance(field, list):
+                stack.extend(field)
+            elif field is not None:
+                stack.append(field)
+    return count
+
+def main(megabytes):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+    ast = compiler.parse_str(examples_corpus(int(megabytes * 1e6)))
+    nodes = count_nodes(ast)
+    print('{0} nodes'.format(nodes))
+    visitor = Visitor()
+
+    def run(accept):
+        for _class in ast:
+            accept(_class, visitor)
+
+    results = [('accept', 'table', SourceElement.accept),
+               ('accept', 'getattr', getattr_accept),
+               ('type_check', 'table', SourceElement.type_check)]
+    for name, lookup, accept in results:
+        elapsed, _ = best_of(lambda: run(accept))
+        print('{0:10} {1:8} {2:8.1f} ms {3:7.0f} ns/node'.format(
+            name, lookup, elapsed * 1e3, elapsed * 1e9 / nodes))
+
+    # getattr lookups for type_check: swap the method for the run
+    table = SourceElement.type_check
+    SourceElement.type_check = getattr_type_check
+    try:
+        elapsed, _ = best_of(lambda: run(SourceElement.type_check))
+    finally:
+        SourceElement.type_check = table
+    print('{0:10} {1:8} {2:8.1f} ms {3:7.0f} ns/node'.format(
+        'type_check', 'getattr', elapsed * 1e3, elapsed * 1e9 / nodes))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
@@ -0,0 +1,93 @@
+'''
+Memory and full traversal time of a large synthetic program (the
+example programs concatenated) as cool.model node objects and as a
+cool.flat.FlatAST: retained bytes per node measured with tracemalloc,
+and a visitor walking every node through accept(), on the nodes and on
+the views of the FlatAST, and a scan of the FlatAST arrays.
+
+    PYTHONPATH=. python bench/bench_flat.py [megabytes]
+'''
+import gc
+import sys
+import time
+import tracemalloc
+
+import cool
+from cool.flat import FlatAST
+from cool.serialization import CLASSES
+from synthetic import examples_corpus
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+class Counter(object):
+    '''visitor counting the nodes it visits'''
+
+    def __init__(self):
+        self.count = 0
+
+    def visit(self, node):
+        self.count += 1
+        return True
+
+    def leave(self, node):
+        pass
+
+    def __getattr__(self, name):
+        return self.visit if name.startswith('visit_') else self.leave
+
+def traverse(program):
+    counter = Counter()
+    for _class in program:
+        _class.accept(counter)
+    return counter.count
+
+def scan(flat):
+    '''nodes of each class, from the arrays only'''
+    counts = [0] * len(CLASSES)
+    for kind in flat.kinds:
+        counts[kind] += 1
+    return sum(counts)
+
+def retained(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+def main(megabytes):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+    text = examples_corpus(int(megabytes * 1e6))
+
+    tree_size, ast = retained(lambda: compiler.parse_str(text))
+    flat_size, flat = retained(lambda: FlatAST.from_tree(ast))
+    nodes = len(flat)
+    print('{0} nodes'.format(nodes))
+    print('{0:8} {1:9.2f} MB {2:7.1f} bytes/node'.format(
+        'tree', tree_size / 1e6, tree_size / nodes))
+    print('{0:8} {1:9.2f} MB {2:7.1f} bytes/node'.format(
+        'flat', flat_size / 1e6, flat_size / nodes))
+
+    views = flat.classes()
+    for name, walk in [('tree', lambda: traverse(ast)),
+                       ('views', lambda: traverse(views)),
+                       ('arrays', lambda: scan(flat))]:
+        elapsed, count = best_of(walk)
+        assert count == nodes
+        print('{0:8} traversal {1:8.1f} ms'.format(name, elapsed * 1e3))
+
+    elapsed, _ = best_of(lambda: FlatAST.from_tree(ast))
+    print('from_tree {0:8.1f} ms'.format(elapsed * 1e3))
+    elapsed, _ = best_of(flat.to_tree)
+    print('to_tree   {0:8.1f} ms'.format(elapsed * 1e3))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,73 @@
+'''
+Memory of a large synthetic program (the example programs concatenated)
+with its leaf nodes interned in a cool.hashcons.InternTable, and time
+of comparing the classes of two parses of it: equal, with the leaves
+interned, and differing, before and after the classes are frozen.
+
+    PYTHONPATH=. python bench/bench_hashcons.py [megabytes]
+'''
+import gc
+import sys
+import time
+import tracemalloc
+
+import cool
+from cool import query
+from cool.hashcons import InternTable
+from synthetic import examples_corpus
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def retained(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+def main(megabytes):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+    text = examples_corpus(int(megabytes * 1e6))
+    nodes = sum(1 for _ in query.walk(compiler.parse_str(text)))
+    print('{0} nodes'.format(nodes))
+
+    plain_size, plain = retained(lambda: compiler.parse_str(text))
+    table = InternTable()
+    interned_size, interned = retained(
+        lambda: table.intern_program(compiler.parse_str(text)))
+    print('{0:24} {1:8.2f} MB {2:7.1f} bytes/node'.format(
+        'plain', plain_size / 1e6, plain_size / nodes))
+    print('{0:24} {1:8.2f} MB {2:7.1f} bytes/node  {3} leaves shared'
+          .format('interned', interned_size / 1e6, interned_size / nodes,
+                  table.hits))
+    del plain, interned
+
+    def compare(name, first, second):
+        elapsed, equal = timed(lambda: [a == b for a, b in
+                                        zip(first, second)])
+        print('{0:24} {1:8.2f} ms  {2} of {3} classes equal'.format(
+            name, elapsed * 1e3, sum(equal), len(equal)))
+
+    first, second = compiler.parse_str(text), compiler.parse_str(text)
+    compare('equal', first, second)
+    table = InternTable()
+    compare('equal, interned', table.intern_program(first),
+            table.intern_program(second))
+
+    # the classes using out_string differ, in one of its invocations
+    first = compiler.parse_str(text)
+    second = compiler.parse_str(text.replace('out_string', 'out_strinG'))
+    compare('unequal', first, second)
+    table = InternTable()
+    elapsed, _ = timed(lambda: (table.freeze_program(first),
+                                table.freeze_program(second)))
+    print('{0:24} {1:8.2f} ms'.format('freezing both', elapsed * 1e3))
+    compare('unequal, frozen', first, second)
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
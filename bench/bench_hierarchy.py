@@ -0,0 +1,94 @@
+'''
+Validation, subtype tests and common ancestors in a hierarchy of
+chains of classes 1000 deep, walking the parent chains against the
+frozen SymbolTable index, and type checking a program assigning
+objects of the deepest classes to variables of the top ones.
+
+    PYTHONPATH=. python bench/bench_hierarchy.py [depth]
+'''
+import contextlib
+import io
+import random
+import sys
+import time
+
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def hierarchy(depth, chains=4):
+    types = {'Object': None}
+    for chain in range(chains):
+        parent = 'Object'
+        for level in range(depth):
+            typeid = 'C{0}_{1}'.format(chain, level)
+            types[typeid] = parent
+            parent = typeid
+    return types
+
+def program(depth):
+    '''classes A0 inheriting ... A<depth-1>, checked assignments'''
+    classes = ['class A0 { f() : Int { 0 }; };']
+    for level in range(1, depth):
+        classes.append('class A{0} inherits A{1} {{ }};'.format(
+            level, level - 1))
+    body = ' '.join('top <- new A{0}; top <- if true then new A{0} '
+                    'else new A{1} fi;'.format(depth - 1, depth // 2)
+                    for _ in range(200))
+    classes.append('class Main {{ top : A0; main() : A0 {{ {{ {0} top; }} }};'
+                   ' }};'.format(body))
+    return '\n'.join(classes)
+
+def main(depth):
+    types = hierarchy(depth)
+    rng = random.Random(1)
+    names = list(types)
+    pairs = [(rng.choice(names), rng.choice(names)) for _ in range(2000)]
+    print('{0} types, {1} pairs'.format(len(types), len(pairs)))
+
+    for frozen in (False, True):
+        table = symantic_analyzer.SymbolTable()
+        for typeid, parentid in types.items():
+            table.add_type(typeid, parentid)
+        if frozen:
+            elapsed, _ = best_of(table.validate)
+            print('{0:24} {1:9.2f} ms'.format('validate', elapsed * 1e3))
+            elapsed, _ = best_of(table.freeze)
+            print('{0:24} {1:9.2f} ms'.format('freeze', elapsed * 1e3))
+        name = 'frozen' if frozen else 'walking'
+        elapsed, _ = best_of(lambda: [table.is_parent(a, b)
+                                      for a, b in pairs])
+        print('{0:24} {1:9.2f} us/call'.format(
+            'is_parent ' + name, elapsed * 1e6 / len(pairs)))
+        elapsed, _ = best_of(lambda: [table.common_ancestor([a, b])
+                                      for a, b in pairs])
+        print('{0:24} {1:9.2f} us/call'.format(
+            'common_ancestor ' + name, elapsed * 1e6 / len(pairs)))
+
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner',
+                             engine='rd')
+    ast = compiler.parse_fileset([]) + compiler.parse_str(program(depth))
+    def check():
+        with contextlib.redirect_stdout(io.StringIO()):
+            symantic_analyzer.TypeChecker(ast).type_check('Main')
+
+    freeze = symantic_analyzer.SymbolTable.freeze
+    symantic_analyzer.SymbolTable.freeze = lambda table: None
+    try:
+        elapsed, _ = best_of(check)
+    finally:
+        symantic_analyzer.SymbolTable.freeze = freeze
+    print('{0:24} {1:9.2f} ms'.format('type check walking', elapsed * 1e3))
+    elapsed, _ = best_of(check)
+    print('{0:24} {1:9.2f} ms'.format('type check frozen', elapsed * 1e3))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,51 @@
+'''
+Checking again a generated program of many classes after editing one
+class: a full type check against TypeChecker.recheck of the edited
+class, for a method body edit in a leaf class and in a class near the
+root, and for a signature edit in a class near the root.
+
+    PYTHONPATH=. python bench/bench_incremental.py [classes]
+'''
+import sys
+import time
+
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+from synthetic import class_tree, tree_class
+
+def best_of(func, runs=5, undo=None):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        if undo is not None:
+            undo()
+    return best, result
+
+def main(count):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner',
+                             engine='rd')
+    ast = compiler.parse_fileset([]) + compiler.parse_str(class_tree(count))
+    checker = symantic_analyzer.TypeChecker(ast)
+    full, _ = best_of(checker.type_check)
+    print('{0} classes, full check {1:8.2f} ms'.format(count, full * 1e3))
+
+    leaf = count - 1
+    edits = [
+        ('leaf body', leaf, tree_class(leaf).replace('a - 1', 'a - 2')),
+        ('root body', 1, tree_class(1).replace('a - 1', 'a - 2')),
+        ('root new method', 1, tree_class(1).replace(
+            'v1 : Int', 'k1() : Int { 0 }; v1 : Int')),
+    ]
+    for name, i, text in edits:
+        changed = compiler.parse_str(text)
+        original = compiler.parse_str(tree_class(i))
+        elapsed, checked = best_of(lambda: checker.recheck(changed),
+                                   undo=lambda: checker.recheck(original))
+        print('{0:15} {1:8.2f} ms  {2:5} classes checked  speedup {3:6.1f}'
+              .format(name, elapsed * 1e3, len(checked), full / elapsed))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4000)
@@ -0,0 +1,35 @@
+'''
+Lexer throughput in MB/s: PLY lexer built from CoolLexer versus the
+hand written CoolScanner, on the example programs concatenated up to
+the requested size.
+
+    PYTHONPATH=. python bench/bench_lexer.py [megabytes]
+'''
+import sys
+import time
+
+import cool
+from synthetic import examples_corpus
+
+def throughput(lexer, text, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        lexer.input(text)
+        count = 0
+        for tok in lexer:
+            count += 1
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, len(text) / best / 1e6
+
+def main(megabytes):
+    text = examples_corpus(int(megabytes * 1e6))
+    print('input: {0:.2f} MB'.format(len(text) / 1e6))
+    for engine in ('ply', 'scanner'):
+        lexer = cool.Compiler(optimize=True, lexer_engine=engine).lexer
+        count, mbs = throughput(lexer, text)
+        print('{0:8} {1:9} tokens {2:7.2f} MB/s'.format(engine, count, mbs))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
@@ -0,0 +1,50 @@
+'''
+Memory retained by the ASTs of the example programs and of a large
+synthetic program (the examples concatenated), in bytes per node,
+measured with tracemalloc.
+
+    PYTHONPATH=. python bench/bench_memory.py [megabytes]
+'''
+import sys
+import tracemalloc
+
+import cool
+from synthetic import example_files, examples_corpus
+
+def count_nodes(nodes):
+    count = 0
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        count += 1
+        for f in node._fields:
+            field = getattr(node, f)
+            if isinstance(field, list):
+                stack.extend(field)
+            elif field is not None:
+                stack.append(field)
+    return count
+
+def measure(name, parse):
+    tracemalloc.start()
+    ast = parse()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = count_nodes(ast)
+    print('{0:10} {1:9} nodes {2:9.2f} MB {3:7.1f} bytes/node'.format(
+        name, nodes, retained / 1e6, retained / nodes))
+
+def main(megabytes):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+    sources = []
+    for filename in example_files():
+        with open(filename) as f:
+            sources.append(f.read())
+    measure('examples', lambda: [_class for source in sources
+                                 for _class in compiler.parse_str(source)])
+
+    text = examples_corpus(int(megabytes * 1e6))
+    measure('synthetic', lambda: compiler.parse_str(text))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,84 @@
+'''
+Type checking a generated program of classes each inheriting the
+previous one and invoking the methods of their ancestors, with the
+method resolution tables of the TypeChecker against the scans of the
+program they replace.
+
+    PYTHONPATH=. python bench/bench_methods.py [classes]
+'''
+import contextlib
+import io
+import sys
+import time
+
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def program(count):
+    classes = ['class C0 { m0() : Int { 0 }; };']
+    for i in range(1, count):
+        calls = ' + '.join('m{0}()'.format(j)
+                           for j in (0, i // 2, i - 1))
+        classes.append('class C{0} inherits C{1} {{ m{0}() : Int {{ {2} }};'
+                       ' }};'.format(i, i - 1, calls))
+    return '\n'.join(classes)
+
+def scanning_get_method_sign(self, typeid, mthd):
+    # the scans replaced, walking up the parents in a loop: the
+    # recursion reached the recursion limit in deep hierarchies
+    while typeid is not None:
+        for _class in self._ast:
+            if _class.name == typeid:
+                if any(m.name == mthd for m in _class.methods):
+                    for m in _class.methods:
+                        if m.name == mthd:
+                            return m.get_signature()
+                break
+        typeid = self._sym_table.get_parent(typeid)
+
+def main(count):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner',
+                             engine='rd')
+    ast = compiler.parse_fileset([]) + compiler.parse_str(program(count))
+    names = [_class.name for _class in ast]
+    print('{0} classes'.format(len(ast)))
+
+    def check_all():
+        with contextlib.redirect_stdout(io.StringIO()):
+            checker = symantic_analyzer.TypeChecker(ast)
+            checker.type_check()
+
+    def check_each():
+        with contextlib.redirect_stdout(io.StringIO()):
+            checker = symantic_analyzer.TypeChecker(ast)
+            for name in names:
+                checker.type_check(name)
+
+    elapsed, _ = best_of(lambda: symantic_analyzer.TypeChecker(ast))
+    print('{0:28} {1:9.1f} ms'.format('TypeChecker()', elapsed * 1e3))
+    tables = symantic_analyzer.TypeChecker.get_method_sign
+    symantic_analyzer.TypeChecker.get_method_sign = scanning_get_method_sign
+    try:
+        elapsed, _ = best_of(check_all, runs=1)
+    finally:
+        symantic_analyzer.TypeChecker.get_method_sign = tables
+    print('{0:28} {1:9.1f} ms'.format('type_check() scanning',
+                                      elapsed * 1e3))
+    elapsed, _ = best_of(check_all)
+    print('{0:28} {1:9.1f} ms'.format('type_check() tables',
+                                      elapsed * 1e3))
+    elapsed, _ = best_of(check_each)
+    print('{0:28} {1:9.1f} ms'.format('type_check(name) each class',
+                                      elapsed * 1e3))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
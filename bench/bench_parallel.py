@@ -0,0 +1,44 @@
+'''
+parse_fileset over a set of files with 1, 2, 4, ... worker processes
+up to the number of cores, and the speedup over the serial parse.
+
+    PYTHONPATH=. python bench/bench_parallel.py [files] [max_jobs]
+'''
+import os
+import os.path as osp
+import sys
+import tempfile
+import time
+
+import cool
+from synthetic import make_fileset
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(count, max_jobs):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+    with tempfile.TemporaryDirectory() as directory:
+        fileset = make_fileset(directory, count)
+        size = sum(osp.getsize(f) for f in fileset) / 1e6
+        print('{0} files, {1:.2f} MB, {2} cores'.format(
+            count, size, os.cpu_count()))
+
+        serial = best_of(lambda: compiler.parse_fileset(fileset))
+        print('serial   {0:8.1f} ms'.format(serial * 1e3))
+        jobs = 2
+        while jobs <= max_jobs:
+            elapsed = best_of(lambda: compiler.parse_fileset(fileset, jobs))
+            print('jobs {0:<3} {1:8.1f} ms  speedup {2:5.2f}'.format(
+                jobs, elapsed * 1e3, serial / elapsed))
+            jobs *= 2
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 400,
+         int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count())
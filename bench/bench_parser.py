@@ -0,0 +1,41 @@
+'''
+Parse throughput of the LALR parser generated by PLY against the
+recursive descent RDParser, with both lexers. parse_buffer replays a
+TokenBuffer built beforehand, so it measures the parser alone.
+
+    PYTHONPATH=. python bench/bench_parser.py [megabytes]
+'''
+import sys
+import time
+
+import cool
+from synthetic import examples_corpus
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(megabytes):
+    text = examples_corpus(int(megabytes * 1e6))
+    size = len(text) / 1e6
+    print('input: {0:.2f} MB'.format(size))
+
+    for lexer_engine in ('ply', 'scanner'):
+        for engine in ('lalr', 'rd'):
+            compiler = cool.Compiler(optimize=True, engine=engine,
+                                     lexer_engine=lexer_engine)
+            buf = compiler.tokenize_buffer(text)
+            parse_str = best_of(lambda: compiler.parse_str(text))
+            parse_buffer = best_of(lambda: compiler.parse_buffer(buf))
+            print('{0:8} {1:5} parse_str {2:6.2f} MB/s  '
+                  'parse_buffer {3:6.2f} MB/s'.format(
+                      lexer_engine, engine, size / parse_str,
+                      size / parse_buffer))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
@@ -0,0 +1,71 @@
+'''
+Finding every invocation of out_string in a large synthetic program
+(the example programs concatenated): a visitor pass over the program,
+select(), and a NodeIndex built once then queried.
+
+    PYTHONPATH=. python bench/bench_query.py [megabytes]
+'''
+import sys
+import time
+
+import cool
+from cool import query
+from synthetic import examples_corpus
+
+def best_of(func, runs=5):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+class Invocations(object):
+    '''visitor collecting the invocations of a method'''
+
+    def __init__(self, name):
+        self.name = name
+        self.found = []
+
+    def visit(self, node):
+        return True
+
+    def leave(self, node):
+        pass
+
+    def visit_MethodInvoke(self, node):
+        if node.name == self.name:
+            self.found.append(node)
+        return True
+
+    def __getattr__(self, name):
+        return self.visit if name.startswith('visit_') else self.leave
+
+def visitor_pass(ast, name):
+    visitor = Invocations(name)
+    for _class in ast:
+        _class.accept(visitor)
+    return visitor.found
+
+def main(megabytes):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+    ast = compiler.parse_str(examples_corpus(int(megabytes * 1e6)))
+    print('{0} nodes'.format(sum(1 for _ in query.walk(ast))))
+
+    build, index = best_of(lambda: query.NodeIndex(ast))
+    print('{0:32} {1:9.3f} ms'.format('NodeIndex build', build * 1e3))
+    for name in ['out_string', 'in_int', 'cell_at_next_evolution']:
+        expected = visitor_pass(ast, name)
+        for how, find in [
+                ('visitor', lambda: visitor_pass(ast, name)),
+                ('select', lambda: list(query.select(ast, 'MethodInvoke',
+                                                     name))),
+                ('index', lambda: index.find('MethodInvoke', name))]:
+            elapsed, found = best_of(find)
+            assert found == expected
+            print('{0:32} {1:9.3f} ms  {2} found'.format(
+                name + ' ' + how, elapsed * 1e3, len(found)))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
@@ -0,0 +1,53 @@
+'''
+Parse time of long sequences (classes, features, block statements,
+arguments, let variables, case branches) from 10 to 100,000 elements.
+Time per element should stay flat as the sequences grow.
+
+    PYTHONPATH=. python bench/bench_sequences.py [max_elements]
+'''
+import sys
+import time
+
+import cool
+
+def method(body):
+    return 'class A {{ f() : Int {{ {0} }}; }};\n'.format(body)
+
+SEQUENCES = [
+    ('classes', lambda n: ''.join('class A{0} {{ }};\n'.format(i)
+                                  for i in range(n))),
+    ('features', lambda n: 'class A {\n' + ''.join(
+        'a{0} : Int;\n'.format(i) for i in range(n)) + '};\n'),
+    ('formal args', lambda n: 'class A { f(' + ', '.join(
+        'a{0} : Int'.format(i) for i in range(n)) + ') : Int { 1 }; };\n'),
+    ('block statements', lambda n: method('{' + ' 1;' * n + ' }')),
+    ('actual args', lambda n: method('g(' + ', '.join(['1'] * n) + ')')),
+    ('let variables', lambda n: method('let ' + ', '.join(
+        'a{0} : Int'.format(i) for i in range(n)) + ' in 1')),
+    ('case branches', lambda n: method('case 1 of ' + ''.join(
+        'a{0} : Int => 1; '.format(i) for i in range(n)) + 'esac')),
+]
+
+def main(max_elements):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+    sizes = []
+    n = 10
+    while n <= max_elements:
+        sizes.append(n)
+        n *= 10
+
+    print('{0:18}'.format('') + ''.join('{0:>12}'.format(n) for n in sizes)
+          + '   (us per element)')
+    for name, make in SEQUENCES:
+        row = '{0:18}'.format(name)
+        compiler.parse_str(make(10)) # warm up
+        for n in sizes:
+            source = make(n)
+            start = time.perf_counter()
+            compiler.parse_str(source)
+            elapsed = time.perf_counter() - start
+            row += '{0:12.2f}'.format(elapsed / n * 1e6)
+        print(row)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,55 @@
+'''
+Encode and decode time and size of the ASTs of the example programs,
+cool.serialization against pickle. One stream or pickle per program,
+like the entries of an ASTCache.
+
+    PYTHONPATH=. python bench/bench_serialization.py [copies]
+'''
+import gc
+import pickle
+import sys
+import time
+
+import cool
+from cool import serialization
+from synthetic import example_files
+
+def best_of(func, runs=5):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def report(name, encode, decode, size):
+    print('{0:14} encode {1:7.1f} ms  decode {2:7.1f} ms  {3:9.1f} kB'
+          .format(name, encode * 1e3, decode * 1e3, size / 1e3))
+
+def main(copies):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner')
+    programs = []
+    for filename in example_files():
+        ast = compiler.parse_file(filename)
+        for _class in ast:
+            _class.source = None
+        programs.append(ast)
+    programs *= copies
+    print('{0} programs'.format(len(programs)))
+
+    gc.disable() # as parse_fileset(pause_gc=True), the ASTs hold no cycles
+    encode, data = best_of(lambda: [
+        pickle.dumps(ast, pickle.HIGHEST_PROTOCOL) for ast in programs])
+    decode, _ = best_of(lambda: [pickle.loads(d) for d in data])
+    report('pickle', encode, decode, sum(map(len, data)))
+
+    encode, data = best_of(lambda: [
+        serialization.dumps(ast) for ast in programs])
+    decode, result = best_of(lambda: [serialization.loads(d)
+                                      for d in data])
+    report('serialization', encode, decode, sum(map(len, data)))
+    assert result == programs
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
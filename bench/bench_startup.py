@@ -0,0 +1,43 @@
+'''
+Compiler startup time: debug table generation versus the optimized
+table cache, cold (empty table directory) and warm.
+
+    PYTHONPATH=. python bench/bench_startup.py [runs]
+'''
+import os.path as osp
+import shutil
+import subprocess
+import sys
+import tempfile
+
+SNIPPET = '''
+import cool
+cool.Compiler({args})
+print(cool.Compiler.load_time)
+'''
+
+def load_time(args, cwd):
+    out = subprocess.check_output([sys.executable, '-c',
+                                   SNIPPET.format(args=args)], cwd=cwd)
+    return float(out.decode().split()[-1])
+
+def main(runs):
+    root = osp.dirname(osp.dirname(osp.abspath(__file__)))
+    table_dir = tempfile.mkdtemp()
+    args = 'optimize=True, table_dir={0!r}'.format(table_dir)
+    try:
+        debug = [load_time('', root) for _ in range(runs)]
+        cold = []
+        for _ in range(runs):
+            shutil.rmtree(table_dir)
+            cold.append(load_time(args, root))
+        warm = [load_time(args, root) for _ in range(runs)]
+    finally:
+        shutil.rmtree(table_dir, ignore_errors=True)
+
+    for name, times in (('debug', debug), ('cold', cold), ('warm', warm)):
+        print('{0:6} best {1:8.2f} ms  mean {2:8.2f} ms'.format(
+            name, min(times) * 1e3, sum(times) / len(times) * 1e3))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
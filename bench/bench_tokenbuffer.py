@@ -0,0 +1,63 @@
+'''
+Memory and time of the token list API (tokenize_str, then parse_str
+lexing the input again) against the TokenBuffer API (tokenize_buffer,
+then parse_buffer reusing the same lex pass).
+
+    PYTHONPATH=. python bench/bench_tokenbuffer.py [megabytes]
+'''
+import sys
+import time
+import tracemalloc
+
+import cool
+from synthetic import examples_corpus
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def measure(func):
+    elapsed = best_of(func)
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, retained, peak
+
+def report(name, elapsed, retained=None, peak=None):
+    line = '{0:40} {1:9.1f} ms'.format(name, elapsed * 1e3)
+    if retained is not None:
+        line += '  retained {0:8.1f} MB  peak {1:8.1f} MB'.format(
+            retained / 1e6, peak / 1e6)
+    print(line)
+
+def main(megabytes):
+    text = examples_corpus(int(megabytes * 1e6))
+    print('input: {0:.2f} MB, {1} lines'.format(len(text) / 1e6,
+                                               text.count('\n')))
+
+    for engine in ('ply', 'scanner'):
+        compiler = cool.Compiler(optimize=True, lexer_engine=engine)
+
+        report(engine + ' tokenize_str',
+               *measure(lambda: compiler.tokenize_str(text)))
+        report(engine + ' tokenize_buffer',
+               *measure(lambda: compiler.tokenize_buffer(text)))
+
+        def two_passes():
+            compiler.tokenize_str(text)
+            compiler.parse_str(text)
+        report(engine + ' tokenize_str + parse_str', best_of(two_passes))
+
+        def one_pass():
+            compiler.parse_buffer(compiler.tokenize_buffer(text))
+        report(engine + ' tokenize_buffer + parse_buffer', best_of(one_pass))
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 2)
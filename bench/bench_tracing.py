@@ -0,0 +1,100 @@
+'''
+Building and type checking the example programs that type check,
+repeated copies times, with the print() calls the analyzer visitors
+used to make (to a discarded stream), with no tracer, and with a
+CountingTracer and a LoggingTracer whose logger is disabled.
+
+    PYTHONPATH=. python bench/bench_tracing.py [copies]
+'''
+import contextlib
+import logging
+import os
+import os.path as osp
+import sys
+import time
+
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+from cool import tracing
+from synthetic import EXAMPLES
+
+CHECKED = ['arith', 'atoi', 'book_list', 'cells', 'complex', 'cool',
+           'hello_world', 'lam', 'list', 'new_complex', 'palindrome',
+           'primes', 'sort_list']
+
+def best_of(func, runs=5):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+class Printing(symantic_analyzer.TypeChecker):
+    '''the print() calls the tracer replaces'''
+
+    def visit_ClassDefinition(self, class_def):
+        print('visiting class def :', class_def.name)
+        return super(Printing, self).visit_ClassDefinition(class_def)
+
+    def leave_ClassDefinition(self, class_def):
+        print('leaving class def')
+        super(Printing, self).leave_ClassDefinition(class_def)
+
+    def visit_VariableDeclaration(self, var_decl):
+        print('visiting variable decl : ({0}, {1})'.format(
+            var_decl.name, var_decl.typeid))
+        return super(Printing, self).visit_VariableDeclaration(var_decl)
+
+    def leave_VariableDeclaration(self, var_decl):
+        print('leaving variable decl : ', var_decl)
+
+    def visit_MethodDefinition(self, method_def):
+        print('visiting method def :', method_def.name)
+        return super(Printing, self).visit_MethodDefinition(method_def)
+
+    def visit_LetExpression(self, let_exp):
+        print('visiting let expression :')
+        return super(Printing, self).visit_LetExpression(let_exp)
+
+    def visit_CaseStatement(self, arg):
+        print('visiting case statement :')
+        return super(Printing, self).visit_CaseStatement(arg)
+
+    def leave_CaseStatement(self, arg):
+        print('leaving case statement :')
+        super(Printing, self).leave_CaseStatement(arg)
+
+def check(checker_class, programs, tracer=None):
+    for ast in programs:
+        if tracer is None:
+            checker_class(ast).type_check()
+        else:
+            checker_class(ast, tracer).type_check()
+
+def main(copies):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner',
+                             engine='rd')
+    programs = [compiler.parse_fileset([osp.join(EXAMPLES, name + '.cl')])
+                for name in CHECKED] * copies
+
+    logger = logging.getLogger('cool.bench')
+    logger.disabled = True
+    runs = [
+        ('print()', Printing, None),
+        ('no tracer', symantic_analyzer.TypeChecker, None),
+        ('counting', symantic_analyzer.TypeChecker,
+         tracing.CountingTracer()),
+        ('logging off', symantic_analyzer.TypeChecker,
+         tracing.LoggingTracer(logger)),
+    ]
+    with open(os.devnull, 'w') as devnull:
+        for name, checker_class, tracer in runs:
+            with contextlib.redirect_stdout(devnull):
+                elapsed, _ = best_of(
+                    lambda: check(checker_class, programs, tracer))
+            print('{0:12} {1:8.2f} ms'.format(name, elapsed * 1e3))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
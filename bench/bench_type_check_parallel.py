@@ -0,0 +1,44 @@
+'''
+Type checking a generated program of many classes, each deriving from
+one of the classes before it and calling inherited methods, serially
+and with 2, 4, ... worker processes up to the number of cores, and the
+speedup over the serial check.
+
+    PYTHONPATH=. python bench/bench_type_check_parallel.py [classes] [max_jobs]
+'''
+import os
+import sys
+import time
+
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+from synthetic import class_tree
+
+def best_of(func, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(count, max_jobs):
+    compiler = cool.Compiler(optimize=True, lexer_engine='scanner',
+                             engine='rd')
+    ast = compiler.parse_fileset([]) + compiler.parse_str(class_tree(count))
+    checker = symantic_analyzer.TypeChecker(ast)
+    print('{0} classes, {1} cores'.format(count, os.cpu_count()))
+
+    serial = best_of(checker.type_check)
+    print('serial   {0:8.1f} ms'.format(serial * 1e3))
+    jobs = 2
+    while jobs <= max_jobs:
+        elapsed = best_of(lambda: checker.type_check(jobs=jobs))
+        print('jobs {0:<3} {1:8.1f} ms  speedup {2:5.2f}'.format(
+            jobs, elapsed * 1e3, serial / elapsed))
+        jobs *= 2
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else max(2, os.cpu_count()))
@@ -0,0 +1,57 @@
+'''Inputs shared by the benchmarks'''
+import glob
+import os.path as osp
+import shutil
+
+ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+EXAMPLES = osp.join(ROOT, 'test', 'resources', 'examples')
+
+def example_files():
+    return sorted(glob.glob(osp.join(EXAMPLES, '*.cl')))
+
+def examples_corpus(size):
+    '''The example programs concatenated, repeated up to size chars'''
+    text = ''
+    for filename in example_files():
+        with open(filename) as f:
+            text += f.read() + '\n'
+    return text * max(1, size // len(text))
+
+def make_fileset(directory, count):
+    '''count copies of the example programs in directory'''
+    examples = example_files()
+    fileset = []
+    for i in range(count):
+        filename = osp.join(directory, 'file{0:04}.cl'.format(i))
+        shutil.copy(examples[i % len(examples)], filename)
+        fileset.append(filename)
+    return fileset
+
+CLASS = '''
+class C{0} inherits {1} {{
+    v{0} : Int <- {0};
+    f{0}(x : Int, y : Int) : Int {{
+        let a : Int <- x + y, b : Int <- a * {0} in {{
+            while 0 < a loop a <- a - 1 pool;
+            if a < b then a + f{2}(b, a) else b - f{2}(a, b) fi;
+        }}
+    }};
+    g{0}(s : String) : {1} {{
+        case s of
+            t : String => new {1};
+            o : Object => self;
+        esac
+    }};
+}};
+'''
+
+def tree_class(i):
+    '''class C{i} of class_tree, deriving from C{(i - 1) // 2}'''
+    if i == 0:
+        return 'class C0 { f0(x : Int, y : Int) : Int { x + y }; };'
+    parent = (i - 1) // 2
+    return CLASS.format(i, 'C{0}'.format(parent), parent)
+
+def class_tree(count):
+    '''A program of count classes calling the methods of their parents'''
+    return ''.join(tree_class(i) for i in range(count))
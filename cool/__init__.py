@@ -1,34 +1,165 @@
-__all__ = ['model', 'parser']
+__all__ = ['astcache', 'flat', 'hashcons', 'model', 'parser', 'position',
+           'query', 'rdparser', 'scanner', 'serialization', 'tables',
+           'tokenbuffer', 'tracing']
 
+import contextlib
+import copy
+import gc
+import os
 import os.path as osp
+import queue
+import threading
 import ply.lex as lex
 import ply.yacc as yacc
 from . parser import CoolLexer
 from . parser import CoolParser
+from . scanner import CoolScanner
+from . rdparser import RDParser
+from . position import LineIndex
+from . tokenbuffer import TokenBuffer
+from . astcache import ASTCache
+from . import serialization
+from . import tables
 import logging
 import pkgutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from ply.lex import LexToken
+
+class ParseError(Exception):
+    '''
+    A file of a fileset that could not be lexed or parsed. It only
+    carries strings, so it can be raised in a worker process.
+    '''
+
+    def __init__(self, filename, message):
+        super(ParseError, self).__init__(filename, message)
+        self.filename = filename
+        self.message = message
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.filename, self.message)
+
+    @classmethod
+    def from_error(cls, filename, err):
+        '''from the Exception(token) raised by the lexer or parser'''
+        t = err.args[0] if err.args else None
+        if t is None:
+            message = 'syntax error at end of input'
+        elif not isinstance(t, LexToken):
+            message = str(err)
+        elif t.type == 'error':
+            message = "illegal character '{0}' at {1}".format(
+                t.value[0], CoolLexer.find_location(t))
+        elif t.type == 'eof':
+            message = 'EOF in comment at ' + CoolLexer.find_location(t)
+        else:
+            message = "syntax error at '{0}' at {1}".format(
+                t.value, CoolLexer.find_location(t))
+        return cls(filename, message)
 
 class Compiler():
+    '''
+    The lexer and parser loaded on the class only hold the generated
+    tables and are never used to parse. Each instance works on its own
+    clone of them, so instances can be used from different threads at
+    the same time; one instance must not be shared between threads.
+
+    The tables are loaded once per mode: debug, or optimized from a
+    table directory. lexer, parser, optimized and load_time of the
+    class are those of the last mode loaded.
+    '''
     loaded = False
+    optimized = False
+    load_time = None
+    _load_lock = threading.Lock()
+    _loaded = {} # mode -> (lexer, parser) loaded for it
+
+    def __init__(self, optimize=False, table_dir=None, lexer_engine='ply',
+                 engine='lalr', ast_cache=None):
+        '''
+        optimize : load the lexer and parser from versioned tables kept
+                   in table_dir (default tables.default_table_dir())
+                   instead of regenerating them with debug output
+        lexer_engine : 'ply' for the PLY lexer built from CoolLexer,
+                       'scanner' for the hand written CoolScanner
+        engine : 'lalr' for the PLY parser built from CoolParser,
+                 'rd' for the recursive descent RDParser
+        ast_cache : ASTCache, or the directory of one, reused by
+                    parse_str, parse_file and parse_fileset for inputs
+                    parsed before
+        '''
+        if isinstance(ast_cache, str):
+            ast_cache = ASTCache(ast_cache)
+        self.ast_cache = ast_cache
+        self.options = dict(optimize=optimize, table_dir=table_dir,
+                            lexer_engine=lexer_engine, engine=engine,
+                            ast_cache=ast_cache)
+        mode = Compiler._mode(optimize, table_dir)
+        loaded = Compiler._loaded.get(mode)
+        if loaded is None:
+            with Compiler._load_lock:
+                if mode not in Compiler._loaded:
+                    Compiler.load(optimize, table_dir)
+                loaded = Compiler._loaded[mode]
+        lexer, parser = loaded
+        self.optimized = bool(optimize)
+
+        if lexer_engine == 'scanner':
+            self.lexer = CoolScanner()
+        elif lexer_engine == 'ply':
+            self.lexer = lexer.clone()
+        else:
+            raise ValueError('unknown lexer engine: ' + lexer_engine)
 
-    def __init__(self):
-        if Compiler.loaded == False:
-            Compiler.load()
+        if engine == 'rd':
+            self.parser = RDParser()
+        elif engine == 'lalr':
+            # shares the tables, parse() keeps its stacks on the copy
+            self.parser = copy.copy(parser)
+        else:
+            raise ValueError('unknown parser engine: ' + engine)
             
+    @staticmethod
+    def _mode(optimize, table_dir):
+        if not optimize:
+            return (False, None)
+        if table_dir is None:
+            table_dir = tables.default_table_dir()
+        return (True, osp.abspath(table_dir))
+
     @classmethod
-    def load(cls):
-        cls.lexer = lex.lex(module=CoolLexer(),
-                        debug=1,
-                        lextab='gencmd_lextab',
-                        debuglog=logging.getLogger(''),
-                        errorlog=logging.getLogger('')) 
-
-        cls.parser = yacc.yacc(module=CoolParser(),
-                           debug=True,
-                           tabmodule='cool_parsetab',
-                           start='program',
-                           debugfile='cool_parser.out')
+    def load(cls, optimize=False, table_dir=None):
+        start = time.perf_counter()
+
+        if optimize:
+            cls._load_tables(table_dir)
+        else:
+            cls.lexer = lex.lex(module=CoolLexer(),
+                            debug=1,
+                            lextab='gencmd_lextab',
+                            debuglog=logging.getLogger(''),
+                            errorlog=logging.getLogger('')) 
+
+            cls.parser = yacc.yacc(module=CoolParser(),
+                               debug=True,
+                               tabmodule='cool_parsetab',
+                               start='program',
+                               debugfile='cool_parser.out')
+        cls.optimized = bool(optimize)
+        cls.load_time = time.perf_counter() - start
         cls.loaded = True
+        cls._loaded[cls._mode(optimize, table_dir)] = (cls.lexer, cls.parser)
+
+    @classmethod
+    def _load_tables(cls, table_dir):
+        if table_dir is None:
+            table_dir = tables.default_table_dir()
+        os.makedirs(table_dir, exist_ok=True)
+
+        version = tables.grammar_version()
+        cls.lexer = tables.load_lexer(table_dir, version)
+        cls.parser = tables.load_parser(table_dir, version)
 
     def _get_string(self, arg):
         '''arg : can be a filename or string'''
@@ -45,38 +176,212 @@ class Compiler():
         the given input string'''
 
         result = list()
-        Compiler.lexer.lineno = 1
-        Compiler.lexer.input(input_str)
-        for tok in Compiler.lexer:
+        self.lexer.lineno = 1
+        self.lexer.line_index = LineIndex(input_str)
+        self.lexer.input(input_str)
+        for tok in self.lexer:
             if not tok:
                 break
             else:
-                result.append((tok.type, tok.value, Compiler.lexer.lineno))
+                result.append((tok.type, tok.value, self.lexer.lineno))
         return result
 
     def tokenize_file(self, filename):
         input_str = self._get_string(filename)
         return self.tokenize_str(input_str)
+
+    def tokenize_buffer(self, input_str, filename=None):
+        '''
+        Like tokenize_str, but returns a TokenBuffer holding the tokens
+        in typed arrays, which parse_buffer can parse without lexing
+        the input again'''
+        return TokenBuffer.from_lexer(self.lexer, input_str, filename)
         
-    def parse_str(self, input_str):
+    def parse_str(self, input_str, filename=None):
         '''Returns AST'''
-        return Compiler.parser.parse(input_str, lexer=Compiler.lexer)
+        index = LineIndex(input_str, filename)
+        cache = self.ast_cache
+        if cache is not None:
+            ast = cache.get(input_str)
+            if ast is not None:
+                return self._set_source(ast, index)
+
+        self.lexer.line_index = index
+        ast = self.parser.parse(input_str, lexer=self.lexer)
+        if cache is not None and ast is not None:
+            cache.put(input_str, ast) # stored without source
+        return self._set_source(ast, index)
+
+    def parse_buffer(self, buf):
+        '''Returns AST of the tokens in a TokenBuffer'''
+        ast = self.parser.parse(lexer=buf.lexer())
+        return self._set_source(ast, buf.line_index)
+
+    def _set_source(self, ast, index):
+        if ast is not None:
+            for _class in ast:
+                _class.source = index
+        return ast
 
     def parse_file(self, filename):
         input_str = self._get_string(filename)
-        return self.parse_str(input_str)
+        return self.parse_str(input_str, filename)
     
-    def parse_fileset(self, fileset):
+    def parse_fileset(self, fileset, jobs=1, pause_gc=False):
+        '''
+        Returns the AST of basic.cl followed by those of the .cl files
+        of fileset, in fileset order. With jobs > 1 the files are
+        parsed by that many worker processes, each with a Compiler
+        built with the options of this one. A file that fails to parse
+        raises ParseError, the first one in fileset order.
+
+        pause_gc : disable the garbage collector of the process while
+                   the files are parsed, which saves the collections
+                   scanning the nodes built so far. It is disabled for
+                   all the threads, and left to the caller.
+        '''
 
         basic_cl = pkgutil.get_data(__name__, 'basic.cl')
         ast_list = self.parse_str(str(basic_cl, encoding='utf-8'))
-        
-        for filename in fileset:
-            if osp.isfile(filename) and osp.splitext(filename)[1] == '.cl':
-                ast = self.parse_file(filename)
-                if ast is not None:
-                    ast_list.extend(ast)
+
+        filenames = [filename for filename in fileset
+                     if osp.isfile(filename)
+                     and osp.splitext(filename)[1] == '.cl']
+
+        if not pause_gc:
+            return self._parse_files(ast_list, filenames, jobs)
+        with _gc_paused():
+            return self._parse_files(ast_list, filenames, jobs)
+
+    def _parse_files(self, ast_list, filenames, jobs):
+        if jobs > 1 and len(filenames) > 1:
+            asts = [None] * len(filenames)
+            pending = list(range(len(filenames)))
+            if self.ast_cache is not None:
+                # cached files are loaded here, only the others are
+                # parsed (and stored) by the workers
+                pending = []
+                for i, filename in enumerate(filenames):
+                    input_str = self._get_string(filename)
+                    ast = self.ast_cache.get(input_str)
+                    if ast is None:
+                        pending.append(i)
+                    else:
+                        asts[i] = self._set_source(
+                            ast, LineIndex(input_str, filename))
+
+            if len(pending) > 1:
+                workers = min(jobs, len(pending))
+                # a few chunks per worker keeps them busy with few
+                # round trips
+                chunksize = max(1, len(pending) // (workers * 4))
+                with ProcessPoolExecutor(max_workers=workers,
+                                         initializer=_init_worker,
+                                         initargs=(self.options,)) as pool:
+                    parsed = pool.map(_parse_in_worker,
+                                      [filenames[i] for i in pending],
+                                      chunksize=chunksize)
+                    for i, result in zip(pending, parsed):
+                        asts[i] = self._from_worker(result)
+            else:
+                for i in pending:
+                    asts[i] = self._parse_member(filenames[i])
+        else:
+            asts = map(self._parse_member, filenames)
+
+        for ast in asts:
+            if ast is not None:
+                ast_list.extend(ast)
 
         return ast_list
 
-        
\ No newline at end of file
+    def _from_worker(self, result):
+        if result is None:
+            return None
+        data, index = result
+        return self._set_source(serialization.loads(data), index)
+
+    def _parse_member(self, filename):
+        '''parse_file raising ParseError'''
+        try:
+            return self.parse_file(filename)
+        except Exception as err:
+            raise ParseError.from_error(filename, err) from err
+
+@contextlib.contextmanager
+def _gc_paused():
+    '''
+    ASTs hold no reference cycles, but building or unpickling many
+    nodes triggers collections that scan all the nodes built so far.
+    '''
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+# Compiler of a parse_fileset worker process
+_worker = None
+
+def _init_worker(options):
+    global _worker
+    _worker = Compiler(**options)
+
+def _parse_in_worker(filename):
+    # sent back in the cool.serialization format, pickle recurses into
+    # the nodes and fails on deep ones
+    ast = _worker._parse_member(filename)
+    if not ast:
+        return None
+    return serialization.dumps(ast), ast[0].source
+
+        
+
+class CompilerPool():
+    '''
+    Bounded pool of Compiler instances for a multi threaded service.
+    Instances are created on demand up to size, acquire() blocks while
+    all of them are in use. options are passed to Compiler().
+    '''
+
+    def __init__(self, size, **options):
+        if size < 1:
+            raise ValueError('pool size must be at least 1')
+        self.size = size
+        self.options = options
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        '''Returns an idle Compiler, raises queue.Empty on timeout'''
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return Compiler(**self.options)
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, compiler):
+        self._idle.put(compiler)
+
+    @contextlib.contextmanager
+    def compiler(self, timeout=None):
+        '''with pool.compiler() as compiler: ...'''
+        compiler = self.acquire(timeout)
+        try:
+            yield compiler
+        finally:
+            self.release(compiler)
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import os.path as osp
+import tempfile
+import threading
+
+from . import serialization
+from . import tables
+
+
+class ASTCache(object):
+    '''
+    On disk cache of ASTs, keyed by the hash of the grammar version and
+    the source text, so an entry is only found for the same text parsed
+    with the same grammar. Entries are ASTs in the cool.serialization
+    format, which does not keep the source LineIndex: it depends on the
+    filename and is attached again by the Compiler.
+
+    Entries are written to a temporary file and renamed, so processes
+    sharing the directory only ever read complete entries. A hit
+    touches the entry; when the entries grow over max_size bytes the
+    least recently used ones are removed down to 3/4 of it.
+
+    hits, misses, stores and evictions count what this object did, in
+    this process.
+    '''
+
+    SUFFIX = '.ast'
+
+    def __init__(self, directory, max_size=256 * 2**20):
+        self.directory = directory
+        self.max_size = max_size
+        self.version = tables.grammar_version()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._size = None # bytes in the directory, counted on first store
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __reduce__(self):
+        # a copy in a worker process starts with its own counters
+        return (ASTCache, (self.directory, self.max_size))
+
+    def key(self, text):
+        h = hashlib.sha1(self.version.encode('utf-8'))
+        h.update(text.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return osp.join(self.directory, key + ASTCache.SUFFIX)
+
+    def _count(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get(self, text):
+        '''AST cached for text, None on a miss'''
+        path = self._path(self.key(text))
+        try:
+            with open(path, 'rb') as f:
+                ast = serialization.ASTReader(f).read()
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        except Exception:
+            # truncated by a crash or written by another version
+            self._count('misses')
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass # evicted meanwhile
+        self._count('hits')
+        return ast
+
+    def put(self, text, ast):
+        data = serialization.dumps(ast)
+        path = self._path(self.key(text))
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmppath, path)
+        except BaseException:
+            self._remove(tmppath)
+            raise
+        self._count('stores')
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(data) - replaced
+            evict = self._size > self.max_size
+        if evict:
+            self.evict(self.max_size * 3 // 4)
+
+    def _entries(self):
+        '''(mtime, size, path) of the entries in the directory'''
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(ASTCache.SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def evict(self, size=0):
+        '''Removes the least recently used entries down to size bytes'''
+        entries = self._entries()
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        removed = 0
+        for mtime, entry_size, path in entries:
+            if total <= size:
+                break
+            if self._remove(path):
+                removed += 1
+            total -= entry_size
+        with self._lock:
+            self._size = total
+            self.evictions += removed
+
+    def clear(self):
+        self.evict(0)
+
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
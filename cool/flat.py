@@ -0,0 +1,284 @@
+from array import array
+
+from .model import *
+from .serialization import CLASSES, SCHEMA, NODE, NODES, STR, BOOL
+
+# place of each attribute in the values of a node: NODES take two
+# values (start in children, count), the other kinds one
+_LAYOUT = {}
+for _cls, _schema in SCHEMA.items():
+    _pos = 0
+    _LAYOUT[_cls] = []
+    for _name, _kind in _schema:
+        _LAYOUT[_cls].append((_name, _kind, _pos))
+        _pos += 2 if _kind == NODES else 1
+del _cls, _schema, _pos, _name, _kind
+
+_TAGS = {cls: tag for tag, cls in enumerate(CLASSES)}
+# classes with a binding, kept in FlatAST.bindings
+_BOUND = frozenset(cls for cls in CLASSES if 'binding' in cls._slots)
+_WIDTH = tuple(sum(2 if kind == NODES else 1 for _, kind in SCHEMA[cls])
+               for cls in CLASSES)
+
+# INT values outside of the value range are kept in FlatAST.big
+_BIG = -2**31
+
+
+class FlatAST(object):
+    '''
+    A program stored as a struct of arrays instead of node objects.
+
+    Nodes are numbered in preorder. For node i, kinds[i] is the index of
+    its class in serialization.CLASSES, lexpos[i] its lexpos (-1 for
+    None) and offsets[i] the start of its attribute values in values,
+    laid out as in serialization.SCHEMA: a child node is its number
+    (-1 for None), a list of nodes a start and a count in children, a
+    string its index in strings (-1 for None), and booleans and ints
+    their value. Strings are interned, each one is stored once. The
+    bindings set by the Binder are kept apart in bindings, by node.
+
+    view(i) and classes() give views of the nodes: instances of
+    subclasses of the cool.model classes, with the same class names,
+    reading their attributes from the arrays when they are accessed.
+    Visitors, the SymanticAnalyzer and the TypeChecker traverse them
+    like the node objects, without the tree being built.
+    '''
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.lexpos = array('i')
+        self.offsets = array('i')
+        self.values = array('i')
+        self.children = array('i')
+        self.roots = array('i')
+        self.strings = []
+        self.sources = {} # node number of a class -> LineIndex
+        self.big = {} # node number -> INT value not fitting in values
+        self.bindings = {} # node number -> binding other than None
+        self._string_ids = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _string(self, s):
+        if s is None:
+            return -1
+        i = self._string_ids.get(s)
+        if i is None:
+            i = self._string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    @classmethod
+    def from_tree(cls, program):
+        '''FlatAST of a program, a list of ClassDefinition'''
+        flat = cls()
+        kinds = flat.kinds
+        lexpos = flat.lexpos
+        offsets = flat.offsets
+        values = flat.values
+        children = flat.children
+        string = flat._string
+
+        flat.roots.extend([0] * len(program))
+        # (node, array receiving its number, index in that array)
+        stack = [(node, flat.roots, i)
+                 for i, node in reversed(list(enumerate(program)))]
+        while stack:
+            node, target, at = stack.pop()
+            if node is None:
+                target[at] = -1
+                continue
+            i = len(kinds)
+            target[at] = i
+            node_class = type(node)
+            tag = _TAGS[node_class]
+            kinds.append(tag)
+            lexpos.append(-1 if node.lexpos is None else node.lexpos)
+            start = len(values)
+            offsets.append(start)
+            values.extend([0] * _WIDTH[tag])
+            if node_class is ClassDefinition and node.source is not None:
+                flat.sources[i] = node.source
+            elif node_class in _BOUND and node.binding is not None:
+                flat.bindings[i] = node.binding
+
+            pending = []
+            for name, kind, pos in _LAYOUT[node_class]:
+                value = getattr(node, name)
+                if kind == NODE:
+                    pending.append((value, values, start + pos))
+                elif kind == NODES:
+                    first = len(children)
+                    children.extend([0] * len(value))
+                    values[start + pos] = first
+                    values[start + pos + 1] = len(value)
+                    pending.extend((elem, children, first + k)
+                                   for k, elem in enumerate(value))
+                elif kind == STR:
+                    values[start + pos] = string(value)
+                elif kind == BOOL:
+                    values[start + pos] = value
+                elif _BIG < value < -_BIG:
+                    values[start + pos] = value
+                else:
+                    values[start + pos] = _BIG
+                    flat.big[i] = value
+            stack.extend(reversed(pending))
+        return flat
+
+    def to_tree(self):
+        '''The program as cool.model node objects'''
+        return [self.node(i) for i in self.roots]
+
+    def _end(self, i):
+        '''number following the last node of the subtree of node i'''
+        values = self.values
+        children = self.children
+        while True:
+            start = self.offsets[i]
+            last = -1
+            for name, kind, pos in _LAYOUT[CLASSES[self.kinds[i]]]:
+                if kind == NODE:
+                    last = max(last, values[start + pos])
+                elif kind == NODES and values[start + pos + 1]:
+                    first = values[start + pos]
+                    last = max(last, max(
+                        children[first:first + values[start + pos + 1]]))
+            if last < 0:
+                return i + 1
+            i = last
+
+    def node(self, i):
+        '''The subtree of node i as cool.model node objects'''
+        kinds = self.kinds
+        lexpos = self.lexpos
+        offsets = self.offsets
+        values = self.values
+        children = self.children
+        strings = self.strings
+
+        # children are numbered after their parent, and the nodes of a
+        # subtree are numbered consecutively
+        nodes = [None] * (self._end(i) - i)
+        for j in range(len(nodes) - 1, -1, -1):
+            n = i + j
+            node_class = CLASSES[kinds[n]]
+            node = node_class.__new__(node_class)
+            node.lexpos = None if lexpos[n] < 0 else lexpos[n]
+            start = offsets[n]
+            for name, kind, pos in _LAYOUT[node_class]:
+                value = values[start + pos]
+                if kind == NODE:
+                    value = None if value < 0 else nodes[value - i]
+                elif kind == NODES:
+                    value = [nodes[c - i] for c in
+                             children[value:value + values[start + pos + 1]]]
+                elif kind == STR:
+                    value = None if value < 0 else strings[value]
+                elif kind == BOOL:
+                    value = bool(value)
+                elif value == _BIG:
+                    value = self.big[n]
+                setattr(node, name, value)
+            if node_class is ClassDefinition:
+                node.source = self.sources.get(n)
+            elif node_class in _BOUND:
+                node.binding = self.bindings.get(n)
+            nodes[j] = node
+        return nodes[0]
+
+    def view(self, i):
+        view = _VIEWS[self.kinds[i]]
+        node = view.__new__(view)
+        node._flat = self
+        node._index = i
+        return node
+
+    def classes(self):
+        '''Views of the classes of the program'''
+        return [self.view(i) for i in self.roots]
+
+    def node_class(self, i):
+        return CLASSES[self.kinds[i]]
+
+
+def _attribute(name, kind, pos):
+    '''property reading one attribute of a view from its FlatAST'''
+    if kind == NODE:
+        def get(self):
+            flat = self._flat
+            i = flat.values[flat.offsets[self._index] + pos]
+            return None if i < 0 else flat.view(i)
+    elif kind == NODES:
+        def get(self):
+            flat = self._flat
+            start = flat.offsets[self._index] + pos
+            first = flat.values[start]
+            view = flat.view
+            return [view(c) for c in
+                    flat.children[first:first + flat.values[start + 1]]]
+    elif kind == STR:
+        def get(self):
+            flat = self._flat
+            s = flat.values[flat.offsets[self._index] + pos]
+            return None if s < 0 else flat.strings[s]
+    elif kind == BOOL:
+        def get(self):
+            flat = self._flat
+            return bool(flat.values[flat.offsets[self._index] + pos])
+    else:
+        def get(self):
+            flat = self._flat
+            value = flat.values[flat.offsets[self._index] + pos]
+            return flat.big[self._index] if value == _BIG else value
+    get.__name__ = name
+    return property(get)
+
+def _lexpos(self):
+    lexpos = self._flat.lexpos[self._index]
+    return None if lexpos < 0 else lexpos
+
+def _source(self):
+    return self._flat.sources.get(self._index)
+
+def _get_binding(self):
+    return self._flat.bindings.get(self._index)
+
+def _set_binding(self, binding):
+    if binding is None:
+        self._flat.bindings.pop(self._index, None)
+    else:
+        self._flat.bindings[self._index] = binding
+
+def _unpickle(node_class, state):
+    node = node_class.__new__(node_class)
+    node.__setstate__(state)
+    return node
+
+def _reduce(self):
+    # pickled as the node object
+    node = self._flat.node(self._index)
+    return _unpickle, (type(node), node.__getstate__())
+
+def _make_view(node_class):
+    namespace = {
+        '__slots__': ('_flat', '_index'),
+        '__module__': __name__,
+        '__qualname__': node_class.__name__ + 'View',
+        'lexpos': property(_lexpos),
+        '__reduce__': _reduce,
+    }
+    for name, kind, pos in _LAYOUT[node_class]:
+        namespace[name] = _attribute(name, kind, pos)
+    if node_class is ClassDefinition:
+        namespace['source'] = property(_source)
+    elif node_class in _BOUND:
+        namespace['binding'] = property(_get_binding, _set_binding)
+    # same name as the node class, visitors dispatch on the class name
+    view = type(node_class.__name__, (node_class,), namespace)
+    view._slots = node_class._slots
+    view._attrs = node_class._attrs
+    return view
+
+_VIEWS = tuple(_make_view(cls) for cls in CLASSES)
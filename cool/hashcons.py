@@ -0,0 +1,87 @@
+'''
+Sharing of identical leaf nodes between the places of a program using
+them.
+
+Literals, ObjectIdExpression and NewStatement nodes have no subnodes
+and are not changed by the later phases, so all the occurrences of
+one, say ObjectIdExpression('self'), can be the same node. That saves
+the memory of the duplicates, and comparing the subtrees using them
+finds the shared nodes identical without comparing them.
+
+A shared node keeps the lexpos of the first occurrence interned: error
+locations found through it are those of that occurrence. Likewise a
+shared ObjectIdExpression has one binding: intern a program once the
+phases using the bindings of the symantic_analyzer.Binder are done.
+
+Nodes are only hashable once frozen: an InternTable keeps the
+structural hash of the trees it froze, and of the leaves it interned,
+for as long as it is alive, so frozen nodes compare unequal on
+different hashes without being walked. A frozen node must not be
+changed.
+'''
+from .model import *
+from . import model
+
+# node classes that are interned
+KINDS = (NumberExpression, BooleanExpression, StringExpression,
+         ObjectIdExpression, NewStatement)
+
+
+class InternTable(object):
+    '''
+    Canonical instance of each distinct leaf node interned, keyed by
+    class and structure, and the structural hash of each node frozen.
+    hits counts the nodes replaced by an instance interned before.
+    '''
+
+    def __init__(self):
+        self._nodes = {}
+        self._hashes = {} # id -> (node, hash) of the nodes frozen
+        self.hits = 0
+        model._freezers.add(self)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def intern(self, node):
+        '''The canonical instance of node, node itself if it is new'''
+        if type(node) not in KINDS:
+            return node
+        # the class is part of the key, __eq__ does not compare it
+        key = (type(node),) + tuple(getattr(node, k) for k in node._attrs)
+        canonical = self._nodes.get(key)
+        if canonical is None:
+            self._nodes[key] = canonical = self.freeze(node)
+        else:
+            self.hits += 1
+        return canonical
+
+    def freeze(self, node):
+        '''
+        Keeps the structural hash of node and of its subnodes, making
+        them hashable, and returns node
+        '''
+        model._structural_hash(node, self._hashes)
+        return node
+
+    def freeze_program(self, program):
+        '''freeze() of each class of program, returned'''
+        for _class in program:
+            self.freeze(_class)
+        return program
+
+    def intern_program(self, program):
+        '''
+        Replaces the leaf nodes of program (list of classes) by their
+        canonical instances, in place, and returns program
+        '''
+        intern = self.intern
+        for _class in program:
+            for node in _class.walk():
+                for f in node._fields:
+                    value = getattr(node, f)
+                    if isinstance(value, list):
+                        value[:] = map(intern, value)
+                    elif isinstance(value, KINDS):
+                        setattr(node, f, intern(value))
+        return program
@@ -1,13 +1,240 @@
+from operator import attrgetter
+from types import FunctionType, GeneratorType
+import weakref
+
+# attributes locating a node in its source, not part of its structure
+_POSITION_ATTRS = ('lexpos', 'source')
+# attributes set by the analysis of a node, not part of its structure
+_RESOLVED_ATTRS = ('binding',)
+
+def _state_getter(slots):
+    '''tuple of the values of slots, as pickled'''
+    getter = attrgetter(*slots)
+    if len(slots) == 1:
+        single = getter
+        getter = lambda node: (single(node),)
+    return staticmethod(getter)
+
+# the hashcons.InternTable instances, whose _hashes map the id of each
+# node they froze to (node, structural hash)
+_freezers = weakref.WeakSet()
+
+def _structural_hash(root, hashes):
+    '''
+    hash of root, computed after those of its subnodes; hashes maps the
+    id of the nodes hashed before to (node, hash) and gets those of the
+    subtree
+    '''
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in hashes:
+            continue
+        order.append(node)
+        for k in node._attrs:
+            value = getattr(node, k)
+            if isinstance(value, list):
+                stack.extend(elem for elem in value
+                             if isinstance(elem, SourceElement))
+            elif isinstance(value, SourceElement):
+                stack.append(value)
+
+    for node in reversed(order):
+        values = []
+        for k in node._attrs:
+            value = getattr(node, k)
+            if isinstance(value, list):
+                value = tuple(hashes[id(elem)][1]
+                              if isinstance(elem, SourceElement)
+                              else hash(elem) for elem in value)
+            elif isinstance(value, SourceElement):
+                value = hashes[id(value)][1]
+            values.append(value)
+        # not the class: __eq__ only compares the attributes
+        hashes[id(node)] = (node, hash((node._attrs, tuple(values))))
+    return hashes[id(root)][1]
+
+def _frozen_hash(node, tables):
+    '''the hash of node kept in one of the tables, None if not frozen'''
+    key = id(node)
+    for hashes in tables:
+        entry = hashes.get(key)
+        if entry is not None:
+            return entry[1]
+    return None
+
+def _structurally_equal(first, second):
+    '''compares the structure of the nodes first and second, iteratively'''
+    stack = [(first, second)]
+    while stack:
+        a, b = stack.pop()
+        if a is b:
+            continue
+        if isinstance(a, SourceElement) or isinstance(b, SourceElement):
+            if not (isinstance(a, SourceElement) and
+                    isinstance(b, SourceElement)) or a._attrs != b._attrs:
+                return False
+            stack.extend((getattr(a, k), getattr(b, k))
+                         for k in reversed(a._attrs))
+        elif isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                return False
+            stack.extend(zip(reversed(a), reversed(b)))
+        elif a != b:
+            return False
+    return True
+
+# (visitor class, node class) -> (visit, typeof, leave) handlers,
+# called as handler(visitor, node)
+_handlers = {}
+
+def _handler(visitor_class, name):
+    '''the function defined for name along the MRO of visitor_class'''
+    for klass in visitor_class.__mro__:
+        attr = klass.__dict__.get(name)
+        if attr is not None:
+            if isinstance(attr, FunctionType):
+                return attr
+            break
+    # not a plain method: a staticmethod, an attribute given by
+    # __getattr__, or missing, which raises when it is called
+    return lambda visitor, node: getattr(visitor, name)(node)
+
+def _dispatch(visitor, node):
+    '''
+    Handlers of visitor for node, looked up once for each pair of
+    visitor and node class. Visitor classes must not be changed after
+    they are used.
+    '''
+    key = (visitor.__class__, node.__class__)
+    handlers = _handlers.get(key)
+    if handlers is None:
+        class_name = node.__class__.__name__
+        handlers = _handlers[key] = tuple(
+            _handler(visitor.__class__, prefix + class_name)
+            for prefix in ('visit_', 'typeof_', 'leave_'))
+    return handlers
+
+# Traversals keep their pending work on a list instead of the call
+# stack, so deep expressions neither reach the recursion limit nor
+# take a Python frame per level
+
+def _accept(root, visitor):
+    # nodes to visit, and (leave, node) to leave
+    stack = [root]
+    pop = stack.pop
+    push = stack.append
+    handlers = _handlers
+    visitor_class = visitor.__class__
+    while stack:
+        node = pop()
+        if node.__class__ is tuple:
+            leave, node = node
+            leave(visitor, node)
+            continue
+        visit, _, leave = (handlers.get((visitor_class, node.__class__))
+                           or _dispatch(visitor, node))
+        push((leave, node))
+        if visit(visitor, node):
+            for f in reversed(node._fields):
+                field = getattr(node, f)
+                if field:
+                    if isinstance(field, list):
+                        for elem in reversed(field):
+                            if isinstance(elem, SourceElement):
+                                push(elem)
+                    elif isinstance(field, SourceElement):
+                        push(field)
+
+def _type_check(root, visitor):
+    # (node, leave, generator) of the typeof_ handlers waiting for the
+    # type of a subnode
+    stack = []
+    node = root
+    while True:
+        typeid = error = None
+        try:
+            visit, typeof, leave = _dispatch(visitor, node)
+            if visit(visitor, node):
+                typeid = typeof(visitor, node)
+            if type(typeid) is GeneratorType:
+                stack.append((node, leave, typeid))
+                typeid = None
+            else:
+                leave(visitor, node)
+        except Exception as err:
+            error = err
+
+        # hand the type, or the exception, to the waiting handlers up
+        # to one asking for another subnode
+        while True:
+            if not stack:
+                if error is not None:
+                    raise error
+                return typeid
+            parent, leave, generator = stack[-1]
+            try:
+                if error is None:
+                    node = generator.send(typeid)
+                else:
+                    node = generator.throw(error)
+                break
+            except StopIteration as stop:
+                stack.pop()
+                typeid = stop.value
+                error = None
+                try:
+                    leave(visitor, parent)
+                except Exception as err:
+                    error = err
+            except Exception as err:
+                stack.pop()
+                error = err
+
 # Base node
 class SourceElement(object):
     '''
     A SourceElement is the base class for all elements that occur in a Java
     file parsed by plyj.
+
+    lexpos is the offset of the node in its input. Line and column are
+    resolved through the LineIndex kept as source on the enclosing
+    ClassDefinition.
+
+    Nodes keep their attributes in __slots__. _slots lists all of them
+    and _attrs the structural ones, compared by __eq__; both are set up
+    for every subclass from the __slots__ along its MRO.
+
+    Nodes are compared on their structure, without recursion. They are
+    hashable once frozen by a hashcons.InternTable, which keeps their
+    structural hash; __eq__ checks identity, then the hashes of frozen
+    nodes, and only then compares their structure. A frozen node must
+    not be changed.
     '''
+    __slots__ = ('lexpos',)
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        slots = []
+        for klass in reversed(cls.__mro__):
+            slots.extend(klass.__dict__.get('__slots__', ()))
+        cls._slots = tuple(slots)
+        cls._attrs = tuple(a for a in slots if a not in _POSITION_ATTRS
+                           and a not in _RESOLVED_ATTRS)
+        cls._state = _state_getter(slots)
 
     def __init__(self):
         super(SourceElement, self).__init__()
-        self._fields = []
+        self.lexpos = None
+
+    def __getstate__(self):
+        return self._state(self)
+
+    def __setstate__(self, state):
+        for a, value in zip(self._slots, state):
+            setattr(self, a, value)
 
     def __repr__(self):
         equals = ("{0}={1!r}".format(k, getattr(self, k))
@@ -16,51 +243,77 @@ class SourceElement(object):
         return "{0}({1})".format(self.__class__.__name__, args)
 
     def __eq__(self, other):
-        try:
-            return self.__dict__ == other.__dict__
-        except AttributeError:
-            return False
+        if self is other:
+            return True
+        if _freezers:
+            tables = [freezer._hashes for freezer in _freezers]
+            value = _frozen_hash(self, tables)
+            if value is not None:
+                other_value = _frozen_hash(other, tables)
+                if other_value is not None and other_value != value:
+                    return False
+        return _structurally_equal(self, other)
 
     def __ne__(self, other):
         return not self == other
 
-    def accept(self, visitor):
+    def __hash__(self):
+        value = _frozen_hash(self, [freezer._hashes
+                                    for freezer in _freezers])
+        if value is None:
+            raise TypeError('unhashable {0}: not frozen by an InternTable'
+                            .format(self.__class__.__name__))
+        return value
+
+    def walk(self):
         """
-        default implementation that visit the subnodes in the order
-        they are stored in self_field
+        Generates the nodes of the subtree of this node, itself first,
+        in the order accept() visits them
         """
-        class_name = self.__class__.__name__
-        visit = getattr(visitor, 'visit_' + class_name)
-        if visit(self):
-            for f in self._fields:
-                field = getattr(self, f)
+        stack = [self]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            yield node
+            for f in reversed(node._fields):
+                field = getattr(node, f)
                 if field:
                     if isinstance(field, list):
-                        for elem in field:
+                        for elem in reversed(field):
                             if isinstance(elem, SourceElement):
-                                elem.accept(visitor)
+                                push(elem)
                     elif isinstance(field, SourceElement):
-                        field.accept(visitor)
-        getattr(visitor, 'leave_' + class_name)(self)
+                        push(field)
 
-    def type_check(self, visitor):
+    def accept(self, visitor):
         """
         default implementation that visit the subnodes in the order
         they are stored in self_field
         """
-        class_name = self.__class__.__name__
-        visit = getattr(visitor, 'visit_' + class_name)
-        typeid = None
-        if visit(self):
-            typeid = getattr(visitor, 'typeof_' + class_name)(self)
-        getattr(visitor, 'leave_' + class_name)(self)
-        return typeid
+        _accept(self, visitor)
+
+    def type_check(self, visitor):
+        """
+        Calls the typeof_ handler of visitor between visit_ and leave_
+        and returns the type it gives. A typeof_ handler either returns
+        the type, or is a generator yielding the subnodes to type check
+        and receiving their types: type_expr = yield arg.expr
+        """
+        return _type_check(self, visitor)
+
+SourceElement._slots = ('lexpos',)
+SourceElement._attrs = ()
+SourceElement._state = _state_getter(SourceElement._slots)
 
 class ClassDefinition(SourceElement):
+    __slots__ = ('name', 'parent_typeid', 'variables', 'methods',
+                 'source')
+    _fields = ('variables', 'methods')
 
     def __init__(self, name, parent_typeid, features):
         super(ClassDefinition, self).__init__()
-        self._fields = ['variables', 'methods']
+        self.source = None # position.LineIndex of the file defining it
 
         self.name = name
         self.parent_typeid = parent_typeid  #this is a typeid
@@ -74,10 +327,11 @@ class ClassDefinition(SourceElement):
                 self.variables.append(feature)
 
 class MethodDefinition(SourceElement):
+    __slots__ = ('name', 'formal_args', 'return_type', 'body')
+    _fields = ('formal_args', 'body')
 
     def __init__(self, name, formal_args, return_type, body):
         super(MethodDefinition, self).__init__()
-        self._fields = ['formal_args', 'body']
 
         self.name = name
         self.formal_args = formal_args
@@ -89,43 +343,47 @@ class MethodDefinition(SourceElement):
                 self.return_type)
         
 class VariableDefinition(SourceElement):
+    __slots__ = ('var_decl', 'var_init')
+    _fields = ('var_decl', 'var_init')
 
     def __init__(self, var_decl, var_init):
         super(VariableDefinition, self).__init__()
-        self._fields = ['var_decl', 'var_init']
 
         self.var_decl = var_decl
         self.var_init = var_init
 
 class VariableDeclaration(SourceElement):
+    __slots__ = ('name', 'typeid')
 
     def __init__(self, name, typeid):
         super(VariableDeclaration, self).__init__()
-        self._fields = []
 
         self.name = name
         self.typeid = typeid
         
 class Expression(SourceElement):
+    __slots__ = ()
     
     def __init__(self):
         super(Expression, self).__init__()
-        self._fields = []
 
 class Assignment(Expression):
-    
+    __slots__ = ('lhs', 'expr', 'binding')
+    _fields = ('expr',)
+
     def __init__(self, lhs, expr):
         super(Assignment, self).__init__()
-        self._fields = ['expr']
 
         self.lhs = lhs
         self.expr = expr
+        self.binding = None # declaration of lhs, see Binder
 
 class MethodInvoke(Expression):
-    
+    __slots__ = ('expr', 'at_type', 'name', 'arguments')
+    _fields = ('expr', 'arguments')
+
     def __init__(self, expr, at_type, name, arguments):
         super(MethodInvoke, self).__init__()
-        self._fields = ['expr', 'arguments']
 
         self.expr = expr #left hand side of invokation
         self.at_type = at_type #this is for typecasting
@@ -133,133 +391,144 @@ class MethodInvoke(Expression):
         self.arguments = arguments
 
 class IfThenElse(Expression):
+    __slots__ = ('condition', 'ifbody', 'elsebody')
+    _fields = ('condition', 'ifbody', 'elsebody')
 
     def __init__(self, condition, ifbody, elsebody):
         super(IfThenElse, self).__init__()
-        self._fields = ['condition', 'ifbody', 'elsebody']
 
         self.condition = condition
         self.ifbody = ifbody
         self.elsebody = elsebody
 
 class WhileLoop(Expression):
+    __slots__ = ('condition', 'loopbody')
+    _fields = ('condition', 'loopbody')
 
     def __init__(self, condition, loopbody):
         super(WhileLoop, self).__init__()
-        self._fields = ['condition', 'loopbody']
 
         self.condition = condition
         self.loopbody = loopbody
 
 class BlockStatement(Expression):
     ''' of the form {[expr;]+}'''
+    __slots__ = ('statements',)
+    _fields = ('statements',)
 
     def __init__(self, statements):
         super(BlockStatement, self).__init__()
-        self._fields = ['statements']
 
         self.statements = statements
 
 class LetExpression(Expression):
+    __slots__ = ('var_list', 'expr')
+    _fields = ('var_list', 'expr')
 
     def __init__(self, var_list, expr):
         super(LetExpression, self).__init__()
-        self._fields = ['var_list', 'expr']
 
         self.var_list = var_list
         self.expr = expr
 
 class CaseExpression(Expression):
+    __slots__ = ('expr', 'statements')
+    _fields = ('expr', 'statements')
 
     def __init__(self, expr, statements):
         super(CaseExpression, self).__init__()
-        self._fields = ['expr', 'statements']
 
         self.expr = expr
         self.statements = statements
         
 class CaseStatement(Expression):
+    __slots__ = ('var_decl', 'expr')
+    _fields = ('var_decl', 'expr')
 
     def __init__(self, var_decl, expr):
         super(CaseStatement, self).__init__()
-        self._fields = ['var_decl', 'expr']
 
         self.var_decl = var_decl
         self.expr = expr
 
 class NewStatement(Expression):
+    __slots__ = ('typeid',)
     
     def __init__(self, typeid):
         super(NewStatement, self).__init__()
-        self._fields = []
         
         self.typeid = typeid
         
 class IsVoidExpression(Expression):
-    
+    __slots__ = ('expr',)
+    _fields = ('expr',)
+
     def __init__(self, expr):
         super(IsVoidExpression, self).__init__()
-        self._fields = ['expr']
         
         self.expr = expr
         
 class ComplementExpression(Expression):
-    
+    __slots__ = ('isbool', 'expr')
+    _fields = ('expr',)
+
     def __init__(self, isbool, expr):
         super(ComplementExpression, self).__init__()
-        self._fields = ['expr']
         
         self.isbool = isbool #int or bool only, true if bool
         self.expr = expr
 
 class InBracketsExpression(Expression):
     ''' of the form (expr)'''
+    __slots__ = ('expr',)
+    _fields = ('expr',)
 
     def __init__(self, expr):
         super(InBracketsExpression, self).__init__()
-        self._fields = ['expr']
         
         self.expr = expr
         
 class BinaryOperationExpression(Expression):
-    
+    __slots__ = ('binop', 'expr1', 'expr2')
+    _fields = ('expr1', 'expr2')
+
     def __init__(self, binop, expr1, expr2):
         super(BinaryOperationExpression, self).__init__()
-        self._fields = ['expr1', 'expr2']
         
         self.binop = binop
         self.expr1 = expr1
         self.expr2 = expr2
         
 class ObjectIdExpression(Expression):
+    __slots__ = ('name', 'binding')
     
     def __init__(self, name):
         super(ObjectIdExpression, self).__init__()
-        self._fields = []
         
         self.name = name
+        self.binding = None # declaration of name, see Binder
         
 class NumberExpression(Expression):
+    __slots__ = ('value',)
     
     def __init__(self, value):
         super(NumberExpression, self).__init__()
-        self._fields = []
         
         self.value = value
         
 class BooleanExpression(Expression):
+    __slots__ = ('value',)
     
     def __init__(self, value):
         super(BooleanExpression, self).__init__()
-        self._fields = []
 
         self.value = value
         
 class StringExpression(Expression):
+    __slots__ = ('value',)
     
     def __init__(self, value):
         super(StringExpression, self).__init__()
-        self._fields = []
         
         self.value = value
 
@@ -3,6 +3,7 @@ import sys
 import os.path as osp
 
 from .model import *
+from .position import LineIndex
 
 class CoolLexer(object):
 
@@ -42,6 +43,10 @@ class CoolLexer(object):
         #'ERRORTOKEN' need to return error token in cool
     ] + list(keywords.values())
 
+    states = (
+        ('comment', 'exclusive'),
+    )
+
     literals = [
         ';', ',', ':',
         '(', ')', '{', '}',
@@ -82,30 +87,69 @@ class CoolLexer(object):
         return t
 
     def t_COMMENT_MULTILINE(self, t):
-        r'\(\*(.|\n)*?\*\)'
-        t.lexer.lineno += t.value.count('\n')
+        r'\(\*'
+        t.lexer.comment_depth = 1
+        t.lexer.begin('comment')
 
     def t_NEWLINE(self, t):
         r'\n+'
         t.lexer.lineno += len(t.value)
 
+    @classmethod
+    def line_index(cls, lexer):
+        '''LineIndex of the lexer input, set up by the Compiler'''
+        index = getattr(lexer, 'line_index', None)
+        if index is None:
+            index = lexer.line_index = LineIndex(lexer.lexdata)
+        return index
+
     @classmethod
     def find_column(cls, t):
-        last_cr = t.lexer.lexdata.rfind('\n', 0, t.lexpos)
-        if last_cr < 0:
-            last_cr = 0
-        column = (t.lexpos - last_cr) + 1
-        return column
+        return cls.line_index(t.lexer).line_col(t.lexpos)[1]
+
+    @classmethod
+    def find_location(cls, t):
+        return cls.line_index(t.lexer).location(t.lexpos)
 
     def t_error(self, t):
         print("ERROR: Lexer: Illegal character"\
-              " '{0}', linum: {1}, column: {2}".format(t.value[0],
-                                                       t.lexer.lineno,
-                                                       CoolLexer.find_column(t)),
+              " '{0}' [{1}]".format(t.value[0], CoolLexer.find_location(t)),
               file=sys.stderr)
         t.lexer.skip(1)
         raise Exception(t)
 
+    # (* comments *) can be nested. Inside one the lexer is in the
+    # exclusive 'comment' state, which only tracks the nesting depth,
+    # so a comment is consumed in one pass without backtracking.
+
+    t_comment_ignore = ''
+
+    def t_comment_open(self, t):
+        r'\(\*'
+        t.lexer.comment_depth += 1
+
+    def t_comment_close(self, t):
+        r'\*\)'
+        t.lexer.comment_depth -= 1
+        if t.lexer.comment_depth == 0:
+            t.lexer.begin('INITIAL')
+
+    def t_comment_text(self, t):
+        r'[^(*]+'
+        t.lexer.lineno += t.value.count('\n')
+
+    def t_comment_char(self, t):
+        r'[(*]'
+
+    def t_comment_error(self, t):
+        t.lexer.skip(1)
+
+    def t_comment_eof(self, t):
+        t.lexer.begin('INITIAL')
+        print("ERROR: Lexer: EOF in comment [{0}]".format(
+            CoolLexer.find_location(t)), file=sys.stderr)
+        raise Exception(t)
+
 #########################################################
 
 class CoolParser(object):
@@ -125,9 +169,14 @@ class CoolParser(object):
         ('left', 'DOT'),
     )
 
+    # Sequences are left recursive: each reduction appends to the list
+    # built so far, so long sequences are built in linear time and the
+    # parser stack does not grow with their length.
+
     def p_program(self, p):
-        '''program : class ';' program'''
-        p[0] = [p[1]] + p[3]
+        '''program : program class ';' '''
+        p[1].append(p[2])
+        p[0] = p[1]
 
     def p_program_single(self, p):
         '''program : class ';' '''
@@ -136,6 +185,7 @@ class CoolParser(object):
     def p_class(self, p):
         '''class : CLASS TYPEID baseclass '{' features '}' '''
         p[0] = ClassDefinition(p[2], p[3], p[5])
+        p[0].lexpos = p.lexpos(1)
 
     def p_baseclass(self, p):
         '''baseclass : INHERITS TYPEID'''
@@ -146,8 +196,9 @@ class CoolParser(object):
         p[0] = None
 
     def p_features(self, p):
-        '''features : feature ';' features'''
-        p[0] = [p[1]] + p[3]
+        '''features : features feature ';' '''
+        p[1].append(p[2])
+        p[0] = p[1]
 
     def p_features_empty(self, p):
         '''features : empty'''
@@ -161,14 +212,17 @@ class CoolParser(object):
     def p_method_definition(self, p):
         '''methoddefinition : OBJECTID '(' formalargs ')' ':' TYPEID '{' expr '}' '''
         p[0] = MethodDefinition(p[1], p[3], p[6], p[8])
+        p[0].lexpos = p.lexpos(1)
 
     def p_variabledefinition(self, p):
         '''variabledefinition : variabledeclaration variableinitialization'''
         p[0] = VariableDefinition(p[1], p[2])
+        p[0].lexpos = p[1].lexpos
 
     def p_variabledeclaration(self, p):
         ''' variabledeclaration : OBJECTID ':' TYPEID '''
         p[0] = VariableDeclaration(p[1], p[3])
+        p[0].lexpos = p.lexpos(1)
 
     def p_variableinitialization(self, p):
         '''variableinitialization : ASSIGN expr '''
@@ -179,29 +233,42 @@ class CoolParser(object):
         p[0] = None
 
     def p_formalargs(self, p):
-        '''formalargs : variabledeclaration ',' formalargs'''
-        p[0] = [p[1]] + p[3]
-
-    def p_formalargs_singal(self, p):
-        '''formalargs : variabledeclaration'''
-        p[0] = [p[1]]
+        '''formalargs : formallist
+                      | formallist ',' '''
+        # a trailing ',' has always been accepted
+        p[0] = p[1]
 
     def p_formalargs_empty(self, p):
         '''formalargs : empty '''
         p[0] = []
 
-    def p_actualargs(self, p):
-        '''actualargs : expr ',' actualargs '''
-        p[0] = [p[1]] + p[3]
+    def p_formallist(self, p):
+        '''formallist : formallist ',' variabledeclaration'''
+        p[1].append(p[3])
+        p[0] = p[1]
 
-    def p_actualargs_single(self, p):
-        '''actualargs : expr '''
+    def p_formallist_single(self, p):
+        '''formallist : variabledeclaration'''
         p[0] = [p[1]]
 
+    def p_actualargs(self, p):
+        '''actualargs : actuallist
+                      | actuallist ',' '''
+        p[0] = p[1]
+
     def p_actualargs_empty(self, p):
         '''actualargs : empty '''
         p[0] = []
 
+    def p_actuallist(self, p):
+        '''actuallist : actuallist ',' expr '''
+        p[1].append(p[3])
+        p[0] = p[1]
+
+    def p_actuallist_single(self, p):
+        '''actuallist : expr '''
+        p[0] = [p[1]]
+
     def p_expr(self, p):
         '''expr : assignment
                 | methodinvoke
@@ -231,6 +298,7 @@ class CoolParser(object):
             p[0] = ComplementExpression(False, p[2])
         else:
             p[0] = InBracketsExpression(p[2])
+        p[0].lexpos = p.lexpos(1)
 
     def p_expr_binaryop(self, p):
         '''expr : expr '+' expr
@@ -242,6 +310,7 @@ class CoolParser(object):
                 | expr '=' expr
         '''
         p[0] = BinaryOperationExpression(p[2], p[1], p[3])
+        p[0].lexpos = p.lexpos(2)
 
     def p_expr_object_or_const(self, p):
         '''expr : INT_CONST
@@ -257,50 +326,61 @@ class CoolParser(object):
             p[0] = BooleanExpression(True if p[1] == 'true' else False)
         else:
             p[0] = ObjectIdExpression(p[1])
+        p[0].lexpos = p.lexpos(1)
 
     def p_assignment(self, p):
         '''assignment : OBJECTID ASSIGN expr'''
         p[0] = Assignment(p[1], p[3])
+        p[0].lexpos = p.lexpos(1)
 
     def p_letexpr(self, p):
         '''letexpr : LET variablelist IN expr'''
         p[0] = LetExpression(p[2], p[4])
+        p[0].lexpos = p.lexpos(1)
 
     def p_method_invoke(self, p):
         '''methodinvoke : expr DOT OBJECTID '(' actualargs ')' '''
         p[0] = MethodInvoke(p[1], None, p[3], p[5])
+        p[0].lexpos = p.lexpos(3)
 
     def p_method_invoke_with_typecast(self, p):
         '''methodinvoke : expr '@' TYPEID DOT OBJECTID '(' actualargs ')' '''
         p[0] = MethodInvoke(p[1], p[3], p[5], p[7])
+        p[0].lexpos = p.lexpos(5)
 
     def p_local_method_invoke(self, p):
         '''localmethodinvoke : OBJECTID '(' actualargs ')' '''
         p[0] = MethodInvoke(None, None, p[1], p[3])
+        p[0].lexpos = p.lexpos(1)
 
     def p_ifthenelse(self, p):
         '''ifthenelse : IF expr THEN expr ELSE expr FI '''
         p[0] = IfThenElse(p[2], p[4], p[6])
+        p[0].lexpos = p.lexpos(1)
 
     def p_whileloop(self, p):
         '''whileloop : WHILE expr LOOP expr POOL '''
         p[0] = WhileLoop(p[2], p[4])
+        p[0].lexpos = p.lexpos(1)
 
     def p_block(self, p):
         '''blockexpr : '{' blockstatements '}' '''
         p[0] = BlockStatement(p[2])
+        p[0].lexpos = p.lexpos(1)
 
     def p_blockstatements(self, p):
-        '''blockstatements : expr ';' blockstatements'''
-        p[0] = [p[1]] + p[3]
+        '''blockstatements : blockstatements expr ';' '''
+        p[1].append(p[2])
+        p[0] = p[1]
 
     def p_blockstatements_single(self, p):
         '''blockstatements : expr ';' '''
         p[0] = [p[1]]
 
     def p_variablelist(self, p):
-        '''variablelist : variabledefinition ',' variablelist'''
-        p[0] = [p[1]] + p[3]
+        '''variablelist : variablelist ',' variabledefinition'''
+        p[1].append(p[3])
+        p[0] = p[1]
 
     def p_variablelist_single(self, p):
         '''variablelist : variabledefinition'''
@@ -309,21 +389,32 @@ class CoolParser(object):
     def p_case(self, p):
         '''caseexpr : CASE expr OF casestatements ESAC'''
         p[0] = CaseExpression(p[2], p[4])
+        p[0].lexpos = p.lexpos(1)
 
     def p_casestatements(self, p):
-        '''casestatements : variabledeclaration DARROW expr ';' casestatements'''
-        p[0] = [CaseStatement(p[1], p[3])] + p[5]
+        '''casestatements : casestatements variabledeclaration DARROW expr ';' '''
+        p[1].append(self._case_statement(p[2], p[4]))
+        p[0] = p[1]
 
     def p_casestatements_single(self, p):
         '''casestatements : variabledeclaration DARROW expr ';' '''
-        p[0] = [CaseStatement(p[1], p[3])]
+        p[0] = [self._case_statement(p[1], p[3])]
+
+    def _case_statement(self, var_decl, expr):
+        stat = CaseStatement(var_decl, expr)
+        stat.lexpos = var_decl.lexpos
+        return stat
 
     def p_empty(self, p):
         '''empty : '''
         pass
 
     def p_error(self, p):
-        print("Syntax error at '{0}'", p)
+        if p is None:
+            print("Syntax error at end of input", file=sys.stderr)
+        else:
+            print("Syntax error at '{0}' [{1}]".format(
+                p.value, CoolLexer.find_location(p)), file=sys.stderr)
         raise Exception(p)
 
         
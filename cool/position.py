@@ -0,0 +1,50 @@
+from array import array
+from bisect import bisect_right
+
+
+class LineIndex(object):
+    '''
+    Start offsets of the lines of one input. Tokens and AST nodes only
+    keep their character offset (lexpos); line and column are looked
+    up here with a binary search. The table is built on the first
+    lookup, so inputs that never need a diagnostic do not pay for it.
+    '''
+
+    def __init__(self, text, filename=None):
+        self.filename = filename
+        self._text = text
+        self._starts = None
+
+    @property
+    def starts(self):
+        if self._starts is None:
+            text = self._text
+            starts = array('l', [0])
+            i = text.find('\n')
+            while i >= 0:
+                i += 1
+                starts.append(i)
+                i = text.find('\n', i)
+            self._starts = starts
+            self._text = None
+        return self._starts
+
+    def line_col(self, offset):
+        '''1-based (line, column) of a character offset'''
+        starts = self.starts
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
+
+    def location(self, offset):
+        '''filepath:line:column of a character offset'''
+        if offset is None:
+            return self.filename or '<string>'
+        return '{0}:{1}:{2}'.format(self.filename or '<string>',
+                                    *self.line_col(offset))
+
+    def __getstate__(self):
+        return (self.filename, self.starts)
+
+    def __setstate__(self, state):
+        self.filename, self._starts = state
+        self._text = None
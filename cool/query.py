@@ -0,0 +1,102 @@
+'''
+Whole program queries over ASTs: every MethodInvoke of a name, every
+NewStatement of a type, every CaseExpression...
+
+walk() and select() generate the nodes lazily, in a pass over the
+program that stops when the caller does. A NodeIndex is built in one
+pass and then answers each query in time proportional to the number of
+nodes it returns.
+
+Kinds are node class names, or the classes themselves: the views of a
+cool.flat.FlatAST have the names of the classes they stand for.
+'''
+
+# attribute indexed for each kind, selecting the nodes of that kind
+# by its value
+KEYS = {
+    'ClassDefinition': 'name',
+    'MethodDefinition': 'name',
+    'VariableDeclaration': 'typeid',
+    'Assignment': 'lhs',
+    'MethodInvoke': 'name',
+    'NewStatement': 'typeid',
+    'ObjectIdExpression': 'name',
+    'BinaryOperationExpression': 'binop',
+}
+
+def _kind(kind):
+    return kind if isinstance(kind, str) else kind.__name__
+
+def walk(program):
+    '''Generates the nodes of a program (list of classes), depth first'''
+    for _class in program:
+        yield from _class.walk()
+
+def select(program, kind, key=None):
+    '''
+    Generates the nodes of kind of program, those whose KEYS attribute
+    is key when key is given
+    '''
+    kind = _kind(kind)
+    attr = KEYS.get(kind) if key is not None else None
+    if key is not None and attr is None:
+        raise ValueError('no key attribute for ' + kind)
+    for node in walk(program):
+        if node.__class__.__name__ == kind and \
+           (attr is None or getattr(node, attr) == key):
+            yield node
+
+
+class NodeIndex(object):
+    '''
+    The nodes of a program by kind, and by kind and value of the KEYS
+    attribute of the kind, in walk() order. The index is not updated
+    when the program changes.
+    '''
+
+    def __init__(self, program):
+        self._kinds = kinds = {}
+        self._keys = keys = {}
+        for node in walk(program):
+            kind = node.__class__.__name__
+            nodes = kinds.get(kind)
+            if nodes is None:
+                nodes = kinds[kind] = []
+            nodes.append(node)
+            attr = KEYS.get(kind)
+            if attr is not None:
+                key = (kind, getattr(node, attr))
+                nodes = keys.get(key)
+                if nodes is None:
+                    nodes = keys[key] = []
+                nodes.append(node)
+
+    def __len__(self):
+        return sum(len(nodes) for nodes in self._kinds.values())
+
+    def kinds(self):
+        '''Names of the kinds of nodes in the program'''
+        return sorted(self._kinds)
+
+    def find(self, kind, key=None):
+        '''List of the nodes of kind, with key as in select()'''
+        kind = _kind(kind)
+        if key is None:
+            return list(self._kinds.get(kind, ()))
+        if kind not in KEYS:
+            raise ValueError('no key attribute for ' + kind)
+        return list(self._keys.get((kind, key), ()))
+
+    def count(self, kind, key=None):
+        kind = _kind(kind)
+        if key is None:
+            return len(self._kinds.get(kind, ()))
+        if kind not in KEYS:
+            raise ValueError('no key attribute for ' + kind)
+        return len(self._keys.get((kind, key), ()))
+
+    def keys(self, kind):
+        '''Values of the KEYS attribute of the nodes of kind'''
+        kind = _kind(kind)
+        return sorted({key for k, key in self._keys if k == kind},
+                      key=str)
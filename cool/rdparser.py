@@ -0,0 +1,350 @@
+from ply.lex import LexToken
+
+from .model import *
+from .parser import CoolParser
+from .scanner import CoolScanner
+
+# Binding power of the tokens in CoolParser.precedence. An operand
+# started after one of them takes in the operators with a higher level,
+# and those of the same level when it is right associative, which is
+# how the LALR tables resolve the same shift/reduce conflicts.
+_LEVEL = {}
+_OPERAND = {}
+for _level, (_assoc, *_ops) in enumerate(CoolParser.precedence, 1):
+    for _op in _ops:
+        _LEVEL[_op] = _level
+        _OPERAND[_op] = _level - 1 if _assoc == 'right' else _level
+del _level, _assoc, _ops, _op
+
+_BINARY = {'+', '-', '*', '/', '<', 'LE', '='}
+_NONASSOC = {'<', 'LE', '='}
+# operators continuing an expression: binary operators and dispatch
+_INFIX = {op: _LEVEL[op] for op in _BINARY | {'@', 'DOT'}}
+
+_END = (None, None, None, None)
+
+
+def _lex(lexer):
+    for t in iter(lexer.token, None):
+        yield t.type, t.value, t.lexpos, None
+
+
+class RDParser(object):
+    '''
+    Recursive descent parser for cool building the same AST, with the
+    same positions, as the LALR parser generated from CoolParser.
+    Expressions are parsed by precedence climbing over the precedence
+    table of CoolParser. It has the parse(input, lexer) interface of a
+    PLY parser and reports syntax errors through CoolParser.p_error.
+    '''
+
+    def __init__(self):
+        self._rules = CoolParser()
+        self._primaries = {
+            'OBJECTID': self._object,
+            'INT_CONST': self._number,
+            'STR_CONST': self._string,
+            'BOOL_CONST': self._boolean,
+            'NEW': self._new,
+            'ISVOID': self._unary,
+            'NOT': self._unary,
+            '~': self._unary,
+            '(': self._brackets,
+            'IF': self._ifthenelse,
+            'WHILE': self._whileloop,
+            '{': self._block,
+            'LET': self._let,
+            'CASE': self._case,
+        }
+
+    def parse(self, input=None, lexer=None):
+        if lexer is None:
+            lexer = CoolScanner()
+        if input is not None:
+            lexer.input(input)
+        # CoolScanner and BufferLexer give plain tuples through scan()
+        scan = getattr(lexer, 'scan', None)
+        tokens = _lex(lexer) if scan is None else scan()
+        self.lexer = lexer
+        self._tokens = tokens
+        self.advance()
+
+        program = []
+        while True:
+            program.append(self.class_definition())
+            self.expect(';')
+            if self.type is None:
+                return program
+
+    # tokens
+
+    def advance(self):
+        self.type, self.value, self.lexpos, _ = next(self._tokens, _END)
+
+    def expect(self, type_):
+        if self.type != type_:
+            self.error()
+        value = self.value
+        self.advance()
+        return value
+
+    def error(self):
+        if self.type is None:
+            self._rules.p_error(None)
+        t = LexToken()
+        t.type = self.type
+        t.value = self.value
+        t.lineno = self.lexer.lineno
+        t.lexpos = self.lexpos
+        t.lexer = self.lexer
+        self._rules.p_error(t)
+
+    # classes and features
+
+    def class_definition(self):
+        lexpos = self.lexpos
+        self.expect('CLASS')
+        name = self.expect('TYPEID')
+        parent = None
+        if self.type == 'INHERITS':
+            self.advance()
+            parent = self.expect('TYPEID')
+        self.expect('{')
+        features = []
+        while self.type == 'OBJECTID':
+            features.append(self.feature())
+            self.expect(';')
+        self.expect('}')
+        node = ClassDefinition(name, parent, features)
+        node.lexpos = lexpos
+        return node
+
+    def feature(self):
+        name = self.value
+        lexpos = self.lexpos
+        self.advance()
+        if self.type != '(':
+            return self.variable_definition(name, lexpos)
+
+        self.advance()
+        formal_args = []
+        while self.type == 'OBJECTID':
+            formal_args.append(self.variable_declaration())
+            if self.type != ',':
+                break
+            self.advance()
+        self.expect(')')
+        self.expect(':')
+        return_type = self.expect('TYPEID')
+        self.expect('{')
+        body = self.expr()
+        self.expect('}')
+        node = MethodDefinition(name, formal_args, return_type, body)
+        node.lexpos = lexpos
+        return node
+
+    def variable_declaration(self):
+        lexpos = self.lexpos
+        name = self.expect('OBJECTID')
+        return self._declaration(name, lexpos)
+
+    def _declaration(self, name, lexpos):
+        self.expect(':')
+        node = VariableDeclaration(name, self.expect('TYPEID'))
+        node.lexpos = lexpos
+        return node
+
+    def variable_definition(self, name=None, lexpos=None):
+        if name is None:
+            decl = self.variable_declaration()
+        else:
+            decl = self._declaration(name, lexpos)
+        init = None
+        if self.type == 'ASSIGN':
+            self.advance()
+            init = self.expr(_OPERAND['ASSIGN'])
+        node = VariableDefinition(decl, init)
+        node.lexpos = decl.lexpos
+        return node
+
+    # expressions
+
+    def expr(self, level=0):
+        '''
+        Parses an expression continued by the operators binding
+        tighter than level
+        '''
+        primary = self._primaries.get(self.type)
+        if primary is None:
+            self.error()
+        left = primary()
+
+        last = None
+        while True:
+            op = self.type
+            op_level = _INFIX.get(op)
+            if op_level is None or op_level <= level:
+                return left
+            if op_level == last and op in _NONASSOC:
+                self.error()
+            last = op_level
+            value = self.value
+            lexpos = self.lexpos
+            self.advance()
+            if op == 'DOT':
+                left = self._dispatch(left, None)
+            elif op == '@':
+                at_type = self.expect('TYPEID')
+                self.expect('DOT')
+                left = self._dispatch(left, at_type)
+            else:
+                left = BinaryOperationExpression(
+                    value, left, self.expr(_OPERAND[op]))
+                left.lexpos = lexpos
+
+    def _dispatch(self, expr, at_type):
+        lexpos = self.lexpos
+        name = self.expect('OBJECTID')
+        node = MethodInvoke(expr, at_type, name, self._arguments())
+        node.lexpos = lexpos
+        return node
+
+    def _arguments(self):
+        self.expect('(')
+        args = []
+        while self.type != ')':
+            args.append(self.expr())
+            if self.type != ',':
+                break
+            self.advance()
+        self.expect(')')
+        return args
+
+    def _object(self):
+        name = self.value
+        lexpos = self.lexpos
+        self.advance()
+        if self.type == 'ASSIGN':
+            self.advance()
+            node = Assignment(name, self.expr(_OPERAND['ASSIGN']))
+        elif self.type == '(':
+            node = MethodInvoke(None, None, name, self._arguments())
+        else:
+            node = ObjectIdExpression(name)
+        node.lexpos = lexpos
+        return node
+
+    def _number(self):
+        node = NumberExpression(self.value)
+        node.lexpos = self.lexpos
+        self.advance()
+        return node
+
+    def _string(self):
+        node = StringExpression(self.value[1:-1])
+        node.lexpos = self.lexpos
+        self.advance()
+        return node
+
+    def _boolean(self):
+        node = BooleanExpression(self.value == 'true')
+        node.lexpos = self.lexpos
+        self.advance()
+        return node
+
+    def _new(self):
+        lexpos = self.lexpos
+        self.advance()
+        node = NewStatement(self.expect('TYPEID'))
+        node.lexpos = lexpos
+        return node
+
+    def _unary(self):
+        op = self.type
+        lexpos = self.lexpos
+        self.advance()
+        expr = self.expr(_OPERAND[op])
+        if op == 'ISVOID':
+            node = IsVoidExpression(expr)
+        else:
+            node = ComplementExpression(op == 'NOT', expr)
+        node.lexpos = lexpos
+        return node
+
+    def _brackets(self):
+        lexpos = self.lexpos
+        self.advance()
+        node = InBracketsExpression(self.expr())
+        self.expect(')')
+        node.lexpos = lexpos
+        return node
+
+    def _ifthenelse(self):
+        lexpos = self.lexpos
+        self.advance()
+        condition = self.expr()
+        self.expect('THEN')
+        ifbody = self.expr()
+        self.expect('ELSE')
+        elsebody = self.expr()
+        self.expect('FI')
+        node = IfThenElse(condition, ifbody, elsebody)
+        node.lexpos = lexpos
+        return node
+
+    def _whileloop(self):
+        lexpos = self.lexpos
+        self.advance()
+        condition = self.expr()
+        self.expect('LOOP')
+        loopbody = self.expr()
+        self.expect('POOL')
+        node = WhileLoop(condition, loopbody)
+        node.lexpos = lexpos
+        return node
+
+    def _block(self):
+        lexpos = self.lexpos
+        self.advance()
+        statements = []
+        while True:
+            statements.append(self.expr())
+            self.expect(';')
+            if self.type == '}':
+                break
+        self.advance()
+        node = BlockStatement(statements)
+        node.lexpos = lexpos
+        return node
+
+    def _let(self):
+        lexpos = self.lexpos
+        self.advance()
+        var_list = [self.variable_definition()]
+        while self.type == ',':
+            self.advance()
+            var_list.append(self.variable_definition())
+        self.expect('IN')
+        node = LetExpression(var_list, self.expr(_OPERAND['IN']))
+        node.lexpos = lexpos
+        return node
+
+    def _case(self):
+        lexpos = self.lexpos
+        self.advance()
+        expr = self.expr()
+        self.expect('OF')
+        statements = []
+        while True:
+            var_decl = self.variable_declaration()
+            self.expect('DARROW')
+            stat = CaseStatement(var_decl, self.expr())
+            stat.lexpos = var_decl.lexpos
+            statements.append(stat)
+            self.expect(';')
+            if self.type == 'ESAC':
+                break
+        self.advance()
+        node = CaseExpression(expr, statements)
+        node.lexpos = lexpos
+        return node
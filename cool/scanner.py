@@ -0,0 +1,199 @@
+import re
+
+from ply.lex import LexToken
+
+from . parser import CoolLexer
+
+# Character classes driving the scanner, one dispatch per token
+_BLANK, _DIGIT, _LETTER, _QUOTE, _LPAREN, _MINUS, _LT, _EQ, \
+    _DOT, _LITERAL = range(10)
+
+_CLASSES = {}
+for _c in ' \f\t\v\r\n':
+    _CLASSES[_c] = _BLANK
+for _c in '0123456789':
+    _CLASSES[_c] = _DIGIT
+for _c in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ':
+    _CLASSES[_c] = _LETTER
+for _c in CoolLexer.literals:
+    _CLASSES[_c] = _LITERAL
+_CLASSES.update({'"': _QUOTE, '(': _LPAREN, '-': _MINUS,
+                 '<': _LT, '=': _EQ, '.': _DOT})
+del _c
+
+_match_word = re.compile(r'\w*').match
+_match_digits = re.compile(r'\d+').match
+_match_blank = re.compile(r'[ \f\t\v\r\n]+').match
+_find_comment_delimiters = re.compile(r'\(\*|\*\)').finditer
+# same pattern as CoolLexer.t_STR_CONST, so escapes are accepted alike
+_match_string = re.compile(CoolLexer.t_STR_CONST.__doc__).match
+
+_KEYWORDS = CoolLexer.keywords
+_BOOLEANS = {'true', 'false'}
+
+
+class CoolScanner(object):
+    '''
+    Single pass lexer for cool producing the same tokens, values and
+    line numbers as the PLY lexer built from CoolLexer. It implements
+    the part of the PLY lexer interface used by the parser and the
+    Compiler (input, token, iteration, lineno/lexpos/lexdata).
+    '''
+
+    def __init__(self):
+        self._rules = CoolLexer()
+        self.input('')
+
+    def input(self, data):
+        self.lexdata = data
+        self.lexpos = 0
+        self.lexlen = len(data)
+        self.lineno = 1
+        self._tokens = self.scan()
+
+    def skip(self, n):
+        self.lexpos += n
+
+    def clone(self):
+        return CoolScanner()
+
+    def __iter__(self):
+        return iter(self.token, None)
+
+    def begin(self, state):
+        pass
+
+    def _skip_comment(self, pos):
+        '''
+        Returns the position after the (possibly nested) comment
+        starting at pos, mirroring the 'comment' state of CoolLexer
+        '''
+        data = self.lexdata
+        depth = 0
+        for m in _find_comment_delimiters(data, pos):
+            if m.group() == '(*':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    stop = m.end()
+                    self.lineno += data.count('\n', pos, stop)
+                    return stop
+
+        self.lineno += data.count('\n', pos)
+        self.lexpos = self.lexlen
+        t = LexToken()
+        t.type = 'eof'
+        t.value = ''
+        t.lineno = self.lineno
+        t.lexpos = self.lexlen
+        t.lexer = self
+        self._rules.t_comment_eof(t)
+
+    def _error(self, pos):
+        '''reports through CoolLexer.t_error, exactly like PLY'''
+        self.lexpos = pos
+        t = LexToken()
+        t.type = 'error'
+        t.value = self.lexdata[pos:]
+        t.lineno = self.lineno
+        t.lexpos = pos
+        t.lexer = self
+        self._rules.t_error(t)
+        self.lexpos = pos + 1
+
+    def token(self):
+        for type_, value, pos, stop in self._tokens:
+            t = LexToken()
+            t.type = type_
+            t.value = value
+            t.lineno = self.lineno
+            t.lexpos = pos
+            t.lexer = self
+            return t
+        return None
+
+    def scan(self):
+        '''
+        Generator over (type, value, start, stop) of the tokens of the
+        current input; lineno is the line of the last token produced
+        '''
+        data = self.lexdata
+        pos = 0
+        end = self.lexlen
+        classes = _CLASSES
+
+        while pos < end:
+            c = data[pos]
+            kind = classes.get(c)
+
+            if kind == _BLANK:
+                stop = _match_blank(data, pos).end()
+                self.lineno += data.count('\n', pos, stop)
+                if stop == end:
+                    break
+                pos = stop
+                c = data[pos]
+                kind = classes.get(c)
+
+            if kind == _LETTER:
+                stop = _match_word(data, pos + 1).end()
+                value = data[pos:stop]
+                if c.isupper():
+                    type_ = 'TYPEID'
+                elif value.casefold() in _BOOLEANS:
+                    type_ = 'BOOL_CONST'
+                    value = value.lower()
+                else:
+                    type_ = _KEYWORDS.get(value, 'OBJECTID')
+            elif kind == _LITERAL:
+                type_ = value = c
+                stop = pos + 1
+            elif kind == _DIGIT or (kind is None and c.isdecimal()):
+                stop = _match_digits(data, pos).end()
+                type_ = 'INT_CONST'
+                value = int(data[pos:stop])
+            elif kind == _DOT:
+                type_ = 'DOT'
+                value = c
+                stop = pos + 1
+            elif kind == _LPAREN:
+                if data.startswith('*', pos + 1):
+                    pos = self._skip_comment(pos)
+                    continue
+                type_ = value = c
+                stop = pos + 1
+            elif kind == _MINUS:
+                if data.startswith('-', pos + 1):
+                    stop = data.find('\n', pos)
+                    pos = end if stop < 0 else stop
+                    continue
+                type_ = value = c
+                stop = pos + 1
+            elif kind == _LT:
+                if data.startswith('-', pos + 1):
+                    type_, value, stop = 'ASSIGN', '<-', pos + 2
+                elif data.startswith('=', pos + 1):
+                    type_, value, stop = 'LE', '<=', pos + 2
+                else:
+                    type_, value, stop = c, c, pos + 1
+            elif kind == _EQ:
+                if data.startswith('>', pos + 1):
+                    type_, value, stop = 'DARROW', '=>', pos + 2
+                else:
+                    type_, value, stop = c, c, pos + 1
+            else:
+                m = _match_string(data, pos) if kind == _QUOTE else None
+                if m is None:
+                    self._error(pos)
+                    pos = self.lexpos
+                    continue
+                type_ = 'STR_CONST'
+                value = m.group()
+                stop = m.end()
+
+            self.lexpos = stop
+            yield type_, value, pos, stop
+            pos = stop
+
+        self.lexpos = end
@@ -0,0 +1,290 @@
+'''
+Compact binary format for cool.model ASTs.
+
+A stream starts with MAGIC and holds one frame per program (list of
+classes) written. A frame is
+
+    u32 length of the rest of the frame
+    u32 number of values, u32 number of new strings, u32 value width
+    the values as u16 when they all fit, u32 otherwise
+    the new strings, UTF-8, their lengths being the first values
+
+Nodes are written depth first: the index of their class in CLASSES
+(0 for None), lexpos + 1 (0 for None), then the attributes listed in
+the SCHEMA of the class. Names, types, operators and string constants
+are written as references into a string table shared by all frames of
+the stream; a frame carries the strings first used in it. The
+ClassDefinition.source LineIndex is not written.
+'''
+import io
+import struct
+from array import array
+
+from .model import *
+
+MAGIC = b'COOLAST\x01'
+
+# attribute kinds
+NODE, NODES, STR, BOOL, INT = range(5)
+
+# attributes of each node class, in the order they are written
+SCHEMA = {
+    ClassDefinition: (('name', STR), ('parent_typeid', STR),
+                      ('variables', NODES), ('methods', NODES)),
+    MethodDefinition: (('name', STR), ('formal_args', NODES),
+                       ('return_type', STR), ('body', NODE)),
+    VariableDefinition: (('var_decl', NODE), ('var_init', NODE)),
+    VariableDeclaration: (('name', STR), ('typeid', STR)),
+    Assignment: (('lhs', STR), ('expr', NODE)),
+    MethodInvoke: (('expr', NODE), ('at_type', STR), ('name', STR),
+                   ('arguments', NODES)),
+    IfThenElse: (('condition', NODE), ('ifbody', NODE),
+                 ('elsebody', NODE)),
+    WhileLoop: (('condition', NODE), ('loopbody', NODE)),
+    BlockStatement: (('statements', NODES),),
+    LetExpression: (('var_list', NODES), ('expr', NODE)),
+    CaseExpression: (('expr', NODE), ('statements', NODES)),
+    CaseStatement: (('var_decl', NODE), ('expr', NODE)),
+    NewStatement: (('typeid', STR),),
+    IsVoidExpression: (('expr', NODE),),
+    ComplementExpression: (('isbool', BOOL), ('expr', NODE)),
+    InBracketsExpression: (('expr', NODE),),
+    BinaryOperationExpression: (('binop', STR), ('expr1', NODE),
+                                ('expr2', NODE)),
+    ObjectIdExpression: (('name', STR),),
+    NumberExpression: (('value', INT),),
+    BooleanExpression: (('value', BOOL),),
+    StringExpression: (('value', STR),),
+}
+
+CLASSES = tuple(SCHEMA)
+_TAGS = {cls: tag for tag, cls in enumerate(CLASSES, 1)}
+# slots that are not written (ClassDefinition.source) are read as None
+_BY_TAG = (None,) + tuple(
+    (cls, SCHEMA[cls], tuple(a for a in cls._slots if a != 'lexpos' and
+                             a not in dict(SCHEMA[cls])))
+    for cls in CLASSES)
+
+# an INT that does not fit in a value is written as this marker
+# followed by a reference to its decimal string
+_BIG = 0xffffffff
+
+_header = struct.Struct('<IIII')
+
+# end of the attribute iterators of ASTWriter and ASTReader
+_END = object()
+_TYPECODES = {2: 'H', 4: 'I'}
+
+
+class FormatError(Exception):
+    pass
+
+
+class ASTWriter(object):
+    '''Writes programs to a binary file object, one frame each'''
+
+    def __init__(self, f):
+        self._file = f
+        self._strings = {None: 0}
+        f.write(MAGIC)
+
+    def write(self, program):
+        self._values = values = []
+        self._new = new = []
+        values.append(len(program))
+        for node in program:
+            self._node(node)
+
+        blob = [s.encode('utf-8', 'surrogatepass') for s in new]
+        values[0:0] = map(len, blob)
+        try:
+            values = array('H', values)
+        except OverflowError:
+            values = array('I', values)
+        body = values.tobytes() + b''.join(blob)
+        header = _header.pack(_header.size - 4 + len(body),
+                              len(values), len(new), values.itemsize)
+        self._file.write(header + body)
+        del self._values, self._new
+
+    def _string(self, s):
+        ref = self._strings.get(s)
+        if ref is None:
+            ref = self._strings[s] = len(self._strings)
+            self._new.append(s)
+        return ref
+
+    def _node(self, node):
+        values = self._values
+        string = self._string
+        # (node, iterator over its attributes left to write) or (None,
+        # iterator over the nodes of a list left to write)
+        stack = []
+        while True:
+            if node is None:
+                values.append(0)
+            else:
+                cls = type(node)
+                values.append(_TAGS[cls])
+                values.append(0 if node.lexpos is None else node.lexpos + 1)
+                stack.append((node, iter(SCHEMA[cls])))
+
+            # up to the next node to write
+            while stack:
+                owner, items = stack[-1]
+                item = next(items, _END)
+                if item is _END:
+                    stack.pop()
+                elif owner is None:
+                    node = item
+                    break
+                else:
+                    name, kind = item
+                    value = getattr(owner, name)
+                    if kind == NODE:
+                        node = value
+                        break
+                    elif kind == STR:
+                        values.append(string(value))
+                    elif kind == NODES:
+                        values.append(len(value))
+                        stack.append((None, iter(value)))
+                    elif kind == BOOL:
+                        values.append(value)
+                    elif 0 <= value < _BIG:
+                        values.append(value)
+                    else:
+                        values.append(_BIG)
+                        values.append(string(str(value)))
+            else:
+                return
+
+
+class ASTReader(object):
+    '''Reads the programs of a binary file object written by ASTWriter'''
+
+    def __init__(self, f):
+        self._file = f
+        self._strings = [None]
+        if f.read(len(MAGIC)) != MAGIC:
+            raise FormatError('not a cool AST stream')
+
+    def __iter__(self):
+        while True:
+            program = self.read()
+            if program is None:
+                return
+            yield program
+
+    def read(self):
+        '''Returns the next program, None at the end of the stream'''
+        header = self._file.read(_header.size)
+        if not header:
+            return None
+        if len(header) != _header.size:
+            raise FormatError('truncated frame')
+        size, count, new, width = _header.unpack(header)
+        size -= _header.size - 4
+        body = self._file.read(size)
+        if len(body) != size or width not in _TYPECODES:
+            raise FormatError('truncated frame')
+
+        values = array(_TYPECODES[width])
+        if values.itemsize != width:
+            raise FormatError('no {0} byte array type'.format(width))
+        pos = count * width
+        values.frombytes(body[:pos])
+        strings = self._strings
+        for length in values[:new]:
+            strings.append(str(body[pos:pos + length], 'utf-8',
+                               'surrogatepass'))
+            pos += length
+
+        rest = iter(values[new:])
+        self._next = it = rest.__next__
+        try:
+            program = [self._node() for _ in range(it())]
+        except StopIteration:
+            raise FormatError('truncated frame') from None
+        finally:
+            del self._next
+        if next(rest, None) is not None:
+            raise FormatError('values left in frame')
+        return program
+
+    def _node(self):
+        it = self._next
+        strings = self._strings
+        # [node, iterator over its attributes left to read, name of the
+        # attribute of the node being read] or [None, list of the nodes
+        # read for a list, nodes left to read in it]
+        stack = []
+        while True:
+            tag = it()
+            if tag:
+                cls, schema, unwritten = _BY_TAG[tag]
+                node = cls.__new__(cls)
+                lexpos = it()
+                node.lexpos = lexpos - 1 if lexpos else None
+                for name in unwritten:
+                    setattr(node, name, None)
+                stack.append([node, iter(schema), None])
+                done = False
+            else:
+                value = None
+                done = True
+
+            # hand the values read to their owners, up to the next node
+            # to read
+            while True:
+                if done:
+                    if not stack:
+                        return value
+                    frame = stack[-1]
+                    if frame[0] is None:
+                        frame[1].append(value)
+                        frame[2] -= 1
+                    else:
+                        setattr(frame[0], frame[2], value)
+                    done = False
+                frame = stack[-1]
+                owner = frame[0]
+                if owner is None:
+                    if frame[2]:
+                        break
+                    stack.pop()
+                    value = frame[1]
+                    done = True
+                    continue
+                item = next(frame[1], _END)
+                if item is _END:
+                    stack.pop()
+                    value = owner
+                    done = True
+                    continue
+                name, kind = item
+                if kind == NODE:
+                    frame[2] = name
+                    break
+                elif kind == STR:
+                    setattr(owner, name, strings[it()])
+                elif kind == NODES:
+                    frame[2] = name
+                    stack.append([None, [], it()])
+                elif kind == BOOL:
+                    setattr(owner, name, bool(it()))
+                else:
+                    value = it()
+                    if value == _BIG:
+                        value = int(strings[it()])
+                    setattr(owner, name, value)
+
+
+def dumps(program):
+    '''bytes of a stream holding one program'''
+    f = io.BytesIO()
+    ASTWriter(f).write(program)
+    return f.getvalue()
+
+def loads(data):
+    return ASTReader(io.BytesIO(data)).read()
@@ -1,5 +1,10 @@
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
 from .model import ClassDefinition
 from .model import ObjectIdExpression
+from . import serialization
+from . import tracing
 
 class TypeCheckingException(Exception):
     pass
@@ -18,16 +23,90 @@ class MultipleDeclarationException(TypeCheckingException):
 class UnknownTypeException(TypeCheckingException):
     pass
 
+class ClassNotFoundException(UnknownTypeException):
+    pass
+
+class BinopTypeCheckingException(TypeCheckingException):
+    pass
+
+class InheritanceException(TypeCheckingException):
+    pass
+
+class UndefinedParentException(InheritanceException):
+
+    def __init__(self, typeid, parentid):
+        self._typeid = typeid
+        self._parentid = parentid
+
+    def __str__(self):
+        return 'Class {0} inherits from undefined class : {1}'.format(
+            self._typeid, self._parentid)
+
+class SealedParentException(InheritanceException):
+
+    def __init__(self, typeid, parentid):
+        self._typeid = typeid
+        self._parentid = parentid
+
+    def __str__(self):
+        return 'Class {0} cannot inherit from : {1}'.format(
+            self._typeid, self._parentid)
+
+class InheritanceCycleException(InheritanceException):
+
+    def __init__(self, cycle):
+        self._cycle = cycle
+
+    def __str__(self):
+        return 'Inheritance cycle : ' + ' -> '.join(
+            self._cycle + self._cycle[:1])
+
+# basic classes that cannot be inherited from
+SEALED_TYPES = ('Int', 'Bool', 'String')
+
+# type of the expressions found wrong when collecting diagnostics; it
+# conforms to every type and every type conforms to it, so that the
+# expressions using a wrong one are not reported too
+ERROR_TYPE = '<error>'
+
+
+class Diagnostic(object):
+    '''
+    A type error found when collecting diagnostics: error is the
+    TypeCheckingException(node, message) that would have been raised,
+    location the filepath:line:column of the node.
+    '''
+
+    def __init__(self, error, location):
+        self.error = error
+        self.location = location
+
+    @property
+    def node(self):
+        return self.error.args[0]
+
+    @property
+    def message(self):
+        return self.error.args[1]
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.location, self.message)
+
+    def __repr__(self):
+        return 'Diagnostic({0!r})'.format(str(self))
+
 
 class SymbolTable:
 
     def __init__(self):
         self._dict = dict()
+        self._number = None # typeid -> preorder number, once frozen
 
     def add_type(self, typeid, parentid):
         
         if not self.isdefined(typeid):
             self._dict[typeid] = parentid
+            self._number = None
         else:
             raise MultipleDefinitionException(typeid) 
 
@@ -43,18 +122,114 @@ class SymbolTable:
     def get_parent(self, typeid):
         return self._dict.get(typeid, None)
 
+    def validate(self):
+        '''
+        Checks that every parent is defined, is not one of SEALED_TYPES
+        and that there is no inheritance cycle, raising the
+        InheritanceException of the first class in error. Returns the
+        types in topological order, each after its parent, in O(types).
+        '''
+        _dict = self._dict
+        for typeid, parentid in _dict.items():
+            if parentid is not None and parentid not in _dict:
+                raise UndefinedParentException(typeid, parentid)
+            if parentid in SEALED_TYPES:
+                raise SealedParentException(typeid, parentid)
+
+        # the parents form a forest when there is no cycle: walk up
+        # from each type not ordered yet, up to an ordered one or a root
+        order = []
+        state = {} # typeid -> True once ordered, False while walked up
+        for typeid in _dict:
+            path = []
+            while typeid is not None and typeid not in state:
+                state[typeid] = False
+                path.append(typeid)
+                typeid = _dict[typeid]
+            if typeid is not None and state[typeid] is False:
+                raise InheritanceCycleException(path[path.index(typeid):])
+            for walked in path:
+                state[walked] = True
+            order.extend(reversed(path))
+        return order
+
+    def freeze(self):
+        '''
+        Indexes the hierarchy of the types added so far, until another
+        one is added. The types are numbered in preorder, the
+        descendants of a type being numbered from its number to _last
+        of it, so is_parent compares numbers. common_ancestor lifts
+        types to their ancestors 2**k levels up through _up[k].
+
+        Types whose parent chain is not rooted (a cycle) are left out
+        of the index and are still walked up.
+        '''
+        children = {}
+        roots = []
+        for typeid, parentid in self._dict.items():
+            if parentid is None or parentid not in self._dict:
+                roots.append(typeid)
+            else:
+                children.setdefault(parentid, []).append(typeid)
+
+        number = {}
+        parent = [] # number of the parent, the type itself for roots
+        depth = []
+        stack = [(typeid, None) for typeid in reversed(roots)]
+        while stack:
+            typeid, parent_number = stack.pop()
+            n = number[typeid] = len(parent)
+            if parent_number is None:
+                parent.append(n)
+                depth.append(0)
+            else:
+                parent.append(parent_number)
+                depth.append(depth[parent_number] + 1)
+            stack.extend((child, n)
+                         for child in reversed(children.get(typeid, ())))
+
+        last = list(range(len(parent)))
+        for n in range(len(parent) - 1, -1, -1):
+            if last[n] > last[parent[n]]:
+                last[parent[n]] = last[n]
+
+        up = [parent]
+        while 1 << len(up) <= max(depth, default=0):
+            prev = up[-1]
+            up.append([prev[prev[n]] for n in range(len(prev))])
+
+        self._types = list(number)
+        self._last = last
+        self._depth = depth
+        self._up = up
+        self._number = number
+
+    def descendants(self, typeid):
+        '''typeid and the types deriving from it, as of freeze()'''
+        if self._number is not None and typeid in self._number:
+            n = self._number[typeid]
+            return self._types[n:self._last[n] + 1]
+        return [typeid]
+
     def is_parent(self, parent_typeid, child_typeid):
 
         if parent_typeid == child_typeid:
             return False
-        else:
-            _typeid = child_typeid
-            while _typeid is not None:
-                if self.get_parent(_typeid) == parent_typeid:
-                    return True
-                else:
-                    _typeid = self.get_parent(_typeid)
-            return False
+        if self._number is not None:
+            child = self._number.get(child_typeid)
+            if child is not None:
+                # the ancestors of an indexed type are indexed
+                parent = self._number.get(parent_typeid)
+                return parent is not None and \
+                    parent < child <= self._last[parent]
+
+        _typeid = child_typeid
+        while _typeid is not None:
+            if self.get_parent(_typeid) == parent_typeid:
+                return True
+            else:
+                _typeid = self.get_parent(_typeid)
+        return False
                 
     def common_ancestor(self, _list):
 
@@ -64,10 +239,40 @@ class SymbolTable:
             c = _list[0]
             for l in _list[1:]:
                 if c != l:
-                    c = self._common_ancestor_helper(self._stackup(c),
-                                                     self._stackup(l))
+                    c = self._common_ancestor(c, l)
             return c
 
+    def _common_ancestor(self, t1, t2):
+        if self._number is not None:
+            n1 = self._number.get(t1)
+            n2 = self._number.get(t2)
+            if n1 is not None and n2 is not None:
+                return self._lowest_common_ancestor(n1, n2)
+        return self._common_ancestor_helper(self._stackup(t1),
+                                            self._stackup(t2))
+
+    def _lowest_common_ancestor(self, n1, n2):
+        depth = self._depth
+        up = self._up
+        if depth[n1] < depth[n2]:
+            n1, n2 = n2, n1
+        diff = depth[n1] - depth[n2]
+        k = 0
+        while diff:
+            if diff & 1:
+                n1 = up[k][n1]
+            diff >>= 1
+            k += 1
+        if n1 != n2:
+            for k in range(len(up) - 1, -1, -1):
+                if up[k][n1] != up[k][n2]:
+                    n1 = up[k][n1]
+                    n2 = up[k][n2]
+            n1 = up[0][n1]
+            if n1 != up[0][n2]:
+                return None # in different hierarchies
+        return self._types[n1]
+
     def _common_ancestor_helper(self, l1, l2):
 
         #max_len = len(min(l1, l2))
@@ -75,7 +280,8 @@ class SymbolTable:
         for i in range(1, max_len+1):
             if l1[-i] != l2[-i]:
                 return l1[-i+1]
-        return min(l1, l2)[0]
+        # one is an ancestor of the other, the shortest list
+        return min(l1, l2, key=len)[0]
 
     def _stackup(self, typeid):
 
@@ -94,7 +300,7 @@ class SymbolTable:
         def _stackup_helper(_dict, _typeid):
             '''
             Could go into infinite loop if
-            their is a circular dependency
+            their is a circular dependency (see validate)
             '''
             while _typeid is not None:
                 yield _typeid
@@ -103,22 +309,51 @@ class SymbolTable:
         return [t for t in _stackup_helper(self._dict, typeid)]
 
 
+# tracer of the analyzers built without one
+_NO_TRACER = tracing.Tracer()
+
+
 class SymanticAnalyzer:
-    '''Generic Class, only creates scope with variable names'''
+    '''
+    Generic Class, only creates scope with variable names
+
+    tracer : cool.tracing.Tracer told about the phases, nodes and scopes
+             of the analysis; the analyzer is then an instance of the
+             traced subclass of its class
+    '''
+
+    def __new__(cls, ast, tracer=None):
+        if tracer is not None:
+            cls = tracing.traced_class(cls)
+        return super(SymanticAnalyzer, cls).__new__(cls)
 
-    def __init__(self, ast):
+    def __init__(self, ast, tracer=None):
 
         self._ast = ast
+        self._tracer = tracer if tracer is not None else _NO_TRACER
         self._scope_stack = list()
-        self._init_sym_table()
+        with self._phase('symbol table'):
+            self._init_sym_table()
         self._curr_class = None
+        self._curr_source = None
+        self._diagnostics = None # list of Diagnostic when collecting
+
+    @contextlib.contextmanager
+    def _phase(self, phase):
+        self._tracer.phase_start(phase)
+        try:
+            yield
+        finally:
+            self._tracer.phase_end(phase)
         
     def _init_sym_table(self):
 
         self._sym_table = SymbolTable()
+        self._classes = dict() # name -> first ClassDefinition of it
         
         for _class in self._ast:
             if isinstance(_class, ClassDefinition):
+                self._classes.setdefault(_class.name, _class)
                 
                 parent_typeid = 'Object' if _class.parent_typeid is None \
                              else _class.parent_typeid
@@ -129,12 +364,33 @@ class SymanticAnalyzer:
                 try:
                     self._sym_table.add_type(_class.name, parent_typeid)
                 except MultipleDefinitionException as err:
-                    print(err)
+                    # the first definition is kept, the others are
+                    # reported as diagnostics when collecting
+                    self._tracer.error_found(_class, err)
 
-    def _new_scope(self):
-        self._scope_stack.append(dict())
+        # classes in topological order, parents first
+        self._class_order = self._sym_table.validate()
+        self._sym_table.freeze()
 
-    def _pop_scope(self):
+    def _error(self, node, message, error=TypeCheckingException):
+        '''
+        Raises error(node, message), or when collecting diagnostics
+        records it and returns ERROR_TYPE as the type of node
+        '''
+        err = error(node, message)
+        if self._diagnostics is None:
+            raise err
+        source = self._curr_source
+        location = source.location(node.lexpos) if source is not None \
+            else '<string>'
+        self._diagnostics.append(Diagnostic(err, location))
+        return ERROR_TYPE
+
+    def _new_scope(self, node):
+        # (objectid, typeid) in declaration order, see Binder
+        self._scope_stack.append(list())
+
+    def _pop_scope(self, node):
         self._scope_stack.pop()
 
     def _add_object(self, objectid, typeid):
@@ -143,12 +399,12 @@ class SymanticAnalyzer:
             raise UnknownTypeException(typeid)
             
         if objectid is not self._scope_stack[-1]:
-            self._scope_stack[-1][objectid] = typeid
+            self._scope_stack[-1].append((objectid, typeid))
         else:
             raise MultipleDeclarationException(objectid)
 
     def _isdeclared_inscope(self, objectid):
-        return True if objectid in self._scope_stack[-1] else False
+        return any(name == objectid for name, _ in self._scope_stack[-1])
 
     def _get_type(self, objectid):
         #CODE SMELLS: not sure if this is correct
@@ -157,21 +413,28 @@ class SymanticAnalyzer:
             #return 'SELF_TYPE'
         else:
             for scope in reversed(self._scope_stack):
-                if objectid in scope.keys():
-                    return scope[objectid]
+                for name, typeid in reversed(scope):
+                    if name == objectid:
+                        return typeid
+
+    def _get_bound_type(self, objectid, binding):
+        '''_get_type of an objectid resolved by the Binder'''
+        if objectid == 'self':
+            return self._curr_class
+        if binding is not None:
+            depth, index = binding
+            return self._scope_stack[depth][index][1]
 
     def print_sym_table(self):
         self._sym_table.print()
 
     #visitors
     def visit_ClassDefinition(self, class_def):
-        print('visiting class def :', class_def.name)
-        self._new_scope()
+        self._new_scope(class_def)
         return True
     
     def leave_ClassDefinition(self, class_def):
-        print('leaving class def')
-        self._pop_scope()
+        self._pop_scope(class_def)
         
     def visit_VariableDefinition(self, var_decl):
         return True
@@ -180,26 +443,24 @@ class SymanticAnalyzer:
         pass
 
     def visit_VariableDeclaration(self, var_decl):
-        print('visiting variable decl : ({0}, {1})'.format(
-            var_decl.name,
-            var_decl.typeid))
-
         if not self._sym_table.isdefined(var_decl.typeid):
-            raise ClassNotFoundException(var_decl.typeid)
+            self._error(var_decl, 'undefined class ' + var_decl.typeid,
+                        ClassNotFoundException)
+            # declared, so the bindings of the scope stay in place
+            self._scope_stack[-1].append((var_decl.name, ERROR_TYPE))
         else:
             self._add_object(var_decl.name, var_decl.typeid)
         return True
             
     def leave_VariableDeclaration(self, var_decl):
-        print('leaving variable decl : ', var_decl)
+        pass
 
     def visit_MethodDefinition(self, method_def):
-        print('visiting method def :', method_def.name)
-        self._new_scope()
+        self._new_scope(method_def)
         return True
 
     def leave_MethodDefinition(self, method_def):
-        self._pop_scope()
+        self._pop_scope(method_def)
 
     def visit_Expression(self, arg):
         return True
@@ -239,12 +500,11 @@ class SymanticAnalyzer:
         pass
 
     def visit_LetExpression(self, lef_exp):
-        print('visiting let expression :')
-        self._new_scope()
+        self._new_scope(lef_exp)
         return True
 
     def leave_LetExpression(self, arg):
-        self._pop_scope()
+        self._pop_scope(arg)
 
     def visit_CaseExpression(self, arg):
         return True
@@ -253,13 +513,11 @@ class SymanticAnalyzer:
         pass
 
     def visit_CaseStatement(self, arg):
-        print('visiting case statement :')
-        self._new_scope()
+        self._new_scope(arg)
         return True
 
     def leave_CaseStatement(self, arg):
-        print('leaving case statement :')
-        self._pop_scope()
+        self._pop_scope(arg)
 
     def visit_NewStatement(self, arg):
         return True
@@ -316,87 +574,419 @@ class SymanticAnalyzer:
         pass
 
 
+class Binder:
+    '''
+    Binding pass: resolves the name of each ObjectIdExpression and the
+    lhs of each Assignment to its declaration once, before the type
+    checking, setting the binding of the node to (depth, index): the
+    declaration is the index-th one of the depth-th scope of the
+    SymanticAnalyzer scope stack when the node is type checked. The
+    binding of self and of undeclared names is None.
+
+    The scopes are opened and closed on the same nodes as by the
+    SymanticAnalyzer, and accept() visits the declarations in the order
+    the TypeChecker checks them.
+    '''
+
+    def __init__(self):
+        # objectid -> bindings of its declarations in scope, innermost
+        # last, so a name is resolved without walking up the scopes
+        self._declared = dict()
+        self._scope_stack = list() # objectids declared in each scope
+
+    def _new_scope(self, node):
+        self._scope_stack.append(list())
+        return True
+
+    def _pop_scope(self, node):
+        for objectid in self._scope_stack.pop():
+            bindings = self._declared[objectid]
+            bindings.pop()
+            if not bindings:
+                del self._declared[objectid]
+
+    def _resolve(self, objectid):
+        if objectid == 'self':
+            return None
+        bindings = self._declared.get(objectid)
+        return bindings[-1] if bindings else None
+
+    def _visit(self, node):
+        return True
+
+    def _leave(self, node):
+        pass
+
+    visit_ClassDefinition = _new_scope
+    leave_ClassDefinition = _pop_scope
+    visit_MethodDefinition = _new_scope
+    leave_MethodDefinition = _pop_scope
+    visit_LetExpression = _new_scope
+    leave_LetExpression = _pop_scope
+    visit_CaseStatement = _new_scope
+    leave_CaseStatement = _pop_scope
+
+    def visit_VariableDeclaration(self, var_decl):
+        # a name declared again in a scope hides the first declaration
+        scope = self._scope_stack[-1]
+        binding = (len(self._scope_stack) - 1, len(scope))
+        self._declared.setdefault(var_decl.name, list()).append(binding)
+        scope.append(var_decl.name)
+        return True
+
+    def visit_ObjectIdExpression(self, arg):
+        arg.binding = self._resolve(arg.name)
+        return True
+
+    def visit_Assignment(self, arg):
+        arg.binding = self._resolve(arg.lhs)
+        return True
+
+# the other nodes are only traversed
+for _name in dir(SymanticAnalyzer):
+    if _name.startswith('visit_') and not hasattr(Binder, _name):
+        setattr(Binder, _name, Binder._visit)
+    elif _name.startswith('leave_') and not hasattr(Binder, _name):
+        setattr(Binder, _name, Binder._leave)
+del _name
+
+
 class TypeChecker(SymanticAnalyzer):
+    '''
+    While checking a class, the checker records the types whose facts
+    (place in the hierarchy, method signatures, being defined) the
+    class relied on. type_check() keeps them with the outcome of each
+    class, for recheck() to check again only the classes a change can
+    affect.
+    '''
+
+    def __init__(self, ast, tracer=None):
+        super(TypeChecker, self).__init__(ast, tracer)
+        with self._phase('method tables'):
+            self._init_method_tables()
+        with self._phase('binding'):
+            self._bind(self._ast)
+        self._used = set()
+        self._results = dict() # index in ast -> None or the error raised
+        self._depends = dict() # index in ast -> types relied on
+
+    def _bind(self, classes):
+        binder = Binder()
+        for _class in classes:
+            if isinstance(_class, ClassDefinition):
+                _class.accept(binder)
 
-    def __init__(self, ast):
-        super(TypeChecker, self).__init__(ast)
+    def _init_method_tables(self):
+        '''
+        For each class, the methods it defines or inherits, by name:
+        name -> (signature, name of the defining class), and the
+        attributes it inherits: name -> typeid. Built parents first, in
+        the topological order of the classes.
+        '''
+        self._methods = dict()
+        self._attributes = dict()
+        for typeid in self._class_order:
+            parentid = self._sym_table.get_parent(typeid)
+            table = dict(self._methods.get(parentid, ()))
+            defined = dict()
+            for m in self._classes[typeid].methods:
+                # the first definition in a class is used
+                if m.name not in defined:
+                    defined[m.name] = (m.get_signature(), typeid)
+            table.update(defined)
+            self._methods[typeid] = table
+
+            # the attributes of the class itself are bound by the Binder
+            inherited = self._attributes.get(parentid, {})
+            parent = self._classes.get(parentid)
+            if parent is not None and parent.variables:
+                inherited = dict(inherited)
+                for v in parent.variables:
+                    inherited.setdefault(v.var_decl.name, v.var_decl.typeid)
+            self._attributes[typeid] = inherited
 
     def common_ancestor(self, _list):
+        # types of no class (the error type among them) are left out
+        isdefined = self._sym_table.isdefined
+        if not all(isdefined(t) for t in _list):
+            _list = [t for t in _list if isdefined(t)] or [ERROR_TYPE]
+        self._used.update(_list)
         return self._sym_table.common_ancestor(_list)
 
     def is_parent(self, parent_typeid, child_typeid):
+        self._used.add(parent_typeid)
+        self._used.add(child_typeid)
         return self._sym_table.is_parent(parent_typeid, child_typeid)
         
     def get_method_sign(self, typeid, mthd):
         
-        for _class in self._ast:
-            if _class.name == typeid:
-                if any(m.name == mthd for m in _class.methods):
-                    for m in _class.methods:
-                        if m.name == mthd:
-                            return m.get_signature()
-                else:
-                    parent_typeid = self._sym_table.get_parent(typeid)
-                    return self.get_method_sign(parent_typeid, mthd)
+        self._used.add(typeid)
+        methods = self._methods.get(typeid)
+        if methods is not None and mthd in methods:
+            return methods[mthd][0]
+
+    def _get_identifier_type(self, node, objectid, binding):
+        '''type of an identifier, declared or inherited'''
+        typeid = self._get_bound_type(objectid, binding)
+        if typeid is None:
+            typeid = self._attributes[self._curr_class].get(objectid)
+            if typeid is None:
+                return self._error(node, 'undeclared identifier ' + objectid)
+        return typeid
+
+    def _conforms(self, child_typeid, parent_typeid):
+        return child_typeid == parent_typeid or \
+            self.is_parent(parent_typeid, child_typeid) or \
+            child_typeid == ERROR_TYPE or parent_typeid == ERROR_TYPE
 
     def _type_check_class(self, _class):
         self._curr_class = _class.name
+        self._curr_source = _class.source
+        self._used = {_class.name}
+        # scopes left by a class that failed
+        del self._scope_stack[:]
+        if self._diagnostics is not None and \
+           self._classes.get(_class.name) is not _class:
+            self._error(_class, 'multiple definitions for class ' +
+                        _class.name)
         _class.type_check(self)
+
+    def _check_recorded(self, i, _class):
+        '''_type_check_class of the class at index i, keeping its outcome'''
+        try:
+            self._type_check_class(_class)
+        except TypeCheckingException as err:
+            self._results[i] = err
+            raise
+        else:
+            self._results[i] = None
+        finally:
+            self._depends[i] = self._used
         
-    def type_check(self, class_name=None):
-        ''' The main typechecker class'''
+    def type_check(self, class_name=None, jobs=1, collect=False):
+        '''
+        The main typechecker class
+
+        jobs : with jobs > 1 and no class_name, the classes are checked
+               by that many worker processes, each sent the classes,
+               the frozen SymbolTable and the method and attribute
+               tables once, then only the ranges of classes to check.
+               The error raised is that of the first failing class in
+               program order, as when checking them one after another.
+               The workers are not traced.
+        collect : instead of raising the first type error, give the
+                  wrong expressions ERROR_TYPE, go on checking and
+                  return the list of Diagnostic of all of them, in
+                  program order
+        '''
 
+        with self._phase('type check'):
+            if collect:
+                self._diagnostics = list()
+            try:
+                if jobs > 1 and class_name is None and len(self._ast) > 1:
+                    self._type_check_in_workers(jobs)
+                else:
+                    self._type_check(class_name)
+            finally:
+                diagnostics = self._diagnostics
+                self._diagnostics = None
+            if collect and class_name is None:
+                # the outcomes recheck() reuses are those of raising
+                self._results.clear()
+                self._depends.clear()
+        return diagnostics
+
+    def _type_check(self, class_name):
         if class_name is not None:
-            for _class in self._ast:
-                if _class.name == class_name:
-                    self._type_check_class(_class)
-        else:
-            for _class in self._ast:
+            _class = self._classes.get(class_name)
+            if _class is not None:
                 self._type_check_class(_class)
+        else:
+            for i, _class in enumerate(self._ast):
+                self._check_recorded(i, _class)
+
+    def _declared_attributes(self, typeid):
+        _class = self._classes.get(typeid)
+        if _class is None:
+            return None
+        return [(v.var_decl.name, v.var_decl.typeid)
+                for v in _class.variables]
 
-    #Type checking methods for cool language constructs
+    def recheck(self, changed):
+        '''
+        Type checks the program after the classes of changed, a list of
+        ClassDefinition, replaced the classes of the same names (or
+        were added after the others), raising the error type_check()
+        would. Only the changed classes, those not checked before and
+        those that relied on facts about a changed class whose parent,
+        method signatures or attributes changed, or about a class
+        deriving from one, are checked again, the others keep the
+        outcome of their last check. Returns the names of the classes
+        checked.
+        '''
+        names = {_class.name for _class in changed}
+        facts = {name: (self._sym_table.get_parent(name),
+                        self._methods.get(name),
+                        self._declared_attributes(name),
+                        self._sym_table.descendants(name))
+                 for name in names}
+
+        replacements = {_class.name: _class for _class in changed}
+        ast = [replacements.pop(_class.name, _class)
+               if _class.name in names else _class for _class in self._ast]
+        added = [_class for _class in changed
+                 if replacements.get(_class.name) is _class]
+        self._ast = ast + added
+
+        with self._phase('symbol table'):
+            self._init_sym_table()
+        with self._phase('method tables'):
+            self._init_method_tables()
+        with self._phase('binding'):
+            self._bind(changed)
+        dirty = set()
+        for name, (parentid, methods, attributes, descendants) in \
+                facts.items():
+            if parentid != self._sym_table.get_parent(name) or \
+               methods != self._methods.get(name) or \
+               attributes != self._declared_attributes(name):
+                dirty.update(descendants)
+                dirty.update(self._sym_table.descendants(name))
+
+        checked = []
+        first = None
+        with self._phase('type check'):
+            for i, _class in enumerate(self._ast):
+                if i not in self._results or _class.name in names or \
+                   not dirty.isdisjoint(self._depends[i]):
+                    checked.append(_class.name)
+                    try:
+                        self._check_recorded(i, _class)
+                    except TypeCheckingException:
+                        pass
+                if first is None:
+                    first = self._results[i]
+        if first is not None:
+            raise first
+        return checked
+
+    def _type_check_in_workers(self, jobs):
+        # the outcomes and dependencies stay in the workers
+        self._results.clear()
+        self._depends.clear()
+        classes = list(self._ast)
+        workers = min(jobs, len(classes))
+        # a few ranges of classes per worker keeps them busy with few
+        # round trips
+        step = -(-len(classes) // (workers * 4))
+        ranges = [(start, min(start + step, len(classes)))
+                  for start in range(0, len(classes), step)]
+        environment = self._environment(classes)
+        collect = self._diagnostics is not None
+        with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(tracing.untraced_class(type(self)),
+                          environment)) as pool:
+            # map returns in order, raising the error of the first
+            # failing class
+            for diagnostics in pool.map(_check_in_worker, ranges,
+                                        [collect] * len(ranges)):
+                if collect:
+                    self._diagnostics.extend(diagnostics)
+
+    def _environment(self, classes):
+        '''
+        What _from_environment() builds a checker of classes from, sent
+        to the workers. The classes go in the cool.serialization format:
+        pickle recurses into the nodes and fails on deep ones when the
+        workers are spawned rather than forked.
+        '''
+        return (self._sym_table, self._methods, self._attributes,
+                serialization.dumps(classes),
+                [getattr(_class, 'source', None) for _class in classes])
+
+    @classmethod
+    def _from_environment(cls, environment):
+        '''
+        Checker of the classes of a program, bound again, given its
+        SymbolTable, method and attribute tables and classes (see
+        _environment)
+        '''
+        checker = object.__new__(cls)
+        checker._sym_table, checker._methods, checker._attributes, \
+            data, sources = environment
+        checker._ast = serialization.loads(data)
+        checker._classes = dict()
+        for _class, source in zip(checker._ast, sources):
+            _class.source = source
+            checker._classes.setdefault(_class.name, _class)
+        checker._tracer = _NO_TRACER
+        checker._scope_stack = list()
+        checker._curr_class = None
+        checker._curr_source = None
+        checker._diagnostics = None
+        checker._used = set()
+        checker._results = dict()
+        checker._depends = dict()
+        # the bindings are not serialized
+        checker._bind(checker._ast)
+        return checker
+
+    def visit_VariableDeclaration(self, var_decl):
+        self._used.add(var_decl.typeid)
+        return super(TypeChecker, self).visit_VariableDeclaration(var_decl)
+
+    #Type checking methods for cool language constructs, they yield the
+    #subnodes to type check and receive their types (see
+    #SourceElement.type_check)
     def typeof_ClassDefinition(self, arg):
 
         for variable in arg.variables:
-            variable.type_check(self)
+            yield variable
 
         for method in arg.methods:
-            method.type_check(self)
+            yield method
 
         return arg.name
 
     def typeof_MethodDefinition(self, arg):
 
         for formal_arg in arg.formal_args:
-            formal_arg.type_check(self)
+            yield formal_arg
 
-        type_body = arg.body.type_check(self)
+        type_body = yield arg.body
 
         if arg.return_type == 'SELF_TYPE':
             type_return_val = self._curr_class
         else:
             type_return_val = arg.return_type
 
-        if type_body == type_return_val or \
-           self.is_parent(type_return_val, type_body):
+        if self._conforms(type_body, type_return_val):
             return arg.return_type
         else:
-            raise TypeCheckingException(arg)
+            return self._error(arg, 'type {0} of the body of method {1} '
+                               'does not conform to its return type {2}'
+                               .format(type_body, arg.name,
+                                       type_return_val))
 
     def typeof_VariableDefinition(self, arg):
 
-        type_var = arg.var_decl.type_check(self)
+        type_var = yield arg.var_decl
         
         if arg.var_init is None:
             return type_var
         else:
-            type_expr = arg.var_init.type_check(self)
+            type_expr = yield arg.var_init
         
-            if type_var == type_expr or \
-               self.is_parent(type_var, type_expr):
+            if self._conforms(type_expr, type_var):
                 return type_var
             else:
-                raise TypeCheckingException(arg)
+                return self._error(arg, 'type {0} of the initialization '
+                                   'of {1} does not conform to its '
+                                   'declared type {2}'.format(
+                                       type_expr, arg.var_decl.name,
+                                       type_var))
             
     def typeof_VariableDeclaration(self, arg):
         #CODE SMELLS
@@ -407,14 +997,15 @@ class TypeChecker(SymanticAnalyzer):
 
     def typeof_Assignment(self, arg):
 
-        type_lhs = self._get_type(arg.lhs)
-        type_expr = arg.expr.type_check(self)
+        type_expr = yield arg.expr
+        type_lhs = self._get_identifier_type(arg, arg.lhs, arg.binding)
         
-        if type_lhs == type_expr or \
-           self.is_parent(type_lhs, type_expr):
+        if self._conforms(type_expr, type_lhs):
             return type_expr
         else:
-            raise TypeCheckingException(arg)
+            return self._error(arg, 'type {0} of the value assigned to {1} '
+                               'does not conform to its declared type {2}'
+                               .format(type_expr, arg.lhs, type_lhs))
 
     def typeof_MethodInvoke(self, arg):
         '''
@@ -425,39 +1016,50 @@ class TypeChecker(SymanticAnalyzer):
         type_expr_list = []
 
         for method_arg in arg.arguments:
-            type_expr_list.append(method_arg.type_check(self))
+            type_expr_list.append((yield method_arg))
 
         #typecheck lefthand side expression
         if arg.expr is not None:
-            type_lhs_expr = arg.expr.type_check(self)
+            type_lhs_expr = yield arg.expr
             
             if arg.at_type is not None:
                 if type_lhs_expr == 'SELF_TYPE':
                     type_lhs_expr = self._curr_class
 
-                if arg.at_type == type_lhs_expr or \
-                   self.is_parent(arg.at_type, type_lhs_expr):
+                if self._conforms(type_lhs_expr, arg.at_type):
                     type_lhs_expr = arg.at_type
                 else:
-                    raise TypeCheckingException(arg)
+                    return self._error(arg, 'type {0} does not conform to '
+                                       'the static dispatch type {1}'
+                                       .format(type_lhs_expr, arg.at_type))
         else:
             type_lhs_expr = self._curr_class
+
+        if type_lhs_expr == ERROR_TYPE:
+            return ERROR_TYPE
         
         #get the function signature
         mthd_sign = self.get_method_sign(type_lhs_expr, arg.name)
 
         if mthd_sign is None:
-            raise TypeCheckingException('could not find method' + arg)
+            return self._error(arg, 'could not find method {0} of class {1}'
+                               .format(arg.name, type_lhs_expr))
 
         if len(mthd_sign[0]) != len(type_expr_list):
-            raise TypeCheckingException('Method number of arguments do not match' + arg)
+            return self._error(arg, 'method {0} of class {1} takes {2} '
+                               'arguments, {3} given'.format(
+                                   arg.name, type_lhs_expr,
+                                   len(mthd_sign[0]), len(type_expr_list)))
         for i in range(0, len(type_expr_list)):
             type_actl_arg = type_expr_list[i]
             type_frml_arg = mthd_sign[0][i]
 
-            if type_actl_arg != type_frml_arg and \
-               not self.is_parent(type_frml_arg, type_actl_arg):
-                raise TypeCheckingException('Method formal argument type do not match actual argument type'.format(type_actl_arg, type_frml_arg))
+            if not self._conforms(type_actl_arg, type_frml_arg):
+                return self._error(arg, 'type {0} of argument {1} of method '
+                                   '{2} does not conform to the type {3} '
+                                   'of its formal parameter'.format(
+                                       type_actl_arg, i + 1, arg.name,
+                                       type_frml_arg))
             
         #method signature get return type
         if mthd_sign[1] == 'SELF_TYPE':
@@ -466,106 +1068,123 @@ class TypeChecker(SymanticAnalyzer):
             return mthd_sign[1]
 
     def typeof_IfThenElse(self, arg):
-        if arg.condition.type_check(self) != 'Bool':
-            raise TypeCheckingException
+        type_condition = yield arg.condition
+        if type_condition != 'Bool' and type_condition != ERROR_TYPE:
+            self._error(arg, 'condition of type {0} is not a Bool'
+                        .format(type_condition))
 
-        type_if = arg.ifbody.type_check(self)
-        type_else = arg.elsebody.type_check(self)
+        type_if = yield arg.ifbody
+        type_else = yield arg.elsebody
         return self.common_ancestor([type_if, type_else])
 
     def typeof_WhileLoop(self, arg):
-        if arg.condition.type_check(self) != 'Bool':
-            raise TypeCheckingException
-        arg.loopbody.type_check(self)
+        type_condition = yield arg.condition
+        if type_condition != 'Bool' and type_condition != ERROR_TYPE:
+            self._error(arg, 'loop condition of type {0} is not a Bool'
+                        .format(type_condition))
+        yield arg.loopbody
         return 'Object'
 
     def typeof_BlockStatement(self, arg):
         for stat in arg.statements[:-1]:
-            stat.type_check(self)
-        return arg.statements[-1].type_check(self)
+            yield stat
+        return (yield arg.statements[-1])
 
     def typeof_LetExpression(self, arg):
 
         for _var in arg.var_list:
-            _var.type_check(self)
+            yield _var
             
-        return arg.expr.type_check(self)
+        return (yield arg.expr)
 
     def typeof_CaseExpression(self, arg):
         #TODO: should arg.expr match that of case statements
-        arg.expr.type_check(self)
+        yield arg.expr
         type_expr_list = []
 
         for stat in arg.statements:
-            type_expr_list.append(stat.type_check(self))
+            type_expr_list.append((yield stat))
 
         return self.common_ancestor(type_expr_list)
 
     def typeof_CaseStatement(self, arg):
-        arg.var_decl.type_check(self)
-        return arg.expr.type_check(self)
+        yield arg.var_decl
+        return (yield arg.expr)
 
     def typeof_NewStatement(self, arg):
         #TODO: this is incorrect if arg.typeid is SELF_TYPE
         if arg.typeid == 'SELF_TYPE':
             return self._curr_class
-        else:
-            return arg.typeid
+        self._used.add(arg.typeid)
+        if not self._sym_table.isdefined(arg.typeid):
+            return self._error(arg, 'undefined class ' + arg.typeid,
+                               ClassNotFoundException)
+        return arg.typeid
 
     def typeof_IsVoidExpression(self, arg):
-        arg.expr.type_check(self)
+        yield arg.expr
         return 'Bool'
 
     def typeof_ComplementExpression(self, arg):
-        typeof_expr = arg.expr.type_check(self)
+        typeof_expr = yield arg.expr
 
         if arg.isbool:
-            if typeof_expr == 'Bool':
+            if typeof_expr == 'Bool' or typeof_expr == ERROR_TYPE:
                 return 'Bool'
             else:
-                raise TypeCheckingException(arg)
+                return self._error(arg, 'operand of not of type {0} is '
+                                   'not a Bool'.format(typeof_expr))
         else:
-            if typeof_expr == 'Int':
+            if typeof_expr == 'Int' or typeof_expr == ERROR_TYPE:
                 return 'Int'
             else:
-                raise TypeCheckingException(arg)
+                return self._error(arg, 'operand of ~ of type {0} is not '
+                                   'an Int'.format(typeof_expr))
 
     def typeof_InBracketsExpression(self, arg):
-        return arg.expr.type_check(self)
+        return (yield arg.expr)
 
     def typeof_BinaryOperationExpression(self, arg):
 
-        type_expr1 = arg.expr1.type_check(self)
-        type_expr2 = arg.expr2.type_check(self)
+        type_expr1 = yield arg.expr1
+        type_expr2 = yield arg.expr2
+        ints = type_expr1 in ('Int', ERROR_TYPE) and \
+            type_expr2 in ('Int', ERROR_TYPE)
 
         if arg.binop in ['+', '-', '*', '/']:
-            if type_expr1 == 'Int' and \
-               type_expr2 == 'Int':
+            if ints:
                 return 'Int'
             else:
-                raise TypeCheckingException(arg)
+                return self._error(arg, 'operands of {0} of types {1} and '
+                                   '{2} are not Int'.format(
+                                       arg.binop, type_expr1, type_expr2))
         elif arg.binop in ['<', '<=']:
-            if type_expr1 == 'Int' and \
-               type_expr2 == 'Int':
+            if ints:
                 return 'Bool'
             else:
-                raise BinopTypeCheckingException(arg)
+                return self._error(arg, 'operands of {0} of types {1} and '
+                                   '{2} are not Int'.format(
+                                       arg.binop, type_expr1, type_expr2),
+                                   BinopTypeCheckingException)
         else: #elif arg.binop == '=':
             valid_types = ['Int', 'Bool', 'String']
             if type_expr1 in valid_types and \
                type_expr2 in valid_types and \
                type_expr1 == type_expr2:
                 return 'Bool'
-            elif type_expr1 == type_expr2:
+            elif type_expr1 == type_expr2 or \
+                 ERROR_TYPE in (type_expr1, type_expr2):
                 return 'Bool'
             else:
                 #TODO: this does not look right
                 #return self.common_ancestor([typeof_expr1, typeof_expr2])
                 #raise NotImplementedError()
-                raise TypeCheckingException(arg)
+                return self._error(arg, 'operands of = of types {0} and {1} '
+                                   'cannot be compared'.format(
+                                       type_expr1, type_expr2))
                 
     def typeof_ObjectIdExpression(self, arg):
-        return self._get_type(arg.name)
+        return self._get_identifier_type(arg, arg.name, arg.binding)
 
     def typeof_NumberExpression(self, arg):
         return 'Int'
@@ -578,3 +1197,17 @@ class TypeChecker(SymanticAnalyzer):
 
 
     
+
+# TypeChecker of a type_check worker process
+_worker = None
+
+def _init_worker(checker_class, environment):
+    global _worker
+    _worker = checker_class._from_environment(environment)
+
+def _check_in_worker(classes, collect):
+    start, stop = classes
+    _worker._diagnostics = list() if collect else None
+    for _class in _worker._ast[start:stop]:
+        _worker._type_check_class(_class)
+    return _worker._diagnostics
@@ -0,0 +1,115 @@
+import hashlib
+import importlib.util
+import os
+import os.path as osp
+import shutil
+import tempfile
+
+import ply
+import ply.lex as lex
+import ply.yacc as yacc
+
+from . parser import CoolLexer
+from . parser import CoolParser
+
+
+def default_table_dir():
+    '''Per user directory for the optimized lexer/parser tables'''
+    base = os.environ.get('XDG_CACHE_HOME',
+                          osp.join(osp.expanduser('~'), '.cache'))
+    return osp.join(base, 'cool_compiler')
+
+
+def _grammar_spec(cls):
+    '''Everything PLY builds its tables from: token and literal
+    lists, rule regexes/productions in definition order, precedence'''
+    rules = []
+    for name, value in vars(cls).items():
+        if name.startswith(('t_', 'p_')):
+            if callable(value):
+                line = value.__code__.co_firstlineno
+                rules.append((line, name, value.__doc__))
+            else:
+                rules.append((0, name, value))
+    rules.sort(key=lambda r: r[:2])
+    return repr((getattr(cls, 'tokens', None),
+                 getattr(cls, 'literals', None),
+                 getattr(cls, 'states', None),
+                 getattr(cls, 'precedence', None),
+                 [r[1:] for r in rules]))
+
+def grammar_version():
+    '''
+    Hash of the CoolLexer/CoolParser grammar and the PLY version. Any
+    edit to the token rules or the productions changes it, so tables
+    stored under an older version are never picked up.
+    '''
+    h = hashlib.sha1(ply.__version__.encode('utf-8'))
+    for cls in (CoolLexer, CoolParser):
+        h.update(_grammar_spec(cls).encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def _load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_lexer(table_dir, version):
+    '''
+    Returns a lexer built from the cached lextab, building and
+    storing the table first if it is missing or unreadable
+    '''
+    name = 'cool_lextab_' + version
+    path = osp.join(table_dir, name + '.py')
+    nolog = lex.NullLogger()
+
+    if osp.isfile(path):
+        try:
+            return lex.lex(module=CoolLexer(), optimize=1,
+                           lextab=_load_module(name, path),
+                           errorlog=nolog)
+        except Exception:
+            pass # stale or truncated table, rebuild below
+
+    tmpdir = tempfile.mkdtemp(dir=table_dir)
+    try:
+        lexer = lex.lex(module=CoolLexer(), optimize=1, lextab=name,
+                        outputdir=tmpdir, errorlog=nolog)
+        os.replace(osp.join(tmpdir, name + '.py'), path)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return lexer
+
+
+def load_parser(table_dir, version):
+    '''
+    Returns a parser built from the cached LALR tables. PLY compares
+    the signature stored with the tables against the grammar and
+    regenerates them when they do not match.
+    '''
+    path = osp.join(table_dir, 'cool_parsetab_' + version + '.pickle')
+    nolog = yacc.NullLogger()
+
+    if osp.isfile(path):
+        try:
+            return yacc.yacc(module=CoolParser(), start='program',
+                             debug=False, write_tables=False,
+                             picklefile=path, errorlog=nolog)
+        except Exception:
+            pass
+
+    fd, tmppath = tempfile.mkstemp(dir=table_dir, suffix='.pickle')
+    os.close(fd)
+    os.unlink(tmppath)
+    try:
+        parser = yacc.yacc(module=CoolParser(), start='program',
+                           debug=False, picklefile=tmppath,
+                           errorlog=nolog)
+        os.replace(tmppath, path)
+    finally:
+        if osp.exists(tmppath):
+            os.unlink(tmppath)
+    return parser
@@ -0,0 +1,129 @@
+from array import array
+
+from ply.lex import LexToken
+
+from . parser import CoolLexer
+from . position import LineIndex
+from . scanner import CoolScanner
+
+# token kinds are stored as indices into this tuple
+TOKEN_TYPES = tuple(CoolLexer.tokens) + tuple(CoolLexer.literals)
+_KINDS = {t: i for i, t in enumerate(TOKEN_TYPES)}
+_INT_CONST = _KINDS['INT_CONST']
+_BOOL_CONST = _KINDS['BOOL_CONST']
+
+
+class TokenBuffer(object):
+    '''
+    Tokens of one input in parallel typed arrays: kind, start offset,
+    length and line. Token values are not stored, they are decoded
+    from the input text when asked for. Indexing and iteration give
+    the same (type, value, line) tuples as Compiler.tokenize_str, and
+    lexer() feeds the buffer to the parser without lexing again.
+    '''
+
+    def __init__(self, text, filename=None):
+        self.text = text
+        self.line_index = LineIndex(text, filename)
+        self.kinds = array('B')
+        self.starts = array('i')
+        self.lengths = array('i')
+        self.lines = array('i')
+
+    @classmethod
+    def from_lexer(cls, lexer, text, filename=None):
+        '''Lexes text with a CoolScanner or a PLY lexer into a buffer'''
+        buf = cls(text, filename)
+        kinds = _KINDS
+        kind_append = buf.kinds.append
+        start_append = buf.starts.append
+        length_append = buf.lengths.append
+        line_append = buf.lines.append
+
+        lexer.line_index = buf.line_index
+        lexer.input(text)
+        if isinstance(lexer, CoolScanner):
+            for type_, value, start, stop in lexer.scan():
+                kind_append(kinds[type_])
+                start_append(start)
+                length_append(stop - start)
+                line_append(lexer.lineno)
+        else:
+            lexer.lineno = 1
+            for tok in lexer:
+                kind_append(kinds[tok.type])
+                start_append(tok.lexpos)
+                length_append(lexer.lexpos - tok.lexpos)
+                line_append(lexer.lineno)
+        return buf
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def type(self, i):
+        return TOKEN_TYPES[self.kinds[i]]
+
+    def value(self, i):
+        start = self.starts[i]
+        text = self.text[start:start + self.lengths[i]]
+        kind = self.kinds[i]
+        if kind == _INT_CONST:
+            return int(text)
+        elif kind == _BOOL_CONST:
+            return text.lower()
+        return text
+
+    def __getitem__(self, i):
+        return (self.type(i), self.value(i), self.lines[i])
+
+    def __iter__(self):
+        for i in range(len(self.kinds)):
+            yield self[i]
+
+    def lexer(self):
+        return BufferLexer(self)
+
+
+class BufferLexer(object):
+    '''Replays a TokenBuffer through the lexer interface of the parser'''
+
+    def __init__(self, buf):
+        self.buffer = buf
+        self.lexdata = buf.text
+        self.line_index = buf.line_index
+        self.lineno = 1
+        self._next = 0
+
+    def input(self, data):
+        self._next = 0
+
+    def token(self):
+        i = self._next
+        buf = self.buffer
+        if i >= len(buf.kinds):
+            return None
+        self._next = i + 1
+        t = LexToken()
+        t.type = TOKEN_TYPES[buf.kinds[i]]
+        t.value = buf.value(i)
+        t.lineno = self.lineno = buf.lines[i]
+        t.lexpos = buf.starts[i]
+        t.lexer = self
+        return t
+
+    def scan(self):
+        '''(type, value, start, stop) of the remaining tokens'''
+        buf = self.buffer
+        kinds = buf.kinds
+        starts = buf.starts
+        lengths = buf.lengths
+        lines = buf.lines
+        for i in range(self._next, len(kinds)):
+            self._next = i + 1
+            self.lineno = lines[i]
+            start = starts[i]
+            yield (TOKEN_TYPES[kinds[i]], buf.value(i), start,
+                   start + lengths[i])
+
+    def __iter__(self):
+        return iter(self.token, None)
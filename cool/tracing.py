@@ -0,0 +1,149 @@
+'''
+Event hooks of the SymanticAnalyzer and TypeChecker.
+
+An analyzer built with tracer=None emits nothing and pays nothing for
+it. Given a Tracer, the analyzer is an instance of a traced subclass of
+its class, built once per class, whose visit_ handlers and scope
+methods call the tracer before doing what the class does, and which
+reports the start and end of its phases.
+'''
+import collections
+import logging
+import time
+
+
+class Tracer(object):
+    '''Listener of the analyzer events, doing nothing'''
+
+    def phase_start(self, phase):
+        pass
+
+    def phase_end(self, phase):
+        pass
+
+    def node_entered(self, node):
+        pass
+
+    def scope_pushed(self, node):
+        '''a scope opened for the ClassDefinition, MethodDefinition,
+        LetExpression or CaseStatement node'''
+        pass
+
+    def scope_popped(self, node):
+        pass
+
+    def error_found(self, node, error):
+        '''an error at node the analyzer goes on after, such as a class
+        defined again'''
+        pass
+
+
+class LoggingTracer(Tracer):
+    '''Logs the events to logger (the cool logger by default)'''
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger if logger is not None else \
+            logging.getLogger('cool')
+        self.level = level
+
+    def phase_start(self, phase):
+        self.logger.log(self.level, 'start of %s', phase)
+
+    def phase_end(self, phase):
+        self.logger.log(self.level, 'end of %s', phase)
+
+    def node_entered(self, node):
+        name = getattr(node, 'name', None)
+        if name is None:
+            self.logger.log(self.level, 'entering %s',
+                            node.__class__.__name__)
+        else:
+            self.logger.log(self.level, 'entering %s %s',
+                            node.__class__.__name__, name)
+
+    def scope_pushed(self, node):
+        self.logger.log(self.level, 'scope pushed for %s',
+                        node.__class__.__name__)
+
+    def scope_popped(self, node):
+        self.logger.log(self.level, 'scope popped for %s',
+                        node.__class__.__name__)
+
+    def error_found(self, node, error):
+        self.logger.warning('%s', error)
+
+
+class CountingTracer(Tracer):
+    '''
+    Counts the events: nodes entered by node class name, scopes pushed
+    and popped, errors found, and the time spent in each phase.
+    '''
+
+    def __init__(self, clock=None):
+        self._clock = clock if clock is not None else time.perf_counter
+        self.nodes = collections.Counter()
+        self.scopes_pushed = 0
+        self.scopes_popped = 0
+        self.errors = 0
+        self.phase_times = collections.Counter()
+        self._started = {}
+
+    def phase_start(self, phase):
+        self._started[phase] = self._clock()
+
+    def phase_end(self, phase):
+        self.phase_times[phase] += self._clock() - self._started.pop(phase)
+
+    def node_entered(self, node):
+        self.nodes[node.__class__.__name__] += 1
+
+    def scope_pushed(self, node):
+        self.scopes_pushed += 1
+
+    def scope_popped(self, node):
+        self.scopes_popped += 1
+
+    def error_found(self, node, error):
+        self.errors += 1
+
+
+def _traced_visit(visit):
+    def traced(self, node):
+        self._tracer.node_entered(node)
+        return visit(self, node)
+    traced.__name__ = visit.__name__
+    return traced
+
+# analyzer class -> its traced subclass
+_traced = {}
+
+def traced_class(cls):
+    '''The traced subclass of an analyzer class'''
+    if '_traced' in cls.__dict__:
+        return cls
+    traced = _traced.get(cls)
+    if traced is None:
+        namespace = {'__module__': cls.__module__, '_traced': True}
+        for name in dir(cls):
+            if name.startswith('visit_'):
+                namespace[name] = _traced_visit(getattr(cls, name))
+
+        def _new_scope(self, node):
+            self._tracer.scope_pushed(node)
+            cls._new_scope(self, node)
+
+        def _pop_scope(self, node):
+            self._tracer.scope_popped(node)
+            cls._pop_scope(self, node)
+
+        namespace['_new_scope'] = _new_scope
+        namespace['_pop_scope'] = _pop_scope
+        traced = _traced[cls] = type('Traced' + cls.__name__, (cls,),
+                                     namespace)
+    return traced
+
+def untraced_class(cls):
+    '''The analyzer class a traced class was built from'''
+    if '_traced' in cls.__dict__:
+        return cls.__bases__[0]
+    return cls
@@ -0,0 +1,262 @@
+import os
+import os.path as osp
+import queue
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import cool
+import cool.tables as tables
+from cool import serialization
+from test_parser import positions
+
+RESOURCES = osp.join(osp.dirname(osp.abspath(__file__)), 'resources')
+
+class TestTableCache:
+
+    source = osp.join(RESOURCES, 'examples', 'book_list.cl')
+
+    def test_cold_and_warm_load(self, tmp_path):
+        version = tables.grammar_version()
+        compiler = cool.Compiler()
+        expected = compiler.parse_file(TestTableCache.source)
+
+        for _ in range(2):
+            lexer = tables.load_lexer(str(tmp_path), version)
+            parser = tables.load_parser(str(tmp_path), version)
+            with open(TestTableCache.source) as f:
+                ast = parser.parse(f.read(), lexer=lexer)
+            assert ast == expected
+
+        assert sorted(os.listdir(str(tmp_path))) == [
+            'cool_lextab_' + version + '.py',
+            'cool_parsetab_' + version + '.pickle']
+
+    def test_corrupt_tables_are_rebuilt(self, tmp_path):
+        version = tables.grammar_version()
+        tables.load_lexer(str(tmp_path), version)
+        tables.load_parser(str(tmp_path), version)
+
+        for name in os.listdir(str(tmp_path)):
+            with open(osp.join(str(tmp_path), name), 'w') as f:
+                f.write('garbage')
+
+        lexer = tables.load_lexer(str(tmp_path), version)
+        parser = tables.load_parser(str(tmp_path), version)
+        assert parser.parse('class A { };', lexer=lexer)[0].name == 'A'
+
+    def test_tables_of_each_mode(self, tmp_path):
+        debug = cool.Compiler()
+        optimized = cool.Compiler(optimize=True, table_dir=str(tmp_path))
+        assert not debug.optimized and optimized.optimized
+        assert cool.Compiler.optimized
+        assert cool.Compiler._mode(True, str(tmp_path)) in \
+            cool.Compiler._loaded
+        assert sorted(os.listdir(str(tmp_path)))[0].startswith('cool_lextab_')
+        assert optimized.parser.action is not debug.parser.action
+        assert cool.Compiler().parser.action is debug.parser.action
+        assert optimized.parse_file(TestTableCache.source) == \
+            debug.parse_file(TestTableCache.source)
+
+    def test_version_tracks_grammar(self, monkeypatch):
+        version = tables.grammar_version()
+        monkeypatch.setattr(cool.parser.CoolLexer, 't_DARROW', '=>>')
+        assert tables.grammar_version() != version
+
+
+class TestThreads:
+
+    files = sorted(osp.join(RESOURCES, 'examples', name)
+                   for name in os.listdir(osp.join(RESOURCES, 'examples'))
+                   if name.endswith('.cl'))
+
+    @pytest.fixture
+    def switch_often(self):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        yield
+        sys.setswitchinterval(interval)
+
+    @pytest.mark.parametrize('options', [
+        {'engine': 'lalr', 'lexer_engine': 'ply'},
+        {'engine': 'lalr', 'lexer_engine': 'scanner'},
+        {'engine': 'rd', 'lexer_engine': 'scanner'},
+    ], ids=lambda o: '-'.join(sorted(o.values())))
+    def test_parse_from_many_threads(self, options, switch_often):
+        sources = []
+        for filename in TestThreads.files:
+            with open(filename) as f:
+                sources.append((filename, f.read()))
+        compiler = cool.Compiler()
+        expected = {filename: compiler.parse_str(source, filename)
+                    for filename, source in sources}
+
+        pool = cool.CompilerPool(4, **options)
+        def work(seed):
+            order = list(sources)
+            random.Random(seed).shuffle(order)
+            results = []
+            for filename, source in order:
+                with pool.compiler() as compiler:
+                    results.append((filename,
+                                    compiler.parse_str(source, filename)))
+            return results
+
+        with ThreadPoolExecutor(8) as executor:
+            for results in executor.map(work, range(8)):
+                for filename, ast in results:
+                    assert ast == expected[filename]
+                    assert positions(ast) == positions(expected[filename])
+                    assert ast[0].source.filename == filename
+        assert pool._created == 4
+
+    def test_pool_is_bounded(self):
+        pool = cool.CompilerPool(2)
+        first = pool.acquire()
+        second = pool.acquire()
+        assert first is not second
+        assert first.lexer is not second.lexer
+        assert first.parser is not second.parser
+        with pytest.raises(queue.Empty):
+            pool.acquire(timeout=0.01)
+        pool.release(second)
+        assert pool.acquire() is second
+
+
+DEEP = 'class A {{ f() : Int {{ 1{0} }}; }};'.format(' + 1' * 100000)
+
+class TestParallelFileset:
+
+    fileset = TestThreads.files + [osp.join(RESOURCES, 'examples', 'README')]
+
+    def test_same_asts_in_file_order(self):
+        compiler = cool.Compiler()
+        expected = compiler.parse_fileset(TestParallelFileset.fileset)
+        ast = compiler.parse_fileset(TestParallelFileset.fileset, jobs=3)
+        assert ast == expected
+        assert positions(ast) == positions(expected)
+        assert [c.source.filename for c in ast] == \
+            [c.source.filename for c in expected]
+
+    @pytest.mark.parametrize('jobs', [1, 2])
+    def test_error_names_file(self, tmp_path, jobs):
+        broken = tmp_path / 'broken.cl'
+        broken.write_text('class A {\n  f() : Int { 1 + };\n};\n')
+        fileset = (TestThreads.files[:2] + [str(broken)] +
+                   TestThreads.files[2:4])
+        with pytest.raises(cool.ParseError) as info:
+            cool.Compiler().parse_fileset(fileset, jobs=jobs)
+        assert info.value.filename == str(broken)
+        assert info.value.message == \
+            "syntax error at '}}' at {0}:2:19".format(broken)
+
+    def test_collector_left_alone(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(cool.gc, 'disable', lambda: calls.append(1))
+        compiler = cool.Compiler()
+        compiler.parse_fileset(TestThreads.files[:2])
+        assert calls == []
+        compiler.parse_fileset(TestThreads.files[:2], pause_gc=True)
+        assert calls == [1]
+
+    def test_deep_tree(self, tmp_path):
+        deep = tmp_path / 'deep.cl'
+        deep.write_text(DEEP)
+        fileset = TestThreads.files[:2] + [str(deep)]
+        compiler = cool.Compiler()
+        expected = compiler.parse_fileset(fileset)
+        ast = compiler.parse_fileset(fileset, jobs=2)
+        assert serialization.dumps(ast) == serialization.dumps(expected)
+        assert ast[-1].source.filename == str(deep)
+
+
+class TestASTCache:
+
+    source = 'class A {\n  f(x : Int) : Int { x + 1 };\n};\n'
+
+    def test_miss_then_hit(self, tmp_path):
+        compiler = cool.Compiler(ast_cache=str(tmp_path))
+        cache = compiler.ast_cache
+        expected = cool.Compiler().parse_str(TestASTCache.source, 'a.cl')
+
+        ast = compiler.parse_str(TestASTCache.source, 'a.cl')
+        assert (cache.hits, cache.misses, cache.stores) == (0, 1, 1)
+        again = compiler.parse_str(TestASTCache.source, 'b.cl')
+        assert (cache.hits, cache.misses, cache.stores) == (1, 1, 1)
+
+        assert again == ast == expected
+        assert again is not ast
+        assert positions(again) == positions(expected)
+        assert again[0].source.location(again[0].methods[0].lexpos) == \
+            'b.cl:2:3'
+        assert ast[0].source.filename == 'a.cl'
+
+    def test_deep_tree(self, tmp_path):
+        compiler = cool.Compiler(ast_cache=str(tmp_path))
+        ast = compiler.parse_str(DEEP)
+        again = compiler.parse_str(DEEP)
+        assert compiler.ast_cache.hits == 1
+        assert serialization.dumps(again) == serialization.dumps(ast)
+
+    def test_fileset_loaded_from_cache(self, tmp_path):
+        fileset = TestThreads.files
+        expected = cool.Compiler().parse_fileset(fileset)
+        for jobs in (1, 2):
+            cache = cool.ASTCache(str(tmp_path / str(jobs)))
+            compiler = cool.Compiler(ast_cache=cache)
+            compiler.parse_fileset(fileset, jobs=jobs)
+            hits = cache.hits
+            ast = compiler.parse_fileset(fileset, jobs=jobs)
+            # all the files and basic.cl
+            assert cache.hits - hits == len(fileset) + 1
+            assert ast == expected
+            assert positions(ast) == positions(expected)
+            assert [c.source.filename for c in ast] == \
+                [c.source.filename for c in expected]
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path):
+        cache = cool.ASTCache(str(tmp_path))
+        compiler = cool.Compiler(ast_cache=cache)
+        expected = compiler.parse_str(TestASTCache.source)
+        path = osp.join(str(tmp_path), cache.key(TestASTCache.source) +
+                        cool.ASTCache.SUFFIX)
+        with open(path, 'wb') as f:
+            f.write(b'garbage')
+        assert compiler.parse_str(TestASTCache.source) == expected
+        assert (cache.hits, cache.misses, cache.stores) == (0, 2, 2)
+
+    def test_key_tracks_grammar_and_text(self, tmp_path):
+        cache = cool.ASTCache(str(tmp_path))
+        key = cache.key(TestASTCache.source)
+        assert cache.key(TestASTCache.source + ' ') != key
+        cache.version = 'other'
+        assert cache.key(TestASTCache.source) != key
+
+    def test_lru_eviction(self, tmp_path):
+        cache = cool.ASTCache(str(tmp_path), max_size=10**9)
+        ast = cool.Compiler().parse_str(TestASTCache.source)
+        texts = [TestASTCache.source + ' ' * i for i in range(10)]
+        for i, text in enumerate(texts):
+            cache.put(text, ast)
+            os.utime(osp.join(str(tmp_path), cache.key(text) +
+                              cool.ASTCache.SUFFIX), (i, i))
+        cache.get(texts[0]) # most recently used now
+        entry_size = osp.getsize(osp.join(
+            str(tmp_path), cache.key(texts[0]) + cool.ASTCache.SUFFIX))
+
+        cache.max_size = 5 * entry_size
+        cache.put(texts[0] + ' new', ast)
+        assert cache.evictions == 11 - 3
+        assert len(os.listdir(str(tmp_path))) == 3
+        kept = [text for text in texts if cache.get(text) is not None]
+        assert kept == [texts[0], texts[9]]
+
+    def test_size_of_replaced_entries(self, tmp_path):
+        cache = cool.ASTCache(str(tmp_path), max_size=10**9)
+        ast = cool.Compiler().parse_str(TestASTCache.source)
+        for _ in range(3):
+            cache.put(TestASTCache.source, ast)
+        cache.put(TestASTCache.source + ' ', ast)
+        assert cache._size == sum(
+            osp.getsize(osp.join(str(tmp_path), name))
+            for name in os.listdir(str(tmp_path)))
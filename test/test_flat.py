@@ -0,0 +1,110 @@
+import contextlib
+import io
+import os.path as osp
+import pickle
+import pytest
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+from cool.model import *
+from cool.flat import FlatAST
+from cool import query
+from test_parser import cl_files, positions, RESOURCES
+
+compiler = cool.Compiler()
+
+@pytest.mark.parametrize('filename', list(cl_files()),
+                         ids=lambda f: osp.relpath(f, RESOURCES))
+def test_round_trip(filename):
+    try:
+        ast = compiler.parse_file(filename)
+    except Exception:
+        pytest.skip('does not parse')
+    flat = FlatAST.from_tree(ast)
+    again = flat.to_tree()
+    assert again == ast
+    assert positions(again) == positions(ast)
+    assert [c.source for c in again] == [c.source for c in ast]
+    assert flat.classes() == ast
+    assert positions(flat.classes()) == positions(ast)
+
+def test_strings_are_interned():
+    ast = compiler.parse_file(osp.join(RESOURCES, 'examples', 'life.cl'))
+    flat = FlatAST.from_tree(ast)
+    assert len(set(flat.strings)) == len(flat.strings)
+    assert len(flat.strings) < len(flat)
+
+def test_values_outside_the_arrays():
+    number = NumberExpression(2**40)
+    negative = NumberExpression(-5)
+    method = MethodDefinition('f', [], 'Int',
+                              BlockStatement([number, negative]))
+    ast = [ClassDefinition('A', None, [method])]
+    flat = FlatAST.from_tree(ast)
+    assert flat.to_tree() == ast
+    statements = flat.classes()[0].methods[0].body.statements
+    assert [s.value for s in statements] == [2**40, -5]
+    assert statements[0].lexpos is None
+
+def test_views():
+    ast = compiler.parse_file(osp.join(RESOURCES, 'examples', 'life.cl'))
+    view = FlatAST.from_tree(ast).classes()[0]
+    assert isinstance(view, ClassDefinition)
+    assert view.__class__.__name__ == 'ClassDefinition'
+    assert view.source is ast[0].source
+    again = pickle.loads(pickle.dumps(view))
+    assert type(again) is ClassDefinition
+    assert again == ast[0]
+    with pytest.raises(AttributeError):
+        view.name = 'B'
+
+def test_deep_tree():
+    expr = NumberExpression(0)
+    for _ in range(100000):
+        expr = ComplementExpression(False, expr)
+    ast = [ClassDefinition('A', None, [MethodDefinition('f', [], 'Int',
+                                                        expr)])]
+    flat = FlatAST.from_tree(ast)
+    assert len(flat) == 100003
+    again = flat.to_tree()
+    body = again[0].methods[0].body
+    for _ in range(100000):
+        body = body.expr
+    assert body.value == 0
+
+@pytest.mark.parametrize('filename', ['synthetic/book_list_2.cl',
+                                      'synthetic/example2.cl',
+                                      'synthetic/example3.cl',
+                                      'examples/book_list.cl'])
+def test_type_checker_on_views(filename):
+    classes = compiler.parse_fileset([osp.join(RESOURCES, filename)])
+    results = []
+    for program in (classes, FlatAST.from_tree(classes).classes()):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            try:
+                symantic_analyzer.TypeChecker(program).type_check()
+                error = None
+            except symantic_analyzer.TypeCheckingException as err:
+                error = err.args
+        results.append((error, out.getvalue()))
+    assert results[0] == results[1]
+
+def test_bindings():
+    classes = compiler.parse_fileset([osp.join(RESOURCES, 'examples',
+                                               'list.cl')])
+    with contextlib.redirect_stdout(io.StringIO()):
+        symantic_analyzer.TypeChecker(classes)
+    bound = [n for n in query.walk(classes)
+             if isinstance(n, ObjectIdExpression) and n.binding is not None]
+    assert bound
+    flat = FlatAST.from_tree(classes)
+    assert len(flat.bindings) >= len(bound)
+    again = flat.to_tree()
+    assert [n.binding for n in query.walk(again)
+            if isinstance(n, ObjectIdExpression)] == \
+        [n.binding for n in query.walk(classes)
+         if isinstance(n, ObjectIdExpression)]
+    view = next(n for n in query.walk(flat.classes())
+                if isinstance(n, ObjectIdExpression) and n.binding)
+    view.binding = None
+    assert flat.node(view._index).binding is None
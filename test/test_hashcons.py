@@ -0,0 +1,129 @@
+import os.path as osp
+import pickle
+import pytest
+import cool
+from cool.model import *
+from cool.hashcons import InternTable
+from cool import query
+from cool import serialization
+from test_parser import RESOURCES
+
+compiler = cool.Compiler()
+
+def program():
+    return compiler.parse_file(osp.join(RESOURCES, 'examples', 'life.cl'))
+
+def frozen(table):
+    return table.freeze_program(program())
+
+class TestStructuralHash:
+
+    def test_equal_nodes_hash_alike(self):
+        table = InternTable()
+        first, second = frozen(table), frozen(table)
+        assert first == second
+        assert list(map(hash, first)) == list(map(hash, second))
+        nodes = list(query.walk(first))
+        assert all(hash(a) == hash(b)
+                   for a, b in zip(nodes, query.walk(second)))
+
+    def test_positions_not_hashed(self):
+        table = InternTable()
+        a, b = ObjectIdExpression('x'), ObjectIdExpression('x')
+        a.lexpos = 10
+        assert hash(table.freeze(a)) == hash(table.freeze(b))
+
+    def test_different_hashes_are_unequal(self):
+        table = InternTable()
+        a = table.freeze(BinaryOperationExpression(
+            '+', NumberExpression(1), NumberExpression(2)))
+        b = table.freeze(BinaryOperationExpression(
+            '+', NumberExpression(1), NumberExpression(3)))
+        assert hash(a) != hash(b)
+        assert a != b
+
+    def test_equal_compares_frozen_hashes(self):
+        table = InternTable()
+        a = table.freeze(BinaryOperationExpression(
+            '+', NumberExpression(1), NumberExpression(2)))
+        b = table.freeze(BinaryOperationExpression(
+            '+', NumberExpression(1), NumberExpression(2)))
+        assert a == b
+        # told apart on the kept hashes, without comparing the subnodes
+        table._hashes[id(b)] = (b, hash(a) + 1)
+        assert a != b
+
+    def test_only_frozen_nodes_hashable(self):
+        node = ObjectIdExpression('x')
+        with pytest.raises(TypeError):
+            hash(node)
+        table = InternTable()
+        table.freeze(node)
+        assert hash(node) == hash(table.freeze(ObjectIdExpression('x')))
+        del table
+        with pytest.raises(TypeError):
+            hash(node)
+
+    def test_nodes_as_keys(self):
+        table = InternTable()
+        ast = frozen(table)
+        bodies = {}
+        for method in query.select(ast, MethodDefinition):
+            bodies.setdefault(method.body, []).append(method.name)
+        again = frozen(table)
+        for method in query.select(again, MethodDefinition):
+            assert method.name in bodies[method.body]
+
+    def test_hash_not_kept(self):
+        table = InternTable()
+        ast = frozen(table)
+        assert not hasattr(ast[0], '_hash')
+        for again in (pickle.loads(pickle.dumps(ast)),
+                      serialization.loads(serialization.dumps(ast))):
+            assert again == ast
+            with pytest.raises(TypeError):
+                hash(again[0])
+
+    def test_deep_tree(self):
+        expr = NumberExpression(0)
+        for _ in range(100000):
+            expr = InBracketsExpression(expr)
+        table = InternTable()
+        table.freeze(expr)
+        assert hash(expr) != hash(expr.expr)
+
+    def test_deep_trees_compared(self):
+        def deep(leaf):
+            expr = NumberExpression(leaf)
+            for _ in range(100000):
+                expr = InBracketsExpression(expr)
+            return expr
+        assert deep(0) == deep(0)
+        assert deep(0) != deep(1)
+
+class TestInternTable:
+
+    def test_intern_program(self):
+        ast = program()
+        table = InternTable()
+        assert table.intern_program(program()) == ast
+        assert table.hits > 0
+        selfs = [n for n in query.walk(ast)
+                 if isinstance(n, ObjectIdExpression) and n.name == 'self']
+        assert len(selfs) > 1
+        assert table.intern(selfs[0]) is table.intern(selfs[1])
+
+    def test_classes_kept_apart(self):
+        table = InternTable()
+        one, true = NumberExpression(1), BooleanExpression(True)
+        assert table.intern(one) is one
+        assert table.intern(true) is true
+        assert table.intern(NumberExpression(1)) is one
+
+    def test_shared_between_programs(self):
+        table = InternTable()
+        first = table.intern_program(program())
+        second = table.intern_program(program())
+        leaves = [n for n in query.walk(first) if isinstance(n, NewStatement)]
+        assert leaves
+        assert all(any(n is m for m in query.walk(second)) for n in leaves)
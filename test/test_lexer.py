@@ -0,0 +1,124 @@
+import os
+import os.path as osp
+import pytest
+import cool
+
+RESOURCES = osp.join(osp.dirname(osp.abspath(__file__)), 'resources')
+
+def resource_files():
+    for dirpath, dirnames, filenames in sorted(os.walk(RESOURCES)):
+        for filename in sorted(filenames):
+            yield osp.join(dirpath, filename)
+
+def tokenize(compiler, input_str):
+    try:
+        return compiler.tokenize_str(input_str)
+    except Exception as err:
+        return ('error', err.args[0].lexpos)
+
+class TestScanner:
+    ply = cool.Compiler()
+    scanner = cool.Compiler(lexer_engine='scanner')
+
+    @pytest.mark.parametrize('filename', list(resource_files()),
+                             ids=lambda f: osp.relpath(f, RESOURCES))
+    def test_same_tokens_as_ply(self, filename):
+        with open(filename) as f:
+            input_str = f.read()
+        expected = tokenize(TestScanner.ply, input_str)
+        assert tokenize(TestScanner.scanner, input_str) == expected
+
+    @pytest.mark.parametrize('input_str', [
+        'x<-1<=2=>3.y',
+        'a--comment\n-b -- trailing',
+        'TRUE tRuE False false not_a_keyword Class class',
+        '"esc\\"aped" "back\\\\" "unterminated\n"',
+        '(* comment\n over lines *) (*) (* unterminated',
+        '(a*b) 007abc ~c @D',
+        '\f\v\r\t x \n\n\n y',
+        'a # b',
+    ])
+    def test_edge_cases(self, input_str):
+        expected = tokenize(TestScanner.ply, input_str)
+        assert tokenize(TestScanner.scanner, input_str) == expected
+
+    def test_parses_with_scanner(self):
+        filename = osp.join(RESOURCES, 'examples', 'life.cl')
+        expected = TestScanner.ply.parse_file(filename)
+        assert TestScanner.scanner.parse_file(filename) == expected
+
+class TestComments:
+    compiler = cool.Compiler()
+
+    @pytest.mark.parametrize('input_str, expected', [
+        ('a (* b *) c', ['a', 'c']),
+        ('a (* (* b *) c *) d', ['a', 'd']),
+        ('a (*(*(* x *)*)*) b (**) c', ['a', 'b', 'c']),
+        ('a (* -- not a line comment *) b', ['a', 'b']),
+        ('a -- (* not a comment start\n b', ['a', 'b']),
+        ('a (* x ( * ) *) b', ['a', 'b']),
+    ])
+    def test_nested(self, input_str, expected):
+        for engine in ('ply', 'scanner'):
+            compiler = cool.Compiler(lexer_engine=engine)
+            tokens = compiler.tokenize_str(input_str)
+            assert [t[1] for t in tokens] == expected
+
+    def test_line_numbers(self):
+        input_str = 'a (* 1\n (* 2\n *) 3\n *)\n b'
+        for engine in ('ply', 'scanner'):
+            compiler = cool.Compiler(lexer_engine=engine)
+            assert compiler.tokenize_str(input_str) == [
+                ('OBJECTID', 'a', 1), ('OBJECTID', 'b', 5)]
+
+    def test_unterminated(self):
+        for engine in ('ply', 'scanner'):
+            compiler = cool.Compiler(lexer_engine=engine)
+            with pytest.raises(Exception):
+                compiler.tokenize_str('a (* (* b *) c')
+            # the lexer is usable again afterwards
+            assert len(compiler.tokenize_str('a b')) == 2
+
+class TestLineIndex:
+
+    def test_line_col(self):
+        index = cool.position.LineIndex('ab\ncd\n\nef', 'f.cl')
+        assert list(index.starts) == [0, 3, 6, 7]
+        assert index.line_col(0) == (1, 1)
+        assert index.line_col(2) == (1, 3)
+        assert index.line_col(3) == (2, 1)
+        assert index.line_col(6) == (3, 1)
+        assert index.line_col(8) == (4, 2)
+        assert index.location(4) == 'f.cl:2:2'
+
+    def test_find_column(self):
+        for engine in ('ply', 'scanner'):
+            lexer = cool.Compiler(lexer_engine=engine).lexer
+            lexer.line_index = None
+            lexer.input('a\n  bb c')
+            columns = [cool.parser.CoolLexer.find_column(t) for t in lexer]
+            assert columns == [1, 3, 6]
+
+class TestTokenBuffer:
+
+    @pytest.mark.parametrize('engine', ['ply', 'scanner'])
+    def test_same_tokens_and_ast(self, engine):
+        compiler = cool.Compiler(lexer_engine=engine)
+        for filename in resource_files():
+            if not filename.endswith('.cl'):
+                continue
+            with open(filename) as f:
+                input_str = f.read()
+            buf = compiler.tokenize_buffer(input_str, filename)
+            assert list(buf) == compiler.tokenize_str(input_str)
+            assert compiler.parse_buffer(buf) == \
+                compiler.parse_str(input_str, filename)
+
+    def test_deferred_values(self):
+        compiler = cool.Compiler(lexer_engine='scanner')
+        buf = compiler.tokenize_buffer('x <- 042;\n"s" + TRUE.f(fAlSe)')
+        assert len(buf) == 12
+        assert buf[2] == ('INT_CONST', 42, 1)
+        assert buf[4] == ('STR_CONST', '"s"', 2)
+        assert buf.value(10) == 'false'
+        assert buf.type(6) == 'TYPEID'
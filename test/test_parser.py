@@ -0,0 +1,163 @@
+import os
+import os.path as osp
+import pytest
+import cool
+from cool.model import *
+
+RESOURCES = osp.join(osp.dirname(osp.abspath(__file__)), 'resources')
+
+class TestPositions:
+    compiler = cool.Compiler()
+
+    def test_node_locations(self):
+        source = 'class A {\n  f(x : Int) : Int {\n    x + 1\n  };\n};\n'
+        ast = TestPositions.compiler.parse_str(source, 'a.cl')
+        _class = ast[0]
+        method = _class.methods[0]
+        body = method.body
+        where = _class.source.location
+
+        assert where(_class.lexpos) == 'a.cl:1:1'
+        assert where(method.lexpos) == 'a.cl:2:3'
+        assert where(method.formal_args[0].lexpos) == 'a.cl:2:5'
+        assert where(body.lexpos) == 'a.cl:3:7'
+        assert where(body.expr1.lexpos) == 'a.cl:3:5'
+        assert where(body.expr2.lexpos) == 'a.cl:3:9'
+
+    def test_positions_not_structural(self):
+        ast1 = TestPositions.compiler.parse_str('class A { a : Int <- 1; };')
+        ast2 = TestPositions.compiler.parse_str('class A {\n a:Int<-1;\n};')
+        assert ast1 == ast2
+        assert ast1[0].variables[0].lexpos != ast2[0].variables[0].lexpos
+
+
+class TestSequences:
+    compiler = cool.Compiler()
+
+    def test_order(self):
+        source = ('class A { f(a : Int, b : Int, c : Int) : Int {'
+                  ' { g(1, 2, 3); let x : Int, y : Int in'
+                  ' case x of p : Int => 1; q : Bool => 2; esac; } }; };'
+                  'class B { a : Int; b : Int; };')
+        ast = TestSequences.compiler.parse_str(source)
+        assert [c.name for c in ast] == ['A', 'B']
+        assert [v.var_decl.name for v in ast[1].variables] == ['a', 'b']
+        method = ast[0].methods[0]
+        assert [f.name for f in method.formal_args] == ['a', 'b', 'c']
+        invoke, let = method.body.statements
+        assert [n.value for n in invoke.arguments] == [1, 2, 3]
+        assert [v.var_decl.name for v in let.var_list] == ['x', 'y']
+        assert [s.var_decl.name for s in let.expr.statements] == ['p', 'q']
+
+    def test_long_sequence(self):
+        n = 5000
+        source = 'class A { f() : Int { g(' + ', '.join(
+            str(i) for i in range(n)) + ') }; };'
+        ast = TestSequences.compiler.parse_str(source)
+        assert [a.value for a in ast[0].methods[0].body.arguments] == \
+            list(range(n))
+
+    def test_trailing_comma(self):
+        ast = TestSequences.compiler.parse_str(
+            'class A { f(a : Int,) : Int { g(1,) }; };')
+        method = ast[0].methods[0]
+        assert len(method.formal_args) == 1
+        assert len(method.body.arguments) == 1
+
+
+def cl_files():
+    for dirpath, dirnames, filenames in sorted(os.walk(RESOURCES)):
+        for filename in sorted(filenames):
+            if filename.endswith('.cl'):
+                yield osp.join(dirpath, filename)
+
+def positions(node):
+    '''(class name, lexpos) of every node, depth first'''
+    if isinstance(node, list):
+        return [p for elem in node for p in positions(elem)]
+    if not isinstance(node, SourceElement):
+        return []
+    result = [(type(node).__name__, node.lexpos)]
+    for k in sorted(node._attrs):
+        result.extend(positions(getattr(node, k)))
+    return result
+
+def parse(compiler, input_str):
+    try:
+        return compiler.parse_str(input_str)
+    except Exception as err:
+        return 'error'
+
+class TestRDParser:
+    lalr = cool.Compiler()
+    rd = cool.Compiler(engine='rd')
+
+    def check(self, input_str):
+        expected = parse(TestRDParser.lalr, input_str)
+        ast = parse(TestRDParser.rd, input_str)
+        assert ast == expected
+        assert positions(ast) == positions(expected)
+        return ast
+
+    @pytest.mark.parametrize('filename', list(cl_files()),
+                             ids=lambda f: osp.relpath(f, RESOURCES))
+    def test_same_ast_as_lalr(self, filename):
+        with open(filename) as f:
+            self.check(f.read())
+
+    @pytest.mark.parametrize('expr', [
+        'a + b * c - d / e',
+        'a - b - c',
+        'a * b / c * d',
+        'a < b + c',
+        'a <= b = c',
+        'a < b < c',
+        'a = b <= c',
+        'not a = b + c',
+        'not not a < b',
+        'isvoid a + b',
+        'isvoid a.f() * b',
+        '~a + ~b@B.f(1, 2,)',
+        '~isvoid a',
+        'a * not b + c',
+        'a * isvoid b + c',
+        'a <- b <- c + d.f()',
+        'a + b <- c * d',
+        'not a <- b = c',
+        'let x : Int <- 1, y : Int in x + y * 2',
+        'let x : Int <- let y : Int in y in x.f()',
+        'a + let x : Int in x < 3',
+        'new A.f().g(h(1), (a + b) * c)',
+        'if a then b else c fi.f() + 1',
+        'while a < b loop { a <- a + 1; b; } pool',
+        'case a of x : Int => x + 1; y : B => y.f(); esac',
+        '{ a; ; }',
+        'a + (b',
+        'a + + b',
+        'f(,)',
+        'a.f(1 2)',
+        'a @B f()',
+    ])
+    def test_precedence_and_errors(self, expr):
+        self.check('class A { f() : Int { ' + expr + ' }; };')
+
+    @pytest.mark.parametrize('input_str', [
+        '',
+        'class A { };',
+        'class A inherits B { a : Int; f(x : Int,) : Int { x }; };',
+        'class A { }; class B { };',
+        'class A { } class B { };',
+        'class A { f() : Int { 1 } };',
+        'class A { a : Int <- 1 };',
+        'class A { }; x',
+    ])
+    def test_programs(self, input_str):
+        self.check(input_str)
+
+    def test_parse_buffer(self):
+        filename = osp.join(RESOURCES, 'examples', 'life.cl')
+        with open(filename) as f:
+            input_str = f.read()
+        buf = TestRDParser.rd.tokenize_buffer(input_str)
+        expected = TestRDParser.lalr.parse_str(input_str)
+        assert TestRDParser.rd.parse_buffer(buf) == expected
@@ -0,0 +1,63 @@
+import itertools
+import os.path as osp
+import pytest
+import cool
+from cool.model import *
+from cool.flat import FlatAST
+from cool import query
+from test_parser import RESOURCES
+from test_visitor import Recorder
+
+compiler = cool.Compiler()
+
+def program():
+    return compiler.parse_file(osp.join(RESOURCES, 'examples', 'life.cl'))
+
+def test_walk_in_accept_order():
+    ast = program()
+    recorder = Recorder()
+    for _class in ast:
+        _class.accept(recorder)
+    visits = [e[len('visit_'):] for e in recorder.events
+              if e.startswith('visit_')]
+    assert [type(node).__name__ for node in query.walk(ast)] == visits
+
+def test_walk_is_lazy():
+    expr = NumberExpression(0)
+    for _ in range(100000):
+        expr = InBracketsExpression(expr)
+    first = list(itertools.islice(expr.walk(), 3))
+    assert first == [expr, expr.expr, expr.expr.expr]
+    assert sum(1 for _ in expr.walk()) == 100001
+
+def test_select():
+    ast = program()
+    out_strings = list(query.select(ast, MethodInvoke, 'out_string'))
+    assert out_strings
+    assert all(n.name == 'out_string' for n in out_strings)
+    assert out_strings == [n for n in query.walk(ast)
+                           if isinstance(n, MethodInvoke) and
+                           n.name == 'out_string']
+    with pytest.raises(ValueError):
+        next(query.select(ast, NumberExpression, 1))
+
+def test_index():
+    ast = program()
+    index = query.NodeIndex(ast)
+    assert len(index) == sum(1 for _ in query.walk(ast))
+    for kind in index.kinds():
+        assert index.find(kind) == list(query.select(ast, kind))
+    for name in index.keys(MethodInvoke):
+        assert index.find(MethodInvoke, name) == \
+            list(query.select(ast, 'MethodInvoke', name))
+        assert index.count('MethodInvoke', name) == len(
+            index.find('MethodInvoke', name))
+    assert index.find(CaseExpression) == []
+    assert index.find(NewStatement, 'NoSuchClass') == []
+
+def test_index_of_flat_views():
+    ast = program()
+    views = FlatAST.from_tree(ast).classes()
+    index = query.NodeIndex(views)
+    assert index.find(MethodInvoke, 'out_string') == \
+        query.NodeIndex(ast).find(MethodInvoke, 'out_string')
@@ -0,0 +1,92 @@
+import io
+import os.path as osp
+import pickle
+import pytest
+import cool
+from cool.model import *
+from cool import serialization
+from test_parser import cl_files, positions, RESOURCES
+
+compiler = cool.Compiler()
+
+def parse(filename):
+    ast = compiler.parse_file(filename)
+    for _class in ast:
+        _class.source = None
+    return ast
+
+@pytest.mark.parametrize('filename', list(cl_files()),
+                         ids=lambda f: osp.relpath(f, RESOURCES))
+def test_round_trip(filename):
+    try:
+        ast = parse(filename)
+    except Exception:
+        pytest.skip('does not parse')
+    again = serialization.loads(serialization.dumps(ast))
+    assert again == ast
+    assert positions(again) == positions(ast)
+    assert len(serialization.dumps(ast)) < len(pickle.dumps(ast))
+
+def test_stream_of_programs():
+    programs = [parse(f) for f in sorted(cl_files())[:6]]
+    f = io.BytesIO()
+    writer = serialization.ASTWriter(f)
+    for ast in programs:
+        writer.write(ast)
+    f.seek(0)
+    assert list(serialization.ASTReader(f)) == programs
+
+def test_values_outside_the_parser_output():
+    number = NumberExpression(2**40)
+    text = StringExpression('café \U0001f600')
+    text.lexpos = 70000
+    method = MethodDefinition('f', [], 'Int',
+                              BlockStatement([number, text]))
+    ast = [ClassDefinition('A', None, [method])]
+    again = serialization.loads(serialization.dumps(ast))
+    assert again == ast
+    statements = again[0].methods[0].body.statements
+    assert statements[0].lexpos is None
+    assert statements[1].lexpos == 70000
+
+def test_corrupt_stream():
+    data = serialization.dumps(parse(sorted(cl_files())[0]))
+    with pytest.raises(serialization.FormatError):
+        serialization.loads(b'garbage' + data)
+    with pytest.raises(serialization.FormatError):
+        serialization.loads(data[:-10])
+
+def test_pickle_round_trip():
+    filename = osp.join(RESOURCES, 'examples', 'life.cl')
+    ast = compiler.parse_file(filename)
+    again = pickle.loads(pickle.dumps(ast, pickle.HIGHEST_PROTOCOL))
+    assert again == ast
+    assert positions(again) == positions(ast)
+    assert again[0].source.location(again[0].lexpos) == \
+        ast[0].source.location(ast[0].lexpos)
+
+def test_nodes_have_slots_only():
+    ast = parse(osp.join(RESOURCES, 'examples', 'life.cl'))
+    stack = list(ast)
+    while stack:
+        node = stack.pop()
+        assert not hasattr(node, '__dict__')
+        for name in node._attrs:
+            value = getattr(node, name)
+            if isinstance(value, list):
+                stack.extend(value)
+            elif isinstance(value, SourceElement):
+                stack.append(value)
+
+def test_deep_tree():
+    text = 'class A {{ f() : Int {{ 1{0} }}; }};'.format(' + 1' * 100000)
+    ast = cool.Compiler(engine='rd', lexer_engine='scanner').parse_str(text)
+    data = serialization.dumps(ast)
+    again = serialization.loads(data)
+    assert serialization.dumps(again) == data
+    node = again[0].methods[0].body
+    depth = 0
+    while isinstance(node, BinaryOperationExpression):
+        node = node.expr1
+        depth += 1
+    assert depth == 100000
@@ -1,5 +1,13 @@
+import os.path as osp
+import pickle
+import random
+import pytest
 import cool
 import cool.symantic_analyzer as symantic_analyzer
+from cool import query
+from cool import tracing
+from cool.model import *
+from test_parser import RESOURCES
 
 
 def test_symbol_table_manager(fileset):
@@ -25,3 +33,512 @@ if __name__ == '__main__':
     
     test_symbol_table_manager(sys.argv[1:])
 
+
+
+HIERARCHY = {
+    'IO' : 'Object',
+    'App' : 'Expr',
+    'Bool' : 'Object',
+    'Expr' : 'IO',
+    'Int' : 'Object',
+    'Lambda' : 'Expr',
+    'LambdaList' : 'Object',
+    'LambdaListNE' : 'LambdaList',
+    'LambdaListRef' : 'Object',
+    'Main' : 'Term',
+    'Object' : None,
+    'String' : 'Object',
+    'Term' : 'IO',
+    'VarList' : 'IO',
+    'VarListNE' : 'VarList',
+    'Variable' : 'Expr',
+}
+
+def symbol_table(hierarchy, frozen):
+    table = symantic_analyzer.SymbolTable()
+    for typeid, parentid in hierarchy.items():
+        table.add_type(typeid, parentid)
+    if frozen:
+        table.freeze()
+    return table
+
+class TestSymbolTable:
+
+    @pytest.mark.parametrize('frozen', [False, True])
+    def test_common_ancestor(self, frozen):
+        table = symbol_table(HIERARCHY, frozen)
+        assert table.common_ancestor(['VarListNE', 'Expr']) == 'IO'
+        assert table.common_ancestor(['Expr', 'Expr']) == 'Expr'
+        assert table.common_ancestor(['VarListNE', 'Object']) == 'Object'
+        assert table.common_ancestor(['VarListNE', 'VarList']) == 'VarList'
+        assert table.common_ancestor(['VarList', 'VarListNE']) == 'VarList'
+        assert table.common_ancestor(['VarListNE', 'VarList', 'IO']) == 'IO'
+        assert table.common_ancestor(['VarListNE', 'Bool']) == 'Object'
+        assert table.common_ancestor(['Main', 'Term', 'App']) == 'IO'
+
+    def test_ancestor_list_of_different_order(self):
+        # used to return the first of the lexicographically smaller list
+        table = symbol_table({'Object': None, 'B': 'Object', 'A': 'B'},
+                             False)
+        assert table.common_ancestor(['B', 'A']) == 'B'
+
+    @pytest.mark.parametrize('frozen', [False, True])
+    def test_is_parent(self, frozen):
+        table = symbol_table(HIERARCHY, frozen)
+        assert table.is_parent('Object', 'Main')
+        assert table.is_parent('IO', 'Main')
+        assert not table.is_parent('Main', 'IO')
+        assert not table.is_parent('Main', 'Main')
+        assert not table.is_parent('Expr', 'Term')
+        assert not table.is_parent('Unknown', 'Main')
+        assert not table.is_parent('Object', 'Unknown')
+
+    def test_frozen_index_matches_walks(self):
+        rng = random.Random(7)
+        hierarchy = {'Object': None}
+        for i in range(300):
+            hierarchy['C{0}'.format(i)] = rng.choice(list(hierarchy))
+        walks, frozen = (symbol_table(hierarchy, False),
+                         symbol_table(hierarchy, True))
+        types = list(hierarchy)
+        for _ in range(3000):
+            a, b = rng.choice(types), rng.choice(types)
+            assert frozen.is_parent(a, b) == walks.is_parent(a, b)
+            assert frozen.common_ancestor([a, b]) == \
+                walks.common_ancestor([a, b])
+
+    def test_deep_chain(self):
+        hierarchy = {'Object': None}
+        parent = 'Object'
+        for i in range(1000):
+            hierarchy['C{0}'.format(i)] = parent
+            parent = 'C{0}'.format(i)
+        hierarchy['D'] = 'C499'
+        table = symbol_table(hierarchy, True)
+        assert table.is_parent('C0', 'C999')
+        assert table.common_ancestor(['C999', 'D']) == 'C499'
+        assert table.common_ancestor(['C999', 'C3']) == 'C3'
+
+    def test_add_type_unfreezes(self):
+        table = symbol_table(HIERARCHY, True)
+        table.add_type('Sub', 'Main')
+        assert table.is_parent('Term', 'Sub')
+        assert table.common_ancestor(['Sub', 'App']) == 'IO'
+
+class TestValidation:
+
+    def test_topological_order(self):
+        order = symbol_table(HIERARCHY, False).validate()
+        assert sorted(order) == sorted(HIERARCHY)
+        for typeid, parentid in HIERARCHY.items():
+            if parentid is not None:
+                assert order.index(parentid) < order.index(typeid)
+
+    def test_undefined_parent(self):
+        table = symbol_table({'Object': None, 'A': 'B'}, False)
+        with pytest.raises(symantic_analyzer.UndefinedParentException) \
+             as info:
+            table.validate()
+        assert str(info.value) == \
+            'Class A inherits from undefined class : B'
+
+    def test_sealed_parent(self):
+        table = symbol_table(dict(HIERARCHY, A='String'), False)
+        with pytest.raises(symantic_analyzer.SealedParentException):
+            table.validate()
+
+    def test_cycle(self):
+        hierarchy = dict(HIERARCHY, A='C', B='A', C='B', D='C')
+        table = symbol_table(hierarchy, False)
+        with pytest.raises(symantic_analyzer.InheritanceCycleException) \
+             as info:
+            table.validate()
+        assert str(info.value) == 'Inheritance cycle : A -> C -> B -> A'
+
+    def test_self_inheritance(self):
+        table = symbol_table(dict(HIERARCHY, A='A'), False)
+        with pytest.raises(symantic_analyzer.InheritanceCycleException):
+            table.validate()
+
+    def test_long_chain(self):
+        hierarchy = {'Object': None}
+        for i in range(100000):
+            hierarchy['C{0}'.format(i + 1)] = 'C{0}'.format(i)
+        hierarchy['C0'] = 'Object'
+        order = symbol_table(hierarchy, False).validate()
+        assert order[:3] == ['Object', 'C0', 'C1']
+        hierarchy['C0'] = 'C100000'
+        with pytest.raises(symantic_analyzer.InheritanceCycleException):
+            symbol_table(hierarchy, False).validate()
+
+    def test_multiple_definitions(self, capsys):
+        compiler = cool.Compiler()
+        ast = compiler.parse_fileset([]) + compiler.parse_str(
+            'class A { f() : Int { 1 }; };\nclass A { };', 'a.cl')
+        tracer = tracing.CountingTracer()
+        checker = symantic_analyzer.TypeChecker(ast, tracer)
+        assert tracer.errors == 1
+        assert checker.get_method_sign('A', 'f') == ([], 'Int')
+        checker.type_check()
+        assert capsys.readouterr().out == ''
+        for jobs in (1, 2):
+            diagnostics = checker.type_check(jobs=jobs, collect=True)
+            assert [str(d) for d in diagnostics] == \
+                ['a.cl:2:1: multiple definitions for class A']
+
+    def test_type_checker_fails_fast(self):
+        compiler = cool.Compiler()
+        basic = compiler.parse_fileset([])
+        ast = compiler.parse_str('class A inherits B { }; '
+                                 'class B inherits A { };')
+        with pytest.raises(symantic_analyzer.InheritanceCycleException):
+            symantic_analyzer.TypeChecker(basic + ast)
+
+class TestMethodTables:
+    compiler = cool.Compiler()
+
+    def checker(self, text):
+        basic = self.compiler.parse_fileset([])
+        return symantic_analyzer.TypeChecker(basic +
+                                             self.compiler.parse_str(text))
+
+    def test_inherited_and_overridden(self):
+        checker = self.checker('''
+            class A { f(x : Int) : Int { x }; g() : A { self }; };
+            class B inherits A { f(x : Int) : Int { 0 }; h() : Bool { true }; };
+            class C inherits B { };
+        ''')
+        assert checker.get_method_sign('C', 'f') == (['Int'], 'Int')
+        assert checker.get_method_sign('C', 'g') == ([], 'A')
+        assert checker.get_method_sign('C', 'h') == ([], 'Bool')
+        assert checker.get_method_sign('C', 'type_name') == ([], 'String')
+        assert checker.get_method_sign('A', 'h') is None
+        assert checker.get_method_sign('Unknown', 'f') is None
+        assert checker._methods['C']['f'][1] == 'B'
+        assert checker._methods['C']['g'][1] == 'A'
+
+    def test_first_definition_in_a_class(self):
+        checker = self.checker('''
+            class A { f() : Int { 0 }; f() : Bool { true }; };
+        ''')
+        assert checker.get_method_sign('A', 'f') == ([], 'Int')
+
+    def test_type_check_one_class(self, capsys):
+        checker = self.checker('''
+            class A { f() : Int { 0 }; };
+            class B { f() : Int { true }; };
+        ''')
+        checker.type_check('A')
+        checker.type_check('Unknown')
+        with pytest.raises(symantic_analyzer.TypeCheckingException):
+            checker.type_check('B')
+
+class CheckingBindings(symantic_analyzer.TypeChecker):
+    '''TypeChecker checking the bound types against the scope walks'''
+
+    def typeof_ObjectIdExpression(self, arg):
+        assert self._get_bound_type(arg.name, arg.binding) == \
+            self._get_type(arg.name)
+        self.checked += 1
+        return super(CheckingBindings, self).typeof_ObjectIdExpression(arg)
+
+    def typeof_Assignment(self, arg):
+        assert self._get_bound_type(arg.lhs, arg.binding) == \
+            self._get_type(arg.lhs)
+        return (yield from super(CheckingBindings, self)
+                .typeof_Assignment(arg))
+
+class TestBinding:
+    compiler = cool.Compiler()
+
+    @pytest.mark.parametrize('name', ['lam.cl', 'life.cl', 'book_list.cl',
+                                      'cool.cl', 'list.cl'])
+    def test_bindings_match_scopes(self, name, capsys):
+        filename = osp.join(RESOURCES, 'examples', name)
+        checker = CheckingBindings(self.compiler.parse_fileset([filename]))
+        checker.checked = 0
+        try:
+            checker.type_check()
+        except symantic_analyzer.TypeCheckingException:
+            pass
+        assert checker.checked > 0
+
+    def test_binding_slots(self):
+        basic = self.compiler.parse_fileset([])
+        ast = self.compiler.parse_str('''
+            class A {
+                a : Int;
+                f(x : Int) : Int {
+                    let y : Int <- x, x : Int <- a in
+                        case y of z : Int => { a <- x + z + self.g(); }; esac
+                };
+                g() : Int { b };
+            };''')
+        symantic_analyzer.TypeChecker(basic + ast)
+        nodes = {}
+        for node in query.walk(ast):
+            if isinstance(node, (ObjectIdExpression, Assignment)):
+                name = node.name if isinstance(node, ObjectIdExpression) \
+                    else '<-' + node.lhs
+                nodes.setdefault(name, []).append(node.binding)
+        # class, method, let and case scopes
+        assert nodes['x'] == [(1, 0), (2, 1)]
+        assert nodes['a'] == [(0, 0)]
+        assert nodes['z'] == [(3, 0)]
+        assert nodes['<-a'] == [(0, 0)]
+        assert nodes['self'] == [None]
+        assert nodes['b'] == [None]
+        # not structural
+        again = self.compiler.parse_str('class A { g() : Int { b }; };')
+        assert again[0].methods[0] == ast[0].methods[1]
+
+class TestParallel:
+    compiler = cool.Compiler()
+
+    @pytest.mark.parametrize('name', ['book_list.cl', 'list.cl',
+                                      'primes.cl'])
+    def test_examples(self, name):
+        filename = osp.join(RESOURCES, 'examples', name)
+        checker = symantic_analyzer.TypeChecker(
+            self.compiler.parse_fileset([filename]))
+        checker.type_check(jobs=2)
+        checker.type_check()
+
+    def test_first_error_in_program_order(self):
+        basic = self.compiler.parse_fileset([])
+        ast = self.compiler.parse_str(''.join(
+            'class A{0} {{ f() : Int {{ {1} }}; }};'.format(
+                i, 'true' if i in (5, 30) else i) for i in range(40)))
+        errors = []
+        for jobs in (1, 3):
+            checker = symantic_analyzer.TypeChecker(basic + ast)
+            with pytest.raises(symantic_analyzer.TypeCheckingException) \
+                 as err:
+                checker.type_check(jobs=jobs)
+            errors.append(err.value.args[0])
+        assert errors[0] == errors[1] == ast[5].methods[0]
+        assert errors[1].lexpos == ast[5].methods[0].lexpos
+
+    def test_deep_tree(self):
+        basic = self.compiler.parse_fileset([])
+        ast = basic + self.compiler.parse_str(
+            'class A {{ f() : Int {{ 1{0} }}; }};'.format(' + 1' * 100000))
+        checker = symantic_analyzer.TypeChecker(ast)
+        # as sent to spawned workers
+        environment = pickle.loads(pickle.dumps(
+            checker._environment(list(ast))))
+        worker = symantic_analyzer.TypeChecker._from_environment(
+            environment)
+        assert worker._ast == ast
+        assert worker._ast[-1].source.filename == ast[-1].source.filename
+        for _class in worker._ast:
+            worker._type_check_class(_class)
+        checker.type_check(jobs=2)
+
+    def test_traced(self):
+        filename = osp.join(RESOURCES, 'examples', 'list.cl')
+        tracer = tracing.CountingTracer()
+        checker = symantic_analyzer.TypeChecker(
+            self.compiler.parse_fileset([filename]), tracer)
+        checker.type_check(jobs=2)
+        assert 'type check' in tracer.phase_times
+
+class TestIncremental:
+    compiler = cool.Compiler()
+    basic = compiler.parse_fileset([])
+
+    PROGRAM = '''
+        class A { f(x : Int) : Int { x }; };
+        class B inherits A { g() : Int { f(1) }; };
+        class C inherits B { h() : Int { g() }; };
+        class D { a : A <- new C; d() : Int { a.f(2) }; };
+        class E { e() : Bool { true }; };
+    '''
+
+    def parse(self, text):
+        return self.compiler.parse_str(text)
+
+    def checker(self):
+        checker = symantic_analyzer.TypeChecker(self.basic +
+                                                self.parse(self.PROGRAM))
+        checker.type_check()
+        return checker
+
+    def outcome(self, check):
+        try:
+            check()
+        except symantic_analyzer.TypeCheckingException as err:
+            return err.args[0]
+
+    def full_check(self, checker):
+        # a new checker of the program the rechecked one ended with
+        return self.outcome(symantic_analyzer.TypeChecker(
+            list(checker._ast)).type_check)
+
+    def test_method_body(self):
+        checker = self.checker()
+        changed = self.parse('class E { e() : Bool { false }; };')
+        assert checker.recheck(changed) == ['E']
+        assert checker._classes['E'] is changed[0]
+
+    def test_signature(self):
+        checker = self.checker()
+        changed = self.parse('class A { f(x : Int) : Bool { true }; };')
+        with pytest.raises(symantic_analyzer.TypeCheckingException) as err:
+            checker.recheck(changed)
+        # B.g is the first method relying on the new signature
+        assert err.value.args[0] is checker._classes['B'].methods[0]
+        assert err.value.args[0] == self.full_check(checker)
+
+        again = self.parse('class A { f(x : Int) : Int { x + 1 }; };')
+        assert checker.recheck(again) == ['A', 'B', 'C', 'D']
+
+    def test_hierarchy(self):
+        checker = self.checker()
+        changed = self.parse('class B { g() : Int { 0 }; };')
+        # D relies on C being an A
+        with pytest.raises(symantic_analyzer.TypeCheckingException) as err:
+            checker.recheck(changed)
+        assert err.value.args[0] is checker._classes['D'].variables[0]
+        assert err.value.args[0] == self.full_check(checker)
+
+        again = self.parse('class B inherits A { g() : Int { 0 }; };')
+        assert checker.recheck(again) == ['B', 'C', 'D']
+        assert self.full_check(checker) is None
+
+    def test_added_class(self):
+        checker = self.checker()
+        assert checker.recheck(self.parse('class F inherits C { };')) == \
+            ['F']
+        assert checker.get_method_sign('F', 'h') == ([], 'Int')
+
+    def test_errors_are_kept(self):
+        checker = symantic_analyzer.TypeChecker(self.basic + self.parse(
+            self.PROGRAM + 'class G { g() : Int { true }; };'))
+        with pytest.raises(symantic_analyzer.TypeCheckingException):
+            checker.type_check()
+        with pytest.raises(symantic_analyzer.TypeCheckingException) as err:
+            checker.recheck(self.parse('class E { e() : Bool { false }; };'))
+        assert err.value.args[0] is checker._classes['G'].methods[0]
+        assert checker.recheck(self.parse('class G { };')) == ['G']
+
+    def test_random_edits_match_full_check(self):
+        rand = random.Random(24)
+        count = 30
+        def class_text(i, parent, correct):
+            call = 'f{0}(1)'.format(parent) if parent is not None else '1'
+            return 'class C{0}{1} {{ f{0}(x : Int) : {2} {{ {3} }}; }};' \
+                .format(i, '' if parent is None else
+                        ' inherits C{0}'.format(parent),
+                        'Int' if correct else 'Bool', call)
+
+        parents = [None] + [rand.randrange(i) for i in range(1, count)]
+        checker = symantic_analyzer.TypeChecker(self.basic + self.parse(
+            ''.join(class_text(i, parents[i], True) for i in range(count))))
+        checker.type_check()
+        for _ in range(40):
+            i = rand.randrange(1, count)
+            changed = self.parse(class_text(
+                i, rand.randrange(i), rand.random() < 0.7))
+            got = self.outcome(lambda: checker.recheck(changed))
+            assert got == self.full_check(checker)
+
+class TestDiagnostics:
+    compiler = cool.Compiler()
+    basic = compiler.parse_fileset([])
+
+    def checker(self, text):
+        return symantic_analyzer.TypeChecker(
+            self.basic + self.compiler.parse_str(text, 'errors.cl'))
+
+    def test_all_errors_once(self):
+        checker = self.checker('''class A {
+    f() : Int { (true + 1) + 2 };
+    g(x : Int) : Bool { if x then g(x, 1) else not x fi };
+    h() : Int { b.foo() };
+    k : Unknown;
+    l() : Object { k.bar(1 + true) };
+};''')
+        diagnostics = checker.type_check(collect=True)
+        # attributes are checked before methods
+        assert [str(d) for d in diagnostics] == [
+            'errors.cl:5:5: undefined class Unknown',
+            'errors.cl:2:23: operands of + of types Bool and Int are not Int',
+            'errors.cl:3:25: condition of type Int is not a Bool',
+            'errors.cl:3:35: method g of class A takes 1 arguments, 2 given',
+            'errors.cl:3:48: operand of not of type Int is not a Bool',
+            'errors.cl:4:17: undeclared identifier b',
+            'errors.cl:6:28: operands of + of types Int and Bool are not Int',
+        ]
+        assert isinstance(diagnostics[0].error,
+                          symantic_analyzer.ClassNotFoundException)
+        assert diagnostics[1].node is \
+            checker._classes['A'].methods[0].body.expr1.expr
+
+        # the first one is raised by default
+        with pytest.raises(symantic_analyzer.TypeCheckingException) as err:
+            checker.type_check()
+        assert err.value.args == diagnostics[0].error.args
+
+    @pytest.mark.parametrize('body, message', [
+        ('if true then b else 1 fi', '1:39: undeclared identifier b'),
+        ('case 1 of x : Int => b; y : Bool => 2; esac',
+         '1:47: undeclared identifier b'),
+        ('if true then new Foo else 1 fi', '1:39: undefined class Foo'),
+        ('{ c <- 1; c; }', '1:28: undeclared identifier c'),
+    ])
+    def test_unknown_names(self, body, message):
+        checker = self.checker(
+            'class A {{ f() : Object {{ {0} }}; }};'.format(body))
+        diagnostics = checker.type_check(collect=True)
+        assert [str(d) for d in diagnostics][:1] == ['errors.cl:' + message]
+        with pytest.raises(symantic_analyzer.TypeCheckingException):
+            checker.type_check()
+
+    def test_inherited_attributes(self):
+        checker = self.checker('''
+            class A { a : Int; };
+            class B inherits A { f() : Int { { a <- a + 1; a; } }; };''')
+        assert checker.type_check(collect=True) == []
+        changed = self.compiler.parse_str('class A { a : Bool; };')
+        with pytest.raises(symantic_analyzer.TypeCheckingException):
+            checker.recheck(changed)
+
+    def test_binop_and_undefined_class(self):
+        checker = self.checker('class A { f() : Bool { 1 < "a" }; };')
+        with pytest.raises(symantic_analyzer.BinopTypeCheckingException):
+            checker.type_check()
+        checker = self.checker('class A { f(x : B) : Int { 0 }; };')
+        with pytest.raises(symantic_analyzer.ClassNotFoundException):
+            checker.type_check()
+
+    def test_no_errors(self):
+        checker = self.checker('class A { f() : Int { 1 }; };')
+        assert checker.type_check(collect=True) == []
+        assert checker.type_check() is None
+
+    def test_in_workers(self):
+        checker = self.checker(''.join(
+            'class A{0} {{ f() : Int {{ {1} }}; }};'.format(
+                i, 'true' if i % 7 == 0 else i) for i in range(40)))
+        serial = checker.type_check(collect=True)
+        parallel = checker.type_check(jobs=2, collect=True)
+        assert len(serial) == 6
+        assert [str(d) for d in parallel] == [str(d) for d in serial]
+        assert [d.node for d in parallel] == [d.node for d in serial]
+
+    @pytest.mark.parametrize('name', ['atoi_test.cl', 'graph.cl',
+                                      'hairyscary.cl', 'io.cl', 'life.cl',
+                                      'book_list.cl'])
+    def test_first_diagnostic_is_raised(self, name):
+        filename = osp.join(RESOURCES, 'examples', name)
+        checker = symantic_analyzer.TypeChecker(
+            self.compiler.parse_fileset([filename]))
+        diagnostics = checker.type_check(collect=True)
+        try:
+            checker.type_check()
+        except symantic_analyzer.TypeCheckingException as err:
+            assert err.args == diagnostics[0].error.args
+            assert diagnostics[0].location.startswith(filename + ':')
+        else:
+            assert diagnostics == []
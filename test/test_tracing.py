@@ -0,0 +1,100 @@
+import logging
+import os.path as osp
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+from cool import tracing
+from cool.model import *
+from test_parser import RESOURCES
+
+compiler = cool.Compiler()
+
+def program(name='book_list.cl'):
+    return compiler.parse_fileset([osp.join(RESOURCES, 'examples', name)])
+
+def nodes(classes):
+    count = {}
+    for _class in classes:
+        for node in _class.walk():
+            name = node.__class__.__name__
+            count[name] = count.get(name, 0) + 1
+    return count
+
+def test_no_tracer_prints_nothing(capsys):
+    checker = symantic_analyzer.TypeChecker(program())
+    checker.type_check()
+    assert type(checker) is symantic_analyzer.TypeChecker
+    assert capsys.readouterr().out == ''
+
+def test_counting_tracer():
+    classes = program()
+    tracer = tracing.CountingTracer()
+    checker = symantic_analyzer.TypeChecker(classes, tracer)
+    checker.type_check()
+    assert isinstance(checker, symantic_analyzer.TypeChecker)
+    assert type(checker).__name__ == 'TracedTypeChecker'
+    assert set(tracer.phase_times) == {'symbol table', 'method tables',
+                                       'binding', 'type check'}
+
+    # the declarations and scopes of the analyzer visitors
+    count = nodes(classes)
+    assert tracer.nodes['ClassDefinition'] == count['ClassDefinition']
+    assert tracer.nodes['VariableDeclaration'] == \
+        count['VariableDeclaration']
+    assert tracer.scopes_pushed == tracer.scopes_popped == sum(
+        count.get(name, 0) for name in ('ClassDefinition',
+                                        'MethodDefinition',
+                                        'LetExpression', 'CaseStatement'))
+
+def test_traced_class_is_built_once():
+    first = symantic_analyzer.TypeChecker(program(), tracing.Tracer())
+    second = symantic_analyzer.TypeChecker(program(), tracing.Tracer())
+    assert type(first) is type(second)
+    assert tracing.traced_class(type(first)) is type(first)
+    assert type(first).__mro__[1] is symantic_analyzer.TypeChecker
+
+def test_subclass_is_traced():
+    class Checker(symantic_analyzer.TypeChecker):
+        entered = 0
+
+        def visit_MethodDefinition(self, method_def):
+            Checker.entered += 1
+            return super(Checker, self).visit_MethodDefinition(method_def)
+
+    tracer = tracing.CountingTracer()
+    classes = program()
+    Checker(classes, tracer).type_check()
+    assert Checker.entered == tracer.nodes['MethodDefinition'] == \
+        nodes(classes)['MethodDefinition']
+
+def test_logging_tracer(caplog):
+    with caplog.at_level(logging.DEBUG, logger='cool'):
+        symantic_analyzer.TypeChecker(program(),
+                                      tracing.LoggingTracer()).type_check()
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages[0] == 'start of symbol table'
+    assert messages[-1] == 'end of type check'
+    assert 'entering ClassDefinition BookList' in messages
+    assert 'scope popped for ClassDefinition' in messages
+    assert 'scope pushed for MethodDefinition' in messages
+
+def test_phase_ends_on_error():
+    ast = compiler.parse_fileset([]) + compiler.parse_str(
+        'class Main { main() : Int { true }; };')
+    tracer = tracing.CountingTracer()
+    checker = symantic_analyzer.TypeChecker(ast, tracer)
+    try:
+        checker.type_check()
+    except symantic_analyzer.TypeCheckingException:
+        pass
+    else:
+        assert False, 'type error not raised'
+    assert 'type check' in tracer.phase_times
+    assert not tracer._started
+
+def test_error_found(caplog):
+    ast = compiler.parse_fileset([]) + compiler.parse_str(
+        'class A { }; class A { };')
+    with caplog.at_level(logging.WARNING, logger='cool'):
+        symantic_analyzer.TypeChecker(ast, tracing.LoggingTracer())
+    assert [record.getMessage() for record in caplog.records] == \
+        ['Multiple definitions for class : A']
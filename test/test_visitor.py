@@ -0,0 +1,168 @@
+import os.path as osp
+import pytest
+import cool
+import cool.symantic_analyzer as symantic_analyzer
+from cool.model import *
+from test_parser import RESOURCES
+
+compiler = cool.Compiler()
+
+def program():
+    return compiler.parse_file(osp.join(RESOURCES, 'examples', 'life.cl'))
+
+class Recorder(object):
+    '''records the visits, visit_* and leave_* given by __getattr__'''
+
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, name):
+        if name.startswith('visit_'):
+            return lambda node: self.events.append(name) or True
+        if name.startswith('leave_'):
+            return lambda node: self.events.append(name)
+        raise AttributeError(name)
+
+class Names(object):
+    '''counts the nodes it visits, names the ObjectIdExpressions'''
+
+    def __init__(self):
+        self.count = 0
+        self.names = []
+
+    def __getattr__(self, name):
+        if name.startswith('visit_'):
+            return self.visit
+        if name.startswith('leave_'):
+            return self.leave
+        raise AttributeError(name)
+
+    def visit(self, node):
+        self.count += 1
+        return True
+
+    def leave(self, node):
+        pass
+
+    def visit_ObjectIdExpression(self, node):
+        self.names.append(node.name)
+        return self.visit(node)
+
+class UpperNames(Names):
+
+    def visit_ObjectIdExpression(self, node):
+        self.names.append(node.name.upper())
+        return self.visit(node)
+
+class TestDispatch:
+
+    def test_visit_and_leave_order(self):
+        node = BinaryOperationExpression('+', ObjectIdExpression('a'),
+                                         NumberExpression(1))
+        recorder = Recorder()
+        node.accept(recorder)
+        assert recorder.events == [
+            'visit_BinaryOperationExpression',
+            'visit_ObjectIdExpression', 'leave_ObjectIdExpression',
+            'visit_NumberExpression', 'leave_NumberExpression',
+            'leave_BinaryOperationExpression']
+
+    def test_subclass_overrides(self):
+        ast = program()
+        names, upper = Names(), UpperNames()
+        for _class in ast:
+            _class.accept(names)
+            _class.accept(upper)
+        assert names.names
+        assert upper.names == [name.upper() for name in names.names]
+        assert upper.count == names.count
+
+    def test_type_check(self):
+        class Typer(object):
+            def visit_NumberExpression(self, node):
+                return True
+            def typeof_NumberExpression(self, node):
+                return 'Int'
+            def leave_NumberExpression(self, node):
+                pass
+        assert NumberExpression(1).type_check(Typer()) == 'Int'
+
+    def test_missing_handler(self):
+        class Empty(object):
+            pass
+        with pytest.raises(AttributeError):
+            NumberExpression(1).accept(Empty())
+
+DEPTH = 100000
+
+class TestDeepTrees:
+    compiler = cool.Compiler(engine='rd', lexer_engine='scanner')
+
+    def check(self, text):
+        ast = self.compiler.parse_str(text)
+        names = Names()
+        ast[0].accept(names)
+        basic = self.compiler.parse_fileset([])
+        checker = symantic_analyzer.TypeChecker(basic + ast)
+        checker.type_check()
+        return names.count, checker
+
+    def test_binary_operations(self, capsys):
+        text = 'class A {{ f() : Int {{ 1{0} }}; }};'.format(' + 1' * DEPTH)
+        count, _ = self.check(text)
+        assert count == 2 * DEPTH + 3
+
+    def test_dispatch_chain(self, capsys):
+        text = 'class A {{ f() : A {{ self }}; g() : A {{ self{0} }}; }};' \
+            .format('.f()' * DEPTH)
+        count, _ = self.check(text)
+        assert count == DEPTH + 5
+
+    def test_type_error(self, capsys):
+        text = 'class A {{ f() : Int {{ 1{0} + true }}; }};'.format(
+            ' + 1' * DEPTH)
+        with pytest.raises(symantic_analyzer.TypeCheckingException) as info:
+            self.check(text)
+        assert type(info.value) is symantic_analyzer.TypeCheckingException
+
+class TestTypeCheck:
+
+    class Typer(object):
+        '''types nested brackets, catching the errors of subnodes'''
+
+        def __init__(self):
+            self.events = []
+
+        def __getattr__(self, name):
+            if name.startswith('visit_'):
+                return lambda node: True
+            if name.startswith('leave_'):
+                return lambda node: self.events.append(name)
+            raise AttributeError(name)
+
+        def typeof_InBracketsExpression(self, node):
+            try:
+                return (yield node.expr)
+            except ZeroDivisionError:
+                return 'Error'
+
+        def typeof_NumberExpression(self, node):
+            if node.value == 0:
+                raise ZeroDivisionError
+            return 'Int'
+
+    def test_types_returned_through_generators(self):
+        node = InBracketsExpression(InBracketsExpression(
+            NumberExpression(1)))
+        typer = self.Typer()
+        assert node.type_check(typer) == 'Int'
+        assert typer.events == ['leave_NumberExpression'] + \
+            ['leave_InBracketsExpression'] * 2
+
+    def test_exception_thrown_into_parent(self):
+        node = InBracketsExpression(InBracketsExpression(
+            NumberExpression(0)))
+        typer = self.Typer()
+        assert node.type_check(typer) == 'Error'
+        # no leave for the node raising, as with recursive calls
+        assert typer.events == ['leave_InBracketsExpression'] * 2